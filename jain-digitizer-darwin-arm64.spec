@@ -5,7 +5,7 @@ a = Analysis(
     ['src/jain_digitizer/desktop/main.py'],
     pathex=['src'],
     binaries=[],
-    datas=[('src/jain_digitizer/desktop/icon.png', 'jain_digitizer/desktop'), ('src/jain_digitizer/common/prompt-html.md', 'jain_digitizer/common'), ('src/jain_digitizer/common/prompt-md.md', 'jain_digitizer/common')],
+    datas=[('src/jain_digitizer/desktop/icon.png', 'jain_digitizer/desktop'), ('src/jain_digitizer/common/prompt-html.md', 'jain_digitizer/common'), ('src/jain_digitizer/common/prompt-md.md', 'jain_digitizer/common'), ('src/jain_digitizer/common/prompt-ocr.md', 'jain_digitizer/common'), ('src/jain_digitizer/common/prompt-translate.md', 'jain_digitizer/common'), ('src/jain_digitizer/common/glossary.tsv', 'jain_digitizer/common')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
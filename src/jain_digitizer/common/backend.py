@@ -0,0 +1,166 @@
+import os
+from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.ingestion import PageSource
+from jain_digitizer.common.cancellation import CancelToken
+from jain_digitizer.common.metrics import default_metrics
+from jain_digitizer.common.constants import DEFAULT_RASTER_DPI, DEFAULT_POSTPROCESS
+from jain_digitizer.common.postprocess import default_postprocessor
+from jain_digitizer.common.rasterize import PdfRasterizer, PDF_AVAILABLE
+
+
+def starts_file(result):
+    """False if ``result`` is a later page (p2, p3...) of a rasterized PDF, True otherwise."""
+    source = (result or {}).get("source")
+    return not source or source.endswith(" p1")
+
+
+def group_by_file(paths, results):
+    """
+    Maps each of the batch's ``paths`` to its [(page label, result)].
+    Results come in file order; a rasterized PDF contributes one result per
+    page, labelled "name pN" from "name p1" on.
+    """
+    by_file = {path: [] for path in paths}
+    pos = -1
+    for result in results:
+        if pos < 0 or starts_file(result):
+            pos = min(pos + 1, len(paths) - 1)
+        path = paths[pos]
+        by_file[path].append(((result or {}).get("source") or os.path.basename(path), result))
+    return by_file
+
+
+class OCRBackend:
+    """
+    Base class for OCR/translation engines. Subclasses implement
+    ``_translate_sources(sources)``, returning one result dict per page
+    (``hindi_ocr``, ``english_translation`` or ``error``), and get file and
+    bytes entry points, progress reporting and cancellation from here.
+    """
+    # Short name shown in settings and recorded on results
+    name = "backend"
+
+    def __init__(self, progress_callback=None, cancel_token=None, raster_dpi=DEFAULT_RASTER_DPI):
+        # Called as progress_callback(indices, results) whenever pages finish
+        self.progress_callback = progress_callback
+        # Cancels the whole batch (and carries its deadline)
+        self.cancel_token = cancel_token or CancelToken()
+        # PDFs are split into page images at this resolution (0 = send PDFs whole)
+        self.raster_dpi = raster_dpi
+        # Pages in the current batch once PDFs are expanded (progress callbacks index into these)
+        self.page_total = None
+        self._sources = None
+        self.metrics = default_metrics
+        # Local clean-up of every result before it's reported (None = raw model output)
+        self.postprocessor = default_postprocessor if DEFAULT_POSTPROCESS else None
+
+    def translate_files(self, file_paths):
+        """
+        Takes a list of file paths. Files are read lazily, one chunk at a time,
+        so only the data for in-flight work is resident.
+        """
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        return self.translate_paths([(path, None, self._get_mime_type(path), None) for path in file_paths])
+
+    def translate_bytes(self, files_data):
+        """
+        Takes a list of (bytes, filename, mime_type) tuples.
+        """
+        self._check_ready()
+
+        rasterizer = self._rasterizer()
+        try:
+            sources = []
+            for data, filename, mime_type in files_data:
+                if rasterizer and mime_type == "application/pdf":
+                    sources.extend(rasterizer.page_sources_from_bytes(data, filename))
+                else:
+                    sources.append(PageSource.from_bytes(data, filename, mime_type))
+            return self._run(sources)
+        finally:
+            if rasterizer:
+                rasterizer.close()
+
+    def translate_paths(self, files):
+        """
+        Takes a list of (path, filename, mime_type, digest) tuples, e.g.
+        uploads spilled to disk. Pages are labelled with ``filename`` (None =
+        the file's name) and a known digest (None = hash on demand) isn't recomputed.
+        """
+        self._check_ready()
+
+        rasterizer = self._rasterizer()
+        try:
+            sources = []
+            for path, filename, mime_type, digest in files:
+                if rasterizer and mime_type == "application/pdf":
+                    sources.extend(rasterizer.page_sources(path, filename, digest))
+                else:
+                    sources.append(PageSource.from_path(path, mime_type, filename, digest))
+            return self._run(sources)
+        finally:
+            if rasterizer:
+                rasterizer.close()
+
+    def _rasterizer(self):
+        if not self.raster_dpi:
+            return None
+        if not PDF_AVAILABLE:
+            logger.warning("PyMuPDF is not installed; sending PDFs whole (pip install jain-digitizer[pdf])")
+            return None
+        return PdfRasterizer(dpi=self.raster_dpi)
+
+    def _run(self, sources):
+        self.page_total = len(sources)
+        self._sources = sources
+        results = self._translate_sources(sources)
+        if self.postprocessor:
+            # Pages reported on the way were cleaned already; the rules are idempotent
+            self.postprocessor.results(results)
+        for src, result in zip(sources, results):
+            self._label(src, result)
+        return results
+
+    @staticmethod
+    def _label(src, result):
+        if src.page is not None and isinstance(result, dict):
+            # Results of a rasterized PDF are labelled by page ("book.pdf p3")
+            result.setdefault("source", src.filename)
+
+    def _translate_sources(self, sources):
+        raise NotImplementedError
+
+    def _check_ready(self):
+        """Raises if the backend can't run (missing key, engine not installed...)."""
+
+    def _cancelled_result(self):
+        return {"error": self.cancel_token.reason or "Cancelled", "cancelled": True}
+
+    def _report_progress(self, indices, results):
+        """Passes finished pages to ``progress_callback``; a failing callback never fails the batch."""
+        self.metrics.record_pages_done(len(indices))
+        if not self.progress_callback:
+            return
+        if self._sources:
+            # Labelled before they're shown, as progress indices count PDF pages rather than files
+            for idx, result in zip(indices, results):
+                self._label(self._sources[idx], result)
+        if self.postprocessor:
+            self.postprocessor.results(results)
+        try:
+            self.progress_callback(list(indices), list(results))
+        except Exception as e:
+            logger.exception(f"Progress callback failed: {str(e)}")
+
+    def _get_mime_type(self, file_path):
+        """Determines the MIME type based on file extension."""
+        ext = file_path.lower().split('.')[-1]
+        if ext == 'pdf':
+            return "application/pdf"
+        elif ext in ['jpg', 'jpeg']:
+            return "image/jpeg"
+        elif ext == 'png':
+            return "image/png"
+        else:
+            return f"image/{ext}"  # Best effort
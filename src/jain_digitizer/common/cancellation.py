@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+
+# How often a waiting request checks for cancellation (seconds)
+POLL_INTERVAL = 0.1
+
+
+class OperationCancelled(Exception):
+    """Raised inside a batch once its CancelToken is cancelled or its deadline has passed."""
+
+
+class RequestTimeout(TimeoutError):
+    """Raised when a single API request exceeds its timeout."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation shared between the UI and a running batch,
+    with an optional deadline (seconds from creation) for the whole batch.
+    """
+    def __init__(self, deadline=None, clock=time.monotonic):
+        self.clock = clock
+        self.deadline = clock() + deadline if deadline else None
+        self.reason = None
+        self.parent = None
+        self._event = threading.Event()
+
+    def child(self):
+        """
+        A token cancelled along with this one that can also be cancelled on
+        its own, e.g. to stop the losing call of a hedged pair.
+        """
+        child = CancelToken(clock=self.clock)
+        child.parent = self
+        return child
+
+    def cancel(self, reason="Cancelled by user"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+        if not self._event.is_set() and self.deadline is not None and self.clock() >= self.deadline:
+            self.cancel("Batch deadline exceeded")
+        return self._event.is_set()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return self.parent.remaining() if self.parent is not None else None
+        return max(self.deadline - self.clock(), 0.0)
+
+    def check(self):
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+
+def run_cancellable(fn, token, timeout=None, **kwargs):
+    """
+    Runs ``fn(**kwargs)`` on a daemon thread and waits for it, giving up when
+    ``token`` is cancelled or ``timeout`` seconds pass. A blocking HTTP call
+    can't be interrupted from outside, so an abandoned call finishes (or
+    times out) in the background and its result is discarded.
+    """
+    return run_hedged(fn, token, timeout, **kwargs)
+
+
+def run_hedged(fn, token, timeout=None, hedge=None, **kwargs):
+    """
+    ``run_cancellable`` with an optional hedge: if the call is still running
+    after ``hedge.after`` seconds and ``hedge.acquire()`` allows it, a
+    duplicate call is started. The first call to succeed wins and the other
+    is abandoned like a cancelled call; ``hedge.record(won)`` is told whether
+    the duplicate won.
+    """
+    return run_hedged_calls(lambda attempt_token: fn(**kwargs), token, timeout, hedge)
+
+
+def run_hedged_calls(call, token, timeout=None, hedge=None):
+    """
+    Like ``run_hedged``, for calls that can stop early: each attempt runs
+    ``call(attempt_token)`` with its own child of ``token``, which is
+    cancelled once the attempt has lost (or timed out), so it can give back
+    its resources instead of running on in the background.
+    """
+    token.check()
+    outcomes = queue.Queue()
+    tokens = []
+
+    def start(attempt):
+        attempt_token = token.child()
+        tokens.append(attempt_token)
+
+        def target():
+            try:
+                outcomes.put((attempt, call(attempt_token), None))
+            except BaseException as e:
+                outcomes.put((attempt, None, e))
+        threading.Thread(target=target, name=f"api-request-{attempt}", daemon=True).start()
+
+    def abandon(reason):
+        for attempt_token in tokens:
+            attempt_token.cancel(reason)
+
+    start(0)
+    running = 1
+    hedged = False
+    first_error = None
+    hedge_after = hedge.after if hedge is not None else None
+    started = time.monotonic()
+    while True:
+        wait = POLL_INTERVAL
+        if hedge_after is not None:
+            wait = min(wait, max(started + hedge_after - time.monotonic(), 0.0))
+        try:
+            attempt, value, error = outcomes.get(timeout=wait)
+        except queue.Empty:
+            token.check()
+            elapsed = time.monotonic() - started
+            if timeout and elapsed > timeout:
+                abandon("Request timed out")
+                raise RequestTimeout(f"Request timed out after {timeout:g}s")
+            if hedge_after is not None and elapsed >= hedge_after:
+                # Decided once per call: the duplicate is sent now or not at all
+                hedge_after = None
+                if hedge.acquire():
+                    hedged = True
+                    start(1)
+                    running += 1
+            continue
+
+        running -= 1
+        if error is None:
+            if hedged:
+                hedge.record(attempt == 1)
+                abandon("Lost to the other call of a hedged pair")
+            return value
+        first_error = first_error or error
+        if not running:
+            raise first_error
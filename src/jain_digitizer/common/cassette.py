@@ -0,0 +1,263 @@
+"""
+Record and replay Gemini traffic.
+
+``RecordingClient`` wraps a real ``genai.Client`` and appends each request's
+digest and response to a JSONL cassette. ``ReplayClient`` serves those
+responses offline with configurable latency. Both are client factories for
+``Translator(client_factory=...)``; by default the mode is taken from the
+environment, so the desktop app, web app and benchmark all pick it up:
+
+    CASSETTE_MODE=record GEMINI_CASSETTE=book.jsonl task run
+    CASSETTE_MODE=replay GEMINI_CASSETTE=book.jsonl REPLAY_LATENCY=recorded task run
+
+Besides whole requests, the cassette stores each page's result keyed by the
+page content, model and prompt, so a replay can serve requests that chunk
+(or repeat) the same pages differently from the recording.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from google import genai
+from jain_digitizer.common.constants import (CASSETTE_MODE, DEFAULT_CASSETTE, REPLAY_LATENCY,
+                                             MULTI_FILE_INSTRUCTION, SINGLE_FILE_INSTRUCTION)
+from jain_digitizer.common.logger_setup import logger
+
+
+# Stands in for the API key when replaying, which needs none
+REPLAY_KEY = "replay"
+
+
+class CassetteMiss(KeyError):
+    """The replayed request (or one of its pages) was never recorded."""
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _instruction(config):
+    return str(getattr(config, "system_instruction", None) or getattr(config, "cached_content", None) or "")
+
+
+def _prompt_digest(config):
+    """Digest of the system prompt without the per-request single/multi-file suffix."""
+    text = _instruction(config)
+    for suffix in (MULTI_FILE_INSTRUCTION, SINGLE_FILE_INSTRUCTION):
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+    return _sha(text.encode("utf-8"))
+
+
+def request_digest(model, config, contents):
+    """Digest of everything that determines a response: model, full instruction and every part."""
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(_instruction(config).encode("utf-8"))
+    for part in contents:
+        inline = getattr(part, "inline_data", None)
+        if inline is not None and inline.data is not None:
+            h.update(f"\x00{inline.mime_type}\x00".encode("utf-8"))
+            h.update(_sha(inline.data).encode("ascii"))
+        else:
+            h.update(f"\x00text\x00{part.text or ''}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def page_units(contents):
+    """
+    Per-page digests of a request: image bytes, or the body of a text page
+    (below its "File N: name" label). Bare label parts are skipped.
+    """
+    units = []
+    for part in contents:
+        inline = getattr(part, "inline_data", None)
+        if inline is not None and inline.data is not None:
+            units.append(_sha(inline.data))
+        elif part.text:
+            label, sep, body = part.text.partition("\n\n")
+            if sep and label.startswith("File "):
+                units.append(_sha(body.encode("utf-8")))
+    return units
+
+
+def _usage_dict(usage):
+    fields = {}
+    for field in ("prompt_token_count", "candidates_token_count"):
+        value = getattr(usage, field, None)
+        fields[field] = value if isinstance(value, int) else None
+    return fields
+
+
+class Cassette:
+    """A JSONL file of recorded requests and per-page results. Thread-safe."""
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._pages = {}
+        self._cursor = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+        logger.info(f"Cassette {path}: {len(self._requests)} requests, {len(self._pages)} pages")
+
+    def _index(self, entry):
+        if entry["type"] == "request":
+            self._requests.setdefault(entry["digest"], []).append(entry)
+        elif entry["type"] == "page":
+            self._pages[(entry["model"], entry["prompt"], entry["unit"])] = entry
+
+    def __len__(self):
+        return len(self._requests)
+
+    def record(self, model, config, contents, text, usage, latency):
+        entries = [{
+            "type": "request",
+            "digest": request_digest(model, config, contents),
+            "model": model,
+            "text": text,
+            "usage": _usage_dict(usage),
+            "latency": round(latency, 4),
+        }]
+        units = page_units(contents)
+        try:
+            results = json.loads(text)
+        except (TypeError, json.JSONDecodeError):
+            results = None
+        if isinstance(results, dict):
+            results = [results]
+        if isinstance(results, list) and units and len(results) == len(units):
+            prompt = _prompt_digest(config)
+            for unit, result in zip(units, results):
+                entries.append({"type": "page", "model": model, "prompt": prompt, "unit": unit,
+                                "result": result, "latency": round(latency / len(units), 4)})
+
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    self._index(entry)
+
+    def lookup(self, model, config, contents):
+        """Returns (response text, usage dict, recorded latency); raises CassetteMiss."""
+        digest = request_digest(model, config, contents)
+        with self._lock:
+            entries = self._requests.get(digest)
+            if entries:
+                # Repeated identical requests replay their recordings in order, then cycle
+                cursor = self._cursor.get(digest, 0)
+                self._cursor[digest] = cursor + 1
+                entry = entries[cursor % len(entries)]
+                self.hits += 1
+                return entry["text"], entry["usage"], entry["latency"]
+
+            prompt = _prompt_digest(config)
+            pages = [self._pages.get((model, prompt, unit)) for unit in page_units(contents)]
+            if not pages or None in pages:
+                self.misses += 1
+                raise CassetteMiss(f"No recording for request {digest[:12]} ({model}) in {self.path}")
+            self.hits += 1
+            results = [page["result"] for page in pages]
+            text = json.dumps(results if len(results) > 1 else results[0], ensure_ascii=False)
+            return text, None, sum(page["latency"] for page in pages)
+
+
+class _RecordingModels:
+    def __init__(self, models, cassette):
+        self._models = models
+        self._cassette = cassette
+
+    def generate_content(self, model, config, contents):
+        started = time.perf_counter()
+        response = self._models.generate_content(model=model, config=config, contents=contents)
+        self._cassette.record(model, config, contents, response.text,
+                              getattr(response, "usage_metadata", None), time.perf_counter() - started)
+        return response
+
+
+class RecordingClient:
+    """Wraps a real client and records every generate_content call."""
+    def __init__(self, client, cassette):
+        self.models = _RecordingModels(client.models, cassette)
+        self.caches = client.caches
+
+
+class _ReplayModels:
+    def __init__(self, cassette, latency):
+        self._cassette = cassette
+        self._latency = latency
+
+    def generate_content(self, model, config, contents):
+        text, usage, recorded = self._cassette.lookup(model, config, contents)
+        delay = recorded if self._latency == "recorded" else self._latency
+        if delay:
+            time.sleep(delay)
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**usage) if usage else None)
+
+
+class _ReplayCaches:
+    def create(self, **kwargs):
+        raise RuntimeError("Context caching is not available when replaying a cassette")
+
+
+class ReplayClient:
+    """Serves recorded responses. ``latency`` is seconds per request or "recorded"."""
+    def __init__(self, cassette, latency=0.0):
+        self.models = _ReplayModels(cassette, latency)
+        self.caches = _ReplayCaches()
+
+
+def parse_latency(value):
+    if value in (None, ""):
+        return 0.0
+    if str(value).lower() == "recorded":
+        return "recorded"
+    return float(value)
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def load_cassette(path):
+    """Returns the process-wide Cassette for ``path`` (loaded once)."""
+    path = os.path.abspath(path)
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+def client_factory(mode, path=DEFAULT_CASSETTE, latency=REPLAY_LATENCY):
+    """
+    Returns a ``factory(api_key, http_options=None)`` building recording or
+    replaying clients, or None for ``mode`` None (use the real client).
+    """
+    if not mode:
+        return None
+    cassette = load_cassette(path)
+    if mode == "record":
+        def factory(api_key, http_options=None):
+            return RecordingClient(genai.Client(api_key=api_key, http_options=http_options), cassette)
+        return factory
+    if mode == "replay":
+        latency = parse_latency(latency)
+
+        def factory(api_key=None, http_options=None):
+            return ReplayClient(cassette, latency)
+        # Tells the Translator it can run without an API key
+        factory.replay = True
+        return factory
+    raise ValueError(f"Unknown CASSETTE_MODE '{mode}' (expected 'record' or 'replay')")
+
+
+def default_client_factory():
+    """The factory configured by CASSETTE_MODE / GEMINI_CASSETTE / REPLAY_LATENCY, if any."""
+    return client_factory(CASSETTE_MODE, DEFAULT_CASSETTE, REPLAY_LATENCY)
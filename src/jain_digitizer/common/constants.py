@@ -1,14 +1,125 @@
 import os
+import sys
+import tempfile
 
 # Get the directory of the current file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def load_prompt():
+def user_dir(kind):
+  """
+  Per-user directory of the app for ``kind`` "cache" (rebuildable files) or
+  "data" (files worth keeping), so defaults don't depend on the working directory.
+  """
+  home = os.path.expanduser("~")
+  if sys.platform == "win32":
+    root = os.environ.get("LOCALAPPDATA" if kind == "cache" else "APPDATA") or os.path.join(home, "AppData", "Local")
+  elif sys.platform == "darwin":
+    root = os.path.join(home, "Library", "Caches" if kind == "cache" else "Application Support")
+  elif kind == "cache":
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+  else:
+    root = os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+  return os.path.join(root, "jain-digitizer")
+
+USER_CACHE_DIR = user_dir("cache")
+USER_DATA_DIR = user_dir("data")
+
+def load_prompt(env_var="PROMPT_FILE", filename="prompt-html.md"):
   # Move up one level to find the prompt file in src/jain_digitizer/  
-  prompt_path = os.environ.get("PROMPT_FILE", os.path.join(BASE_DIR, "prompt-html.md"))
+  prompt_path = os.environ.get(env_var, os.path.join(BASE_DIR, filename))
   if os.path.exists(prompt_path):
     with open(prompt_path, "r", encoding="utf-8") as f:
       return f.read()
   raise FileNotFoundError("Prompt file not found")
 
 DEFAULT_PROMPT = load_prompt()
+
+# Prompts for the two-stage pipeline (OCR first, then translation of the OCR text)
+OCR_PROMPT = load_prompt("OCR_PROMPT_FILE", "prompt-ocr.md")
+TRANSLATION_PROMPT = load_prompt("TRANSLATION_PROMPT_FILE", "prompt-translate.md")
+
+# Appended to the system prompt depending on how many files a request carries
+MULTI_FILE_INSTRUCTION = "\n\nCRITICAL: You are processing multiple files. Return a JSON ARRAY of objects, one for each file in the same order."
+SINGLE_FILE_INSTRUCTION = "\n\nReturn a single JSON object for the file."
+
+# Upper bound on the bytes of file data held for one in-flight request.
+# Larger batches are split into several requests.
+DEFAULT_MEMORY_BUDGET = int(os.environ.get("MEMORY_BUDGET_MB", "256")) * 1024 * 1024
+
+# Output token limit of one response. Pages are packed into requests whose
+# estimated output stays safely under it, so batched responses aren't cut off (0 = off).
+DEFAULT_OUTPUT_TOKEN_BUDGET = int(os.environ.get("OUTPUT_TOKEN_BUDGET", "8192"))
+
+# Stronger model for pages that fail validation on the default (fast) model.
+# Unset to disable tiered routing.
+DEFAULT_ESCALATION_MODEL = os.environ.get("ESCALATION_MODEL") or None
+
+# On-disk cache of per-page OCR and translation results for the two-stage pipeline
+DEFAULT_STAGE_CACHE = os.environ.get("STAGE_CACHE", os.path.join(USER_CACHE_DIR, "stage_cache.db"))
+
+# Seconds a single API request may take before its pages are marked as failed
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", "300"))
+
+# Seconds a whole batch may run before the remaining pages are abandoned (0 = no deadline)
+DEFAULT_BATCH_DEADLINE = float(os.environ.get("BATCH_DEADLINE", "0")) or None
+
+# OCR engines: remote only, local Tesseract first with low-confidence pages sent
+# to Gemini, or local Tesseract only (offline, no translation)
+OCR_ENGINES = {
+    "gemini": "Gemini",
+    "local-first": "Local first (Tesseract, then Gemini for hard pages)",
+    "local": "Local only (Tesseract, offline, no translation)",
+}
+DEFAULT_OCR_ENGINE = os.environ.get("OCR_ENGINE", "gemini")
+
+# Record/replay of Gemini traffic: CASSETTE_MODE=record|replay with GEMINI_CASSETTE=path.
+# REPLAY_LATENCY is seconds per request, or "recorded" to reproduce the recorded timings.
+CASSETTE_MODE = os.environ.get("CASSETTE_MODE", "").lower() or None
+DEFAULT_CASSETTE = os.environ.get("GEMINI_CASSETTE", "gemini_cassette.jsonl")
+REPLAY_LATENCY = os.environ.get("REPLAY_LATENCY", "0")
+
+# PDFs are rendered to one JPEG per page at this resolution before being sent
+# (0 = send PDFs whole). Rendered pages are cached in RASTER_CACHE.
+DEFAULT_RASTER_DPI = int(os.environ.get("RASTER_DPI", "200"))
+DEFAULT_RASTER_QUALITY = int(os.environ.get("RASTER_JPEG_QUALITY", "85"))
+RASTER_COLOR = os.environ.get("RASTER_COLOR", "0") not in ("", "0", "false", "no")
+DEFAULT_RASTER_CACHE = os.environ.get("RASTER_CACHE", os.path.join(USER_CACHE_DIR, "page_cache"))
+
+# Local full-text search index of digitized pages, and the watch-folder
+# daemon's record of processed files
+DEFAULT_SEARCH_INDEX = os.environ.get("SEARCH_INDEX", os.path.join(USER_DATA_DIR, "search_index.db"))
+DEFAULT_WATCH_RESULTS = os.environ.get("WATCH_RESULTS", os.path.join(USER_DATA_DIR, "watch_results.db"))
+
+# Web uploads are spilled here while a batch runs, so they are memory-mapped
+# page by page instead of being copied around in memory
+DEFAULT_UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "jain-digitizer-uploads"))
+
+# Web sessions keep their page results on disk here, one SQLite file per
+# session, evicting the least recently used beyond MAX_SESSIONS. The results
+# view shows RESULTS_VIEW_SIZE pages at a time.
+DEFAULT_SESSION_DIR = os.environ.get("SESSION_DIR", os.path.join(tempfile.gettempdir(), "jain-digitizer-sessions"))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "20"))
+RESULTS_VIEW_SIZE = int(os.environ.get("RESULTS_VIEW_SIZE", "10"))
+
+# Adaptive resolution: page images are first sent downscaled by this factor
+# (e.g. 0.5) and re-sent at full resolution only if the result fails cheap
+# checks (0 = always send full resolution).
+DEFAULT_PREVIEW_SCALE = float(os.environ.get("PREVIEW_SCALE", "0"))
+
+# Blank and picture-only pages (versos, plates) are detected locally and
+# answered with a placeholder instead of an API call (PAGE_FILTER=0 to send every page).
+DEFAULT_PAGE_FILTER = os.environ.get("PAGE_FILTER", "1") not in ("", "0", "false", "no")
+
+# Model output is cleaned up locally (Unicode/IAST normalization, dandas and
+# the Jain glossary in GLOSSARY_FILE) before it's shown (POSTPROCESS=0 to keep it raw)
+DEFAULT_POSTPROCESS = os.environ.get("POSTPROCESS", "1") not in ("", "0", "false", "no")
+DEFAULT_GLOSSARY = os.environ.get("GLOSSARY_FILE", os.path.join(BASE_DIR, "glossary.tsv"))
+
+# The desktop app runs batches in a child process instead of a thread, so
+# result handling never competes with the window for the GIL (ENGINE_PROCESS=1)
+DEFAULT_ENGINE_PROCESS = os.environ.get("ENGINE_PROCESS", "0") not in ("", "0", "false", "no")
+
+# Hedged requests for interactive jobs: a request still running past the p95
+# latency of its size class is duplicated and the first answer wins. The budget
+# caps duplicates as a fraction of requests (0 = off).
+DEFAULT_HEDGE_BUDGET = float(os.environ.get("HEDGE_BUDGET", "0.1"))
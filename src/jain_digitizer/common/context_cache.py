@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+from google.genai import types
+from jain_digitizer.common.logger_setup import logger
+
+DEFAULT_CACHE_TTL = 3600  # seconds
+# Treat a handle as expired slightly early so a request never races the server-side expiry
+EXPIRY_MARGIN = 60  # seconds
+# After a transient failure (quota, server or network error) caching is retried this much later
+RETRY_BACKOFF = 30  # seconds
+
+
+def prompt_digest(text):
+    """Returns a stable digest of a system instruction."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def is_refusal(error):
+    """
+    True if the server will refuse to cache this prompt on this model every
+    time (e.g. it is below the minimum cacheable size, or the model has no
+    caching), as opposed to a transient quota, server or network error.
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    text = str(error)
+    return code in (400, 404) or "INVALID_ARGUMENT" in text or "NOT_FOUND" in text
+
+
+class ContextCacheRegistry:
+    """
+    Tracks Gemini server-side cached contexts for system instructions.
+
+    Handles are keyed by API key, model and prompt digest, so every chunk of a
+    batch (and every later batch in the same process) reuses the same cached
+    context until it expires, at which point a new one is created.
+    """
+    def __init__(self, ttl_seconds=DEFAULT_CACHE_TTL, retry_backoff=RETRY_BACKOFF):
+        self.ttl_seconds = ttl_seconds
+        self.retry_backoff = retry_backoff
+        self._entries = {}
+        # Guards the dicts only; each key has its own lock held while its context is created
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key(self, api_key, model, system_instruction):
+        key_digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return (key_digest, model, prompt_digest(system_instruction))
+
+    def _live(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] - EXPIRY_MARGIN > time.time():
+                return entry
+            return None
+
+    def get(self, client, api_key, model, system_instruction):
+        """
+        Returns the name of a live cached context for ``system_instruction``,
+        creating one if needed. Returns None if the server refused to cache it
+        (e.g. the prompt is below the model's minimum cacheable size).
+        """
+        key = self._key(api_key, model, system_instruction)
+        entry = self._live(key)
+        if entry:
+            return entry["name"]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Concurrent chunks for the same prompt wait for one create call; other prompts don't
+        with key_lock:
+            entry = self._live(key)
+            if entry:
+                return entry["name"]
+
+            digest = key[2]
+            try:
+                cache = client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        ttl=f"{self.ttl_seconds}s",
+                        display_name=f"jain-digitizer-{digest[:12]}",
+                    ),
+                )
+            except Exception as e:
+                # Remember a refusal for one TTL so we don't retry on every chunk; retry other errors soon
+                retry_after = self.ttl_seconds if is_refusal(e) else self.retry_backoff
+                logger.warning(f"Context caching unavailable for {model}, sending prompt inline "
+                               f"(retrying in {retry_after}s): {e}")
+                with self._lock:
+                    self._entries[key] = {"name": None, "digest": digest,
+                                          "expires_at": time.time() + EXPIRY_MARGIN + retry_after}
+                return None
+
+            expires_at = cache.expire_time.timestamp() if cache.expire_time else time.time() + self.ttl_seconds
+            with self._lock:
+                self._entries[key] = {"name": cache.name, "digest": digest, "expires_at": expires_at}
+            logger.info(f"Created cached context {cache.name} for prompt {digest[:12]}")
+            return cache.name
+
+    def invalidate(self, api_key, model, system_instruction):
+        """Drops the handle for ``system_instruction`` so the next call rebuilds it."""
+        with self._lock:
+            self._entries.pop(self._key(api_key, model, system_instruction), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every Translator in the process so handles survive across batches
+default_registry = ContextCacheRegistry()
@@ -0,0 +1,227 @@
+"""
+Runs a batch in a child process, so JSON parsing, image work and large
+result strings don't compete with the desktop app's event loop for the GIL.
+
+The child builds its backend from plain settings and reports over a pipe
+in small binary messages: a one-byte kind, a one-byte flag and a UTF-8
+JSON body, zlib-compressed when large. Pages are sent as they finish; the
+final message only carries pages whose result changed or was never
+reported, so each page normally crosses the pipe once.
+"""
+import json
+import multiprocessing
+import threading
+import time
+import zlib
+from multiprocessing.connection import wait
+from jain_digitizer.common.cancellation import CancelToken, POLL_INTERVAL
+from jain_digitizer.common.constants import (DEFAULT_BATCH_DEADLINE, DEFAULT_ESCALATION_MODEL, DEFAULT_HEDGE_BUDGET,
+                                             DEFAULT_OCR_ENGINE, DEFAULT_PAGE_FILTER, DEFAULT_PROMPT, DEFAULT_RASTER_DPI,
+                                             OCR_PROMPT, TRANSLATION_PROMPT)
+from jain_digitizer.common.local_ocr import TesseractBackend
+from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.pipeline import TwoStageTranslator, LocalFirstTranslator
+from jain_digitizer.common.translator import Translator
+
+# Message kinds, child to parent
+PAGES = b"P"    # [page_total, indices, results]
+METRICS = b"M"  # [snapshot, caches, pages_per_minute]
+DONE = b"D"     # [result count, {index: result} not already reported]
+ERROR = b"E"    # error message
+
+# Bodies larger than this are zlib-compressed (flag "z"; "-" = plain)
+COMPRESS_OVER = 4096
+# Seconds between metrics messages while pages are finishing
+METRICS_INTERVAL = 1.0
+
+
+def _dumps(payload):
+    # Devanagari stays 3 bytes per character instead of a 6-byte \u escape
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_message(kind, payload):
+    body = _dumps(payload).encode("utf-8")
+    if len(body) > COMPRESS_OVER:
+        return kind + b"z" + zlib.compress(body, 1)
+    return kind + b"-" + body
+
+
+def decode_message(data):
+    """Returns ``(kind, payload)`` of a message built by ``encode_message``."""
+    kind, flag, body = data[:1], data[1:2], data[2:]
+    if flag == b"z":
+        body = zlib.decompress(body)
+    return kind, json.loads(body)
+
+
+def build_backend(settings, cancel_token=None):
+    """
+    Creates the backend described by the desktop settings (a plain dict:
+    ``ocr_engine``, ``two_stage``, ``api_key``, prompts, ``context_cache``, ``raster_dpi``, ``page_filter``).
+    """
+    engine = settings.get("ocr_engine", DEFAULT_OCR_ENGINE)
+    raster_dpi = settings.get("raster_dpi", DEFAULT_RASTER_DPI)
+    page_filter = settings.get("page_filter", DEFAULT_PAGE_FILTER)
+    api_key = settings.get("api_key", "")
+    context_cache = settings.get("context_cache", False)
+    ocr_prompt = settings.get("ocr_prompt", OCR_PROMPT)
+    translation_prompt = settings.get("translation_prompt", TRANSLATION_PROMPT)
+
+    if engine == "local":
+        return TesseractBackend(cancel_token=cancel_token, raster_dpi=raster_dpi)
+    if engine == "local-first":
+        return LocalFirstTranslator(api_key, ocr_prompt=ocr_prompt, translation_prompt=translation_prompt,
+                                    use_context_cache=context_cache, cancel_token=cancel_token,
+                                    raster_dpi=raster_dpi, hedge_budget=DEFAULT_HEDGE_BUDGET, page_filter=page_filter)
+    if settings.get("two_stage"):
+        return TwoStageTranslator(api_key, ocr_prompt, translation_prompt,
+                                  use_context_cache=context_cache, cancel_token=cancel_token,
+                                  raster_dpi=raster_dpi, hedge_budget=DEFAULT_HEDGE_BUDGET, page_filter=page_filter)
+    return Translator(api_key, settings.get("system_prompt", DEFAULT_PROMPT), use_context_cache=context_cache,
+                      escalation_model=DEFAULT_ESCALATION_MODEL, cancel_token=cancel_token,
+                      raster_dpi=raster_dpi, hedge_budget=DEFAULT_HEDGE_BUDGET, page_filter=page_filter)
+
+
+def _engine_main(settings, file_list, conn, cancel_event, factory):
+    """Entry point of the child process."""
+    token = CancelToken(DEFAULT_BATCH_DEADLINE)
+    lock = threading.Lock()
+    # JSON of each page as it was sent; the backend may still change the dicts afterwards (e.g. PDF page labels)
+    reported = {}
+    last_metrics = [0.0]
+
+    def send(kind, payload):
+        data = encode_message(kind, payload)
+        # Pages finish on the backend's pool threads
+        with lock:
+            conn.send_bytes(data)
+
+    def send_metrics(force=False):
+        now = time.monotonic()
+        if not force and now - last_metrics[0] < METRICS_INTERVAL:
+            return
+        last_metrics[0] = now
+        send(METRICS, [backend.metrics.snapshot(), backend.metrics.caches(), backend.metrics.pages_per_minute()])
+
+    def on_pages(indices, results):
+        with lock:
+            reported.update((idx, _dumps(result)) for idx, result in zip(indices, results))
+        send(PAGES, [backend.page_total, indices, results])
+        send_metrics()
+
+    def watch_cancel():
+        while not finished.is_set():
+            if cancel_event.wait(POLL_INTERVAL):
+                token.cancel()
+                return
+
+    finished = threading.Event()
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        backend = factory(settings, token)
+        backend.progress_callback = on_pages
+        results = backend.translate_files(file_list)
+        send_metrics(force=True)
+        with lock:
+            rest = {idx: result for idx, result in enumerate(results) if reported.get(idx) != _dumps(result)}
+        send(DONE, [len(results), rest])
+    except Exception as e:
+        logger.exception(f"Processing engine failed: {str(e)}")
+        send(ERROR, str(e))
+    finally:
+        finished.set()
+        conn.close()
+
+
+class RemoteMetrics:
+    """The last metrics snapshot sent by an engine process, read like ``RequestMetrics``."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot, self._caches, self._pages_per_minute = {}, {}, 0.0
+
+    def update(self, snapshot, caches, pages_per_minute):
+        with self._lock:
+            self._snapshot, self._caches, self._pages_per_minute = snapshot, caches, pages_per_minute
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._snapshot)
+
+    def caches(self):
+        with self._lock:
+            return dict(self._caches)
+
+    def pages_per_minute(self):
+        with self._lock:
+            return self._pages_per_minute
+
+
+class EngineProcess:
+    """
+    Runs one batch in a child process. ``run`` blocks (on a worker thread)
+    until the batch ends and returns the results; ``cancel`` may be called
+    from any thread. The child is spawned, not forked, so it never inherits
+    the GUI's threads.
+    """
+    def __init__(self, settings, file_list, factory=build_backend, on_pages=None, metrics=None):
+        self.settings = settings
+        self.file_list = list(file_list)
+        self.factory = factory
+        # Called as on_pages(page_total, indices, results) whenever pages finish
+        self.on_pages = on_pages
+        self.metrics = metrics or RemoteMetrics()
+        self._context = multiprocessing.get_context("spawn")
+        self._cancel_event = self._context.Event()
+        self.process = None
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        receiver, sender = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(
+            target=_engine_main, name="jain-digitizer-engine",
+            args=(self.settings, self.file_list, sender, self._cancel_event, self.factory),
+        )
+        self.process.start()
+        # Only the child writes; without this the pipe never reports EOF
+        sender.close()
+        logger.info(f"Started processing engine (pid {self.process.pid}) for {len(self.file_list)} files")
+
+        received = {}
+        results = None
+        try:
+            while results is None:
+                wait([receiver, self.process.sentinel])
+                if not receiver.poll():
+                    if not self.process.is_alive():
+                        raise RuntimeError(f"Processing engine exited unexpectedly (code {self.process.exitcode})")
+                    continue
+                try:
+                    kind, payload = decode_message(receiver.recv_bytes())
+                except EOFError:
+                    raise RuntimeError(f"Processing engine exited unexpectedly (code {self.process.exitcode})")
+                if kind == PAGES:
+                    page_total, indices, page_results = payload
+                    for idx, result in zip(indices, page_results):
+                        received[idx] = result
+                    if self.on_pages:
+                        self.on_pages(page_total, indices, page_results)
+                elif kind == METRICS:
+                    self.metrics.update(*payload)
+                elif kind == DONE:
+                    count, rest = payload
+                    for idx, result in rest.items():
+                        received[int(idx)] = result
+                    results = [received.get(idx) for idx in range(count)]
+                elif kind == ERROR:
+                    raise RuntimeError(payload)
+        finally:
+            receiver.close()
+            self.process.join(POLL_INTERVAL * 10)
+            if self.process.is_alive():
+                logger.warning("Processing engine did not exit; terminating it")
+                self.process.terminate()
+                self.process.join()
+        return results
@@ -0,0 +1,522 @@
+import html
+import os
+import re
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from xml.sax.saxutils import escape as xml_escape
+from jain_digitizer.common.logger_setup import logger
+
+# Output layouts: one language only, or Hindi and English side by side per page
+LAYOUTS = ("parallel", "hindi", "english")
+FORMATS = ("docx", "html", "epub", "md")
+
+INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+WHITESPACE_RE = re.compile(r"\s+")
+
+BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "li", "tr", "footer", "section"}
+FORMAT_TAGS = {"b": "b", "strong": "b", "i": "i", "em": "i", "u": "u"}
+
+
+# ---------------------------------------------------------------------------
+# HTML -> simple block model
+# ---------------------------------------------------------------------------
+
+class Block:
+    """A paragraph-level piece of a page: a kind (p, h1..h6, quote, li, hr) and formatted runs."""
+    def __init__(self, kind, runs=None):
+        self.kind = kind
+        # list of (text, frozenset of "b"/"i"/"u"); text "\n" is a line break
+        self.runs = runs or []
+
+    def text(self):
+        return "".join(text for text, _ in self.runs)
+
+
+class _BlockParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.current = None
+        self.formats = []
+        self.kinds = []
+        self.quote_depth = 0
+
+    def _flush(self):
+        if self.current and self.current.text().strip():
+            # Trim whitespace at the block edges
+            runs = self.current.runs
+            runs[0] = (runs[0][0].lstrip(), runs[0][1])
+            runs[-1] = (runs[-1][0].rstrip(), runs[-1][1])
+            self.blocks.append(self.current)
+        self.current = None
+
+    def _kind(self):
+        kind = self.kinds[-1] if self.kinds else "p"
+        if kind in ("p", "div", "footer", "section", "tr") and self.quote_depth:
+            return "quote"
+        return {"blockquote": "quote", "div": "p", "footer": "p", "section": "p", "tr": "p"}.get(kind, kind)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+            if tag == "blockquote":
+                self.quote_depth += 1
+            self.kinds.append(tag)
+        elif tag == "hr":
+            self._flush()
+            self.blocks.append(Block("hr"))
+        elif tag == "br":
+            self._add("\n")
+        elif tag in FORMAT_TAGS:
+            self.formats.append(FORMAT_TAGS[tag])
+        elif tag == "td" and self.current and self.current.text().strip():
+            self._add(" ")
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self._flush()
+            if tag == "blockquote":
+                self.quote_depth = max(self.quote_depth - 1, 0)
+            if tag in self.kinds:
+                # Pop back to the matching tag; tolerates unclosed children
+                while self.kinds and self.kinds.pop() != tag:
+                    pass
+        elif tag in FORMAT_TAGS and FORMAT_TAGS[tag] in self.formats:
+            self.formats.reverse()
+            self.formats.remove(FORMAT_TAGS[tag])
+            self.formats.reverse()
+
+    def handle_data(self, data):
+        text = WHITESPACE_RE.sub(" ", data)
+        if text.strip() or (self.current and text):
+            self._add(text)
+
+    def _add(self, text):
+        if self.current is None:
+            if not text.strip():
+                return
+            self.current = Block(self._kind())
+        self.current.runs.append((text, frozenset(self.formats)))
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_to_blocks(fragment):
+    """Parses a (possibly sloppy) HTML fragment into a list of ``Block``s."""
+    parser = _BlockParser()
+    parser.feed(fragment or "")
+    parser.close()
+    return parser.blocks
+
+
+def _xml_text(text):
+    return xml_escape(INVALID_XML_RE.sub("", text))
+
+
+def render_html(content):
+    """
+    Re-renders (possibly sloppy) model HTML as balanced, well-formed XHTML,
+    so one page's unclosed tags can't swallow the rest of the document.
+    """
+    out = []
+    for block in html_to_blocks(content):
+        if block.kind == "hr":
+            out.append("<hr/>")
+            continue
+        inner = []
+        for text, fmt in block.runs:
+            if text == "\n":
+                inner.append("<br/>")
+                continue
+            piece = _xml_text(text)
+            for flag in ("u", "i", "b"):
+                if flag in fmt:
+                    piece = f"<{flag}>{piece}</{flag}>"
+            inner.append(piece)
+        inner = "".join(inner)
+        if block.kind == "quote":
+            out.append(f"<blockquote><p>{inner}</p></blockquote>")
+        elif block.kind == "li":
+            out.append(f"<ul><li>{inner}</li></ul>")
+        else:
+            out.append(f"<{block.kind}>{inner}</{block.kind}>")
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Exporters
+# ---------------------------------------------------------------------------
+
+class BookExporter:
+    """
+    Base class for streaming exporters. Pages are written to disk as soon as
+    ``write_page`` is called, so memory use does not grow with the book.
+
+    Use as a context manager::
+
+        with get_exporter("book.docx", layout="parallel") as exporter:
+            for result in results:
+                exporter.write_page(result)
+    """
+    extension = None
+
+    def __init__(self, path, layout="parallel", title="Jain Digitizer"):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout '{layout}'. Expected one of: {', '.join(LAYOUTS)}")
+        self.path = path
+        self.layout = layout
+        self.title = title
+        self.page_count = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def write_page(self, result, label=None):
+        """Writes one page result (a dict with ``hindi_ocr``/``english_translation``)."""
+        self.page_count += 1
+        label = label or result.get("filename") or f"Page {self.page_count}"
+        if "error" in result:
+            hindi = english = f"<p>[ERROR processing {html.escape(label)}: {html.escape(str(result['error']))}]</p>"
+        else:
+            hindi = result.get("hindi_ocr", "")
+            english = result.get("english_translation", "")
+        self._write_page(hindi, english, label)
+
+    def _write_page(self, hindi, english, label):
+        raise NotImplementedError
+
+    def _columns(self, hindi, english):
+        """Returns the (lang, html) columns for the configured layout."""
+        if self.layout == "hindi":
+            return [("hi", hindi)]
+        if self.layout == "english":
+            return [("en", english)]
+        return [("hi", hindi), ("en", english)]
+
+
+class HtmlExporter(BookExporter):
+    extension = "html"
+
+    def open(self):
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write(
+            "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(self.title)}</title>"
+            "<style>body{font-family:'Noto Serif','Noto Serif Devanagari',serif;margin:2em;}"
+            "table.page{width:100%;table-layout:fixed;border-collapse:collapse;}"
+            "table.page td{vertical-align:top;padding:0 1em;width:50%;}"
+            "section.page{page-break-after:always;}</style>"
+            "</head><body>\n"
+        )
+
+    def _write_page(self, hindi, english, label):
+        columns = self._columns(hindi, english)
+        if len(columns) == 1:
+            lang, content = columns[0]
+            self.file.write(f"<section class='page' lang='{lang}'>{render_html(content)}</section>\n<hr/>\n")
+        else:
+            cells = "".join(f"<td lang='{lang}'>{render_html(content)}</td>" for lang, content in columns)
+            self.file.write(f"<section class='page'><table class='page'><tr>{cells}</tr></table></section>\n<hr/>\n")
+
+    def close(self):
+        self.file.write("</body></html>\n")
+        self.file.close()
+
+
+class MarkdownExporter(BookExporter):
+    """
+    Markdown has no columns, so the parallel layout interleaves the Hindi and
+    English text of each page.
+    """
+    extension = "md"
+
+    def open(self):
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write(f"# {self.title}\n\n")
+
+    def _write_page(self, hindi, english, label):
+        columns = self._columns(hindi, english)
+        for lang, content in columns:
+            if len(columns) > 1:
+                self.file.write("**Hindi**\n\n" if lang == "hi" else "**English**\n\n")
+            for block in html_to_blocks(content):
+                self.file.write(self._render(block) + "\n\n")
+        self.file.write("---\n\n")
+
+    def _render(self, block):
+        if block.kind == "hr":
+            return "---"
+        text = "".join(self._render_run(text, fmt) for text, fmt in block.runs)
+        if block.kind.startswith("h"):
+            return "#" * int(block.kind[1]) + " " + text.replace("\n", " ")
+        if block.kind == "quote":
+            return "\n".join("> " + line for line in text.split("\n"))
+        if block.kind == "li":
+            return "- " + text.replace("\n", " ")
+        return text.replace("\n", "  \n")
+
+    def _render_run(self, text, fmt):
+        if text == "\n" or not text.strip():
+            return text
+        stripped = text.strip()
+        if "b" in fmt:
+            stripped = f"**{stripped}**"
+        if "i" in fmt:
+            stripped = f"*{stripped}*"
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(text.rstrip()):]
+        return lead + stripped + trail
+
+    def close(self):
+        self.file.close()
+
+
+DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>
+</Types>"""
+
+DOCX_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+</Relationships>"""
+
+DOCX_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+DOCX_HEADING_SIZES = {1: 40, 2: 32, 3: 28, 4: 26, 5: 24, 6: 22}  # half-points
+
+
+def _docx_styles():
+    headings = "".join(
+        f'<w:style w:type="paragraph" w:styleId="Heading{level}"><w:name w:val="heading {level}"/>'
+        f'<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+        f'<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/><w:outlineLvl w:val="{level - 1}"/></w:pPr>'
+        f'<w:rPr><w:b/><w:bCs/><w:sz w:val="{size}"/><w:szCs w:val="{size}"/></w:rPr></w:style>'
+        for level, size in DOCX_HEADING_SIZES.items()
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        '<w:docDefaults><w:rPrDefault><w:rPr>'
+        '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman" w:cs="Nirmala UI"/>'
+        '<w:sz w:val="24"/><w:szCs w:val="24"/></w:rPr></w:rPrDefault>'
+        '<w:pPrDefault><w:pPr><w:spacing w:after="120"/></w:pPr></w:pPrDefault></w:docDefaults>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+        f'{headings}'
+        '<w:style w:type="paragraph" w:styleId="Quote"><w:name w:val="Quote"/><w:basedOn w:val="Normal"/>'
+        '<w:pPr><w:ind w:left="720" w:right="720"/></w:pPr><w:rPr><w:i/><w:iCs/></w:rPr></w:style>'
+        '<w:style w:type="paragraph" w:styleId="ListParagraph"><w:name w:val="List Paragraph"/>'
+        '<w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="720" w:hanging="360"/></w:pPr></w:style>'
+        '</w:styles>'
+    )
+
+
+class DocxExporter(BookExporter):
+    """
+    Writes a WordprocessingML package directly. ``word/document.xml`` is
+    streamed into the zip page by page instead of being built in memory.
+    """
+    extension = "docx"
+
+    def open(self):
+        self.zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.zip.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+        self.zip.writestr("_rels/.rels", DOCX_RELS)
+        self.zip.writestr("word/_rels/document.xml.rels", DOCX_DOCUMENT_RELS)
+        self.zip.writestr("word/styles.xml", _docx_styles())
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.zip.writestr("docProps/core.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+            f'<dc:title>{_xml_text(self.title)}</dc:title>'
+            f'<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+            '</cp:coreProperties>'
+        ))
+        self.document = self.zip.open("word/document.xml", "w", force_zip64=True)
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        )
+
+    def _write(self, text):
+        self.document.write(text.encode("utf-8"))
+
+    def _write_page(self, hindi, english, label):
+        if self.page_count > 1:
+            self._write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+        columns = self._columns(hindi, english)
+        if len(columns) == 1:
+            self._write(self._paragraphs(columns[0][1]))
+            return
+        cells = "".join(
+            f'<w:tc><w:tcPr><w:tcW w:w="2500" w:type="pct"/></w:tcPr>{self._paragraphs(content)}</w:tc>'
+            for _, content in columns
+        )
+        self._write(
+            '<w:tbl><w:tblPr><w:tblW w:w="5000" w:type="pct"/><w:tblLayout w:type="fixed"/></w:tblPr>'
+            '<w:tblGrid><w:gridCol w:w="4680"/><w:gridCol w:w="4680"/></w:tblGrid>'
+            f'<w:tr>{cells}</w:tr></w:tbl><w:p/>'
+        )
+
+    def _paragraphs(self, content):
+        paragraphs = [self._paragraph(block) for block in html_to_blocks(content)]
+        # A table cell must contain at least one paragraph
+        return "".join(paragraphs) or "<w:p/>"
+
+    def _paragraph(self, block):
+        if block.kind == "hr":
+            return ('<w:p><w:pPr><w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/>'
+                    '</w:pBdr></w:pPr></w:p>')
+        style = {"quote": "Quote", "li": "ListParagraph"}.get(block.kind)
+        if block.kind.startswith("h"):
+            style = f"Heading{block.kind[1]}"
+        props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        runs = []
+        if block.kind == "li":
+            runs.append('<w:r><w:t xml:space="preserve">• </w:t></w:r>')
+        for text, fmt in block.runs:
+            if text == "\n":
+                runs.append("<w:r><w:br/></w:r>")
+                continue
+            rpr = "".join(tag for flag, tag in (("b", "<w:b/><w:bCs/>"), ("i", "<w:i/><w:iCs/>"), ("u", '<w:u w:val="single"/>')) if flag in fmt)
+            rpr = f"<w:rPr>{rpr}</w:rPr>" if rpr else ""
+            runs.append(f'<w:r>{rpr}<w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r>')
+        return f"<w:p>{props}{''.join(runs)}</w:p>"
+
+    def close(self):
+        self._write(
+            '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+            '<w:pgMar w:top="1134" w:right="1134" w:bottom="1134" w:left="1134" w:header="709" w:footer="709" w:gutter="0"/>'
+            '</w:sectPr></w:body></w:document>'
+        )
+        self.document.close()
+        self.zip.close()
+
+
+class EpubExporter(BookExporter):
+    """
+    Writes an EPUB 3 book with one XHTML file per page. Pages are written to
+    the zip as they arrive; only the manifest entries are kept until close.
+    """
+    extension = "epub"
+
+    def open(self):
+        self.zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        # The mimetype entry must come first and be stored uncompressed
+        self.zip.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        self.zip.writestr("META-INF/container.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>'
+            '</container>'
+        ))
+        self.zip.writestr("OEBPS/style.css", (
+            "body{font-family:serif;} table.page{width:100%;table-layout:fixed;border-collapse:collapse;}"
+            "table.page td{vertical-align:top;padding:0 0.5em;width:50%;} blockquote{font-style:italic;}"
+        ))
+        self.pages = []
+
+    def _write_page(self, hindi, english, label):
+        name = f"page-{self.page_count:05d}.xhtml"
+        columns = self._columns(hindi, english)
+        if len(columns) == 1:
+            lang, content = columns[0]
+            body = f'<section lang="{lang}" xml:lang="{lang}">{render_html(content)}</section>'
+        else:
+            cells = "".join(
+                f'<td lang="{lang}" xml:lang="{lang}">{render_html(content)}</td>' for lang, content in columns
+            )
+            body = f'<table class="page"><tr>{cells}</tr></table>'
+        self.zip.writestr(f"OEBPS/{name}", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+            f'<head><meta charset="utf-8"/><title>{_xml_text(label)}</title>'
+            '<link rel="stylesheet" type="text/css" href="style.css"/></head>'
+            f'<body>{body}</body></html>'
+        ))
+        self.pages.append((name, label))
+
+    def close(self):
+        book_id = f"urn:uuid:{uuid.uuid4()}"
+        modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        manifest = "".join(
+            f'<item id="p{i}" href="{name}" media-type="application/xhtml+xml"/>' for i, (name, _) in enumerate(self.pages)
+        )
+        spine = "".join(f'<itemref idref="p{i}"/>' for i in range(len(self.pages)))
+        self.zip.writestr("OEBPS/content.opf", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="book-id">{book_id}</dc:identifier>'
+            f'<dc:title>{_xml_text(self.title)}</dc:title>'
+            f'<dc:language>{"en" if self.layout == "english" else "hi"}</dc:language>'
+            f'<meta property="dcterms:modified">{modified}</meta>'
+            '</metadata><manifest>'
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            '<item id="css" href="style.css" media-type="text/css"/>'
+            f'{manifest}</manifest><spine>{spine}</spine></package>'
+        ))
+        toc = "".join(f'<li><a href="{name}">{_xml_text(label)}</a></li>' for name, label in self.pages)
+        self.zip.writestr("OEBPS/nav.xhtml", (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+            f'<head><meta charset="utf-8"/><title>{_xml_text(self.title)}</title></head>'
+            f'<body><nav epub:type="toc"><h1>{_xml_text(self.title)}</h1><ol>{toc}</ol></nav></body></html>'
+        ))
+        self.zip.close()
+
+
+EXPORTERS = {
+    "docx": DocxExporter,
+    "html": HtmlExporter,
+    "epub": EpubExporter,
+    "md": MarkdownExporter,
+}
+
+
+def get_exporter(path, fmt=None, layout="parallel", title="Jain Digitizer"):
+    """Returns an exporter for ``fmt`` (inferred from the file extension if omitted)."""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    fmt = {"markdown": "md", "htm": "html"}.get(fmt, fmt)
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Expected one of: {', '.join(FORMATS)}")
+    return EXPORTERS[fmt](path, layout=layout, title=title)
+
+
+def export_book(results, path, fmt=None, layout="parallel", title="Jain Digitizer", labels=None):
+    """
+    Streams page results (any iterable, e.g. a generator reading from disk) to
+    ``path``. Returns the number of pages written.
+    """
+    labels = labels or []
+    with get_exporter(path, fmt, layout, title) as exporter:
+        for idx, result in enumerate(results):
+            if not result:
+                continue
+            exporter.write_page(result, labels[idx] if idx < len(labels) else None)
+    logger.info(f"Exported {exporter.page_count} pages to {path}")
+    return exporter.page_count
@@ -0,0 +1,79 @@
+"""
+Hedged requests: a request still running past the observed p95 latency of
+its size class gets a duplicate, and whichever answers first is used. The
+duplicates are capped by a budget, so the extra spend stays bounded.
+"""
+import threading
+from jain_digitizer.common.constants import DEFAULT_HEDGE_BUDGET
+from jain_digitizer.common.logger_setup import logger
+
+HEDGE_PERCENTILE = 95
+# Latency samples a size class needs before its requests are hedged
+MIN_SAMPLES = 10
+# Duplicates allowed before the budget has accrued any (lets short interactive batches hedge once)
+BURST = 1
+
+
+class HedgePolicy:
+    """
+    Decides when to hedge one batch's requests. At most ``budget`` duplicates
+    per request sent (plus ``burst``) are allowed. Thread-safe.
+    """
+    def __init__(self, metrics, budget=DEFAULT_HEDGE_BUDGET, percentile=HEDGE_PERCENTILE,
+                 min_samples=MIN_SAMPLES, burst=BURST):
+        self.metrics = metrics
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.burst = burst
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    def plan(self, label, pages):
+        """
+        Counts a request and returns its hedge (with ``after`` seconds), or
+        None while its size class has too few latency samples.
+        """
+        with self._lock:
+            self.requests += 1
+        after = self.metrics.latency_percentile(label, pages, self.percentile, self.min_samples)
+        return _Hedge(self, label, after) if after is not None else None
+
+    def acquire(self):
+        """Takes one duplicate from the budget; False once it's spent."""
+        with self._lock:
+            if self.hedges >= self.budget * self.requests + self.burst:
+                return False
+            self.hedges += 1
+            return True
+
+    def record(self, label, won):
+        with self._lock:
+            self.wins += int(won)
+        self.metrics.record_hedge(label, won)
+
+    def snapshot(self):
+        with self._lock:
+            return {"requests": self.requests, "hedges": self.hedges, "wins": self.wins}
+
+    def log_summary(self):
+        stats = self.snapshot()
+        if stats["hedges"]:
+            logger.info(f"Hedged {stats['hedges']} of {stats['requests']} requests; "
+                        f"the duplicate answered first {stats['wins']} times")
+
+
+class _Hedge:
+    """One request's hedge, as used by ``run_hedged``."""
+    def __init__(self, policy, label, after):
+        self.policy = policy
+        self.label = label
+        self.after = after
+
+    def acquire(self):
+        return self.policy.acquire()
+
+    def record(self, won):
+        self.policy.record(self.label, won)
@@ -0,0 +1,151 @@
+"""
+Small image helpers built on PyMuPDF: downscaled grayscale previews of page
+images and their ink density (the share of dark pixels), used to send pages
+at a lower resolution first and to sanity-check what comes back, and a
+local classifier that spots blank and picture-only pages before any API call.
+"""
+import os
+import tempfile
+from jain_digitizer.common.constants import DEFAULT_RASTER_QUALITY, DEFAULT_RASTER_CACHE
+from jain_digitizer.common.ingestion import read_file
+from jain_digitizer.common.stage_cache import cache_key
+
+try:
+    import pymupdf
+    IMAGING_AVAILABLE = True
+except ImportError:
+    IMAGING_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Gray levels below this count as ink
+INK_THRESHOLD = 128
+# Pixel values that count as ink, deleted in one C-level pass to count them
+_INK_BYTES = bytes(range(INK_THRESHOLD))
+# Image types PyMuPDF decodes reliably
+PREVIEW_TYPES = ("image/jpeg", "image/png", "image/tiff", "image/bmp")
+
+# Page classification works on a copy this many pixels on its long side
+CLASSIFY_SIZE = 256
+# Share of each side ignored as scanner margin (dark bed edges, book gutter)
+CLASSIFY_MARGIN = 0.08
+# Gray levels darker than the paper by this much count as ink
+INK_CONTRAST = 64
+# Gray-level steps between neighbouring pixels this large count as an edge
+EDGE_STEP = 40
+# Below both, a page is blank (specks and show-through stay under them)
+BLANK_INK = 0.003
+BLANK_EDGES = 0.005
+# Pages with this much ink but few edges per inked pixel are pictures
+# (photos, plates); printed text pages measure 0.5-1.0 edges per ink pixel
+PICTURE_INK = 0.15
+PICTURE_EDGES_PER_INK = 0.15
+
+
+def _decode(data):
+    pix = pymupdf.Pixmap(data)
+    return pymupdf.Pixmap(pix, 0) if pix.alpha else pix
+
+
+def _to_gray(pix):
+    return pix if pix.n == 1 else pymupdf.Pixmap(pymupdf.csGRAY, pix)
+
+
+def _gray(data):
+    return _to_gray(_decode(data))
+
+
+def _thumbnail(data, size):
+    """
+    A grayscale copy of an encoded image at most ``size`` pixels on its long
+    side. MuPDF renders it at the reduced size (e.g. JPEGs are decoded
+    subsampled), which is about twice as fast as decoding in full.
+    """
+    with pymupdf.open(stream=data) as doc:
+        rect = doc[0].rect
+        zoom = min(size / max(rect.width, rect.height), 1.0) if rect.width and rect.height else 1.0
+        return doc[0].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), colorspace=pymupdf.csGRAY, alpha=False)
+
+
+def _ink(pix):
+    samples = pix.samples
+    if not samples:
+        return 0.0
+    return (len(samples) - len(samples.translate(None, _INK_BYTES))) / len(samples)
+
+
+def ink_density(data):
+    """Share of dark pixels in an encoded image (0 = blank, 1 = solid black)."""
+    return _ink(_gray(data))
+
+
+def downscale(data, scale, quality=DEFAULT_RASTER_QUALITY):
+    """Returns an encoded image shrunk by ``scale`` (0..1) as a grayscale JPEG."""
+    pix = _decode(data)
+    width, height = max(int(pix.width * scale), 1), max(int(pix.height * scale), 1)
+    if (width, height) != (pix.width, pix.height):
+        pix = pymupdf.Pixmap(pix, width, height, None)
+    # Converted after scaling, on a fraction of the pixels
+    return _to_gray(pix).tobytes("jpeg", jpg_quality=quality)
+
+
+def load_preview(source, scale, quality=DEFAULT_RASTER_QUALITY, cache_dir=DEFAULT_RASTER_CACHE):
+    """
+    Returns ``(jpeg_bytes, ink_density)`` of the downscaled preview of a
+    ``PageSource``, or None if it isn't an image that can be previewed.
+    Previews are cached on disk next to rendered PDF pages, keyed by the
+    source digest and preview settings.
+    """
+    if not IMAGING_AVAILABLE or source.mime_type not in PREVIEW_TYPES:
+        return None
+    digest = cache_key(source.digest(), f"preview-{scale}-{quality}")
+    path = os.path.join(cache_dir, digest[:2], f"{digest}-preview.jpg")
+    if os.path.exists(path):
+        data = read_file(path)
+        return data, ink_density(data)
+
+    data = downscale(source.load(), scale, quality)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Chunks run on several threads, so each writer gets its own temp file
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    # Measured on the preview itself, so a cached preview gives the same answer
+    return data, ink_density(data)
+
+
+def page_features(data, size=CLASSIFY_SIZE):
+    """
+    Returns ``(ink, edges)`` of an encoded page image: the share of pixels
+    darker than the paper, and the share on a sharp gray-level step. Both
+    are read off darkness and gradient histograms of a small copy.
+    """
+    pix = _thumbnail(data, size)
+    gray = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].astype(np.int16)
+    dy, dx = int(gray.shape[0] * CLASSIFY_MARGIN), int(gray.shape[1] * CLASSIFY_MARGIN)
+    gray = gray[dy:gray.shape[0] - dy, dx:gray.shape[1] - dx]
+    if gray.size < 4:
+        return 0.0, 0.0
+
+    # Paper is the light end of the page, whatever its tint
+    paper = np.percentile(gray, 90)
+    darkness = np.bincount(np.clip(paper - gray, 0, 255).astype(np.intp).ravel(), minlength=256)
+    step = np.maximum(np.abs(np.diff(gray, axis=1))[:-1], np.abs(np.diff(gray, axis=0))[:, :-1])
+    gradients = np.bincount(step.ravel(), minlength=256)
+    return (float(darkness[INK_CONTRAST:].sum() / darkness.sum()),
+            float(gradients[EDGE_STEP:].sum() / gradients.sum()))
+
+
+def classify_page(data):
+    """Returns "blank", "picture" or "text" for an encoded page image."""
+    ink, edges = page_features(data)
+    if ink < BLANK_INK and edges < BLANK_EDGES:
+        return "blank"
+    if ink >= PICTURE_INK and edges < ink * PICTURE_EDGES_PER_INK:
+        return "picture"
+    return "text"
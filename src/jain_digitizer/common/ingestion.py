@@ -0,0 +1,157 @@
+import hashlib
+import mmap
+import os
+import sys
+import tempfile
+from jain_digitizer.common.logger_setup import logger
+
+# Chunks still accepting files while packing by output tokens
+OPEN_CHUNKS = 4
+
+
+def read_file(path):
+    """
+    Reads a file through a read-only memory map so the only resident copy is
+    the ``bytes`` object handed to the API request.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:]
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """SHA-256 of a file, read in blocks so large PDFs are never fully resident."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def spill_to_disk(data, directory, suffix="", block_size=1024 * 1024):
+    """
+    Writes ``data`` (bytes or any buffer, e.g. an upload's ``getbuffer()``)
+    to a new temp file in ``directory``, hashing it on the way, without
+    copying it in memory. Returns ``(path, sha256 hex digest)``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    h = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f, memoryview(data) as view:
+            view = view.cast("B")
+            for start in range(0, len(view), block_size):
+                block = view[start:start + block_size]
+                h.update(block)
+                f.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, h.hexdigest()
+
+
+def plan_chunks(sizes, max_files=None, memory_budget=None):
+    """
+    Groups file indices into request chunks, in order, so that no chunk holds
+    more than ``max_files`` files or more than ``memory_budget`` bytes.
+
+    A single file larger than the budget is sent on its own.
+    """
+    chunks = []
+    current = []
+    current_bytes = 0
+    for idx, size in enumerate(sizes):
+        over_count = max_files and len(current) >= max_files
+        over_budget = memory_budget and current and current_bytes + size > memory_budget
+        if over_count or over_budget:
+            chunks.append(current)
+            current = []
+            current_bytes = 0
+        if memory_budget and size > memory_budget:
+            logger.warning(f"File {idx+1} ({size} bytes) exceeds the memory budget of {memory_budget} bytes; sending it alone")
+        current.append(idx)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_chunks(sizes, token_estimates, token_budget, max_files=None, memory_budget=None, open_chunks=OPEN_CHUNKS):
+    """
+    Bin-packs file indices into request chunks so that no chunk's estimated
+    output exceeds ``token_budget`` tokens, nor ``max_files`` files or
+    ``memory_budget`` bytes.
+
+    Each file goes into the first of the last ``open_chunks`` chunks it fits
+    in (bounded first fit), so small pages fill gaps left by large ones while
+    chunks stay close to reading order. A file over a limit on its own is
+    sent alone.
+    """
+    chunks = []
+    for idx, (size, tokens) in enumerate(zip(sizes, token_estimates)):
+        if token_budget and tokens > token_budget:
+            logger.warning(f"File {idx+1} (~{tokens} output tokens) exceeds the output budget of {token_budget} tokens; sending it alone")
+        for chunk in chunks[-open_chunks:]:
+            if max_files and len(chunk["files"]) >= max_files:
+                continue
+            if memory_budget and chunk["bytes"] + size > memory_budget:
+                continue
+            if token_budget and chunk["tokens"] + tokens > token_budget:
+                continue
+            break
+        else:
+            chunk = {"files": [], "bytes": 0, "tokens": 0}
+            chunks.append(chunk)
+        chunk["files"].append(idx)
+        chunk["bytes"] += size
+        chunk["tokens"] += tokens
+    return [chunk["files"] for chunk in chunks]
+
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of this process, or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PageSource:
+    """
+    One input file for a translation request. File data is only loaded when
+    ``load()`` is called, i.e. when the chunk containing it is sent.
+    """
+    def __init__(self, filename, mime_type, size, loader, digester=None):
+        self.filename = filename
+        self.mime_type = mime_type
+        self.size = size
+        self._loader = loader
+        self._digester = digester
+        self._digest = None
+        # 1-based page number when the source is one page of a rasterized PDF
+        self.page = None
+
+    def load(self):
+        return self._loader()
+
+    def digest(self):
+        """SHA-256 of the file data, computed once without keeping the data around."""
+        if self._digest is None:
+            self._digest = self._digester() if self._digester else hashlib.sha256(self.load()).hexdigest()
+        return self._digest
+
+    @classmethod
+    def from_path(cls, path, mime_type, filename=None, digest=None):
+        source = cls(filename or os.path.basename(path), mime_type, os.path.getsize(path),
+                     lambda: read_file(path), lambda: file_digest(path))
+        source._digest = digest
+        return source
+
+    @classmethod
+    def from_bytes(cls, data, filename, mime_type):
+        return cls(filename, mime_type, len(data), lambda: data)
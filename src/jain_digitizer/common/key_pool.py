@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from jain_digitizer.common.logger_setup import logger
+
+# First cooldown after a key is throttled; doubles on each consecutive throttle
+DEFAULT_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+# Consecutive non-quota failures before a key is rested as well
+ERROR_THRESHOLD = 3
+# How often a caller waiting for a key re-checks for cancellation (seconds)
+POLL_INTERVAL = 0.1
+
+THROTTLED = "throttled"
+INVALID = "invalid"
+ERROR = "error"
+
+
+def parse_keys(text):
+    """Splits a settings value holding one or more keys (comma, space or newline separated)."""
+    if isinstance(text, (list, tuple)):
+        return [k for k in text if k]
+    seen = []
+    for key in re.split(r"[\s,;]+", text or ""):
+        if key and key not in seen:
+            seen.append(key)
+    return seen
+
+
+def mask_key(key):
+    """Shows only the last four characters, for logs and stats."""
+    return f"…{key[-4:]}" if len(key) > 4 else "…"
+
+
+def classify_error(error):
+    """Sorts an API exception into THROTTLED (quota/rate limit), INVALID (bad key) or ERROR."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    text = str(error)
+    if code == 429 or "RESOURCE_EXHAUSTED" in text:
+        return THROTTLED
+    if code in (401, 403) or "API_KEY_INVALID" in text or "PERMISSION_DENIED" in text:
+        return INVALID
+    return ERROR
+
+
+class _KeyState:
+    def __init__(self, key):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self.disabled = False
+
+
+class KeyPool:
+    """
+    Spreads requests over several API keys. Each ``acquire`` hands out the
+    ready key with the fewest requests in flight; keys that hit their quota
+    rest for an exponentially growing cooldown, and rejected keys are
+    dropped. Thread-safe.
+    """
+    def __init__(self, keys, cooldown=DEFAULT_COOLDOWN, max_cooldown=MAX_COOLDOWN,
+                 error_threshold=ERROR_THRESHOLD, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.error_threshold = error_threshold
+        self.clock = clock
+        self._states = {key: _KeyState(key) for key in parse_keys(keys)}
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self._states)
+
+    def usable(self):
+        """Number of keys that haven't been rejected."""
+        with self._cond:
+            return sum(1 for s in self._states.values() if not s.disabled)
+
+    def acquire(self, cancel_token=None):
+        """Returns a key to use, waiting while every key is cooling down."""
+        with self._cond:
+            while True:
+                usable = [s for s in self._states.values() if not s.disabled]
+                if not usable:
+                    raise ValueError("No usable Gemini API key (all keys were rejected).")
+                now = self.clock()
+                ready = [s for s in usable if s.cooldown_until <= now]
+                if ready:
+                    state = min(ready, key=lambda s: (s.in_flight, s.last_used))
+                    state.in_flight += 1
+                    state.requests += 1
+                    state.last_used = now
+                    return state.key
+                wait = min(s.cooldown_until for s in usable) - now
+                self._cond.wait(min(wait, POLL_INTERVAL))
+                if cancel_token is not None:
+                    cancel_token.check()
+
+    def release(self, key, error=None):
+        """
+        Returns ``key`` to the pool after a request. Pass the exception if the
+        request failed; returns its classification (None on success).
+        """
+        kind = classify_error(error) if error is not None else None
+        with self._cond:
+            state = self._states[key]
+            state.in_flight = max(state.in_flight - 1, 0)
+            if kind is None:
+                state.consecutive_failures = 0
+            elif kind == INVALID:
+                state.disabled = True
+                state.errors += 1
+                logger.error(f"API key {mask_key(key)} was rejected and is removed from the pool: {error}")
+            else:
+                state.consecutive_failures += 1
+                if kind == THROTTLED:
+                    state.throttled += 1
+                else:
+                    state.errors += 1
+                if kind == THROTTLED or state.consecutive_failures >= self.error_threshold:
+                    cooldown = min(self.cooldown * 2 ** (state.consecutive_failures - 1), self.max_cooldown)
+                    state.cooldown_until = self.clock() + cooldown
+                    logger.warning(f"API key {mask_key(key)} {kind}; resting it for {cooldown:g}s")
+            self._cond.notify_all()
+        return kind
+
+    def snapshot(self):
+        """Per-key counters keyed by the masked key."""
+        with self._cond:
+            now = self.clock()
+            return {
+                mask_key(s.key): {
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "throttled": s.throttled,
+                    "in_flight": s.in_flight,
+                    "cooling_down": round(max(s.cooldown_until - now, 0.0), 1),
+                    "disabled": s.disabled,
+                }
+                for s in self._states.values()
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(keys):
+    """
+    Returns the process-wide pool for this set of keys, so quota state
+    carries over between batches (each batch creates a new Translator).
+    """
+    keys = tuple(parse_keys(keys))
+    with _pools_lock:
+        if keys not in _pools:
+            _pools[keys] = KeyPool(keys)
+        return _pools[keys]
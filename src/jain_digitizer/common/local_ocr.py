@@ -0,0 +1,156 @@
+"""
+Offline OCR with Tesseract, run in a process pool.
+
+Needs the ``tesseract`` binary with the Hindi (``hin``) and Sanskrit
+(``san``) language data, plus ``pip install pytesseract Pillow``. The local
+engine only transcribes; it doesn't translate.
+"""
+import html
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from jain_digitizer.common.backend import OCRBackend
+from jain_digitizer.common.constants import DEFAULT_RASTER_DPI
+from jain_digitizer.common.logger_setup import logger
+
+try:
+    import pytesseract
+    from PIL import Image
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+DEFAULT_LANGUAGES = os.environ.get("TESSERACT_LANG", "hin+san")
+# Mean word confidence (0-100) a page needs for its local OCR to be trusted
+DEFAULT_MIN_CONFIDENCE = float(os.environ.get("LOCAL_OCR_MIN_CONFIDENCE", "80"))
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def text_to_html(text):
+    """Wraps plain OCR text in paragraphs (blank-line separated), keeping line breaks."""
+    paragraphs = [p for p in text.split("\n\n") if p.strip()]
+    return "".join(
+        "<p>" + "<br/>".join(html.escape(line) for line in p.strip().splitlines()) + "</p>"
+        for p in paragraphs
+    )
+
+
+def ocr_image(data, languages=DEFAULT_LANGUAGES):
+    """Runs Tesseract on one image. Returns (text, mean word confidence 0-100)."""
+    image = Image.open(io.BytesIO(data))
+    ocr = pytesseract.image_to_data(image, lang=languages, output_type=pytesseract.Output.DICT)
+
+    lines = {}
+    confidences = []
+    for i, word in enumerate(ocr["text"]):
+        if not word.strip():
+            continue
+        conf = float(ocr["conf"][i])
+        if conf >= 0:
+            confidences.append(conf)
+        lines.setdefault((ocr["block_num"][i], ocr["par_num"][i], ocr["line_num"][i]), []).append(word)
+
+    text, previous = [], None
+    for (block, par, _), words in sorted(lines.items()):
+        if previous is not None and previous != (block, par):
+            text.append("")
+        text.append(" ".join(words))
+        previous = (block, par)
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return "\n".join(text), confidence
+
+
+def _ocr_job(data, mime_type, languages):
+    """Process-pool entry point. Returns (text, confidence, error)."""
+    if mime_type == "application/pdf":
+        return None, 0.0, "Local OCR reads images only"
+    try:
+        text, confidence = ocr_image(data, languages)
+        return text, confidence, None
+    except Exception as e:
+        return None, 0.0, str(e)
+
+
+class TesseractBackend(OCRBackend):
+    """
+    Local OCR backend. Pages are recognized in a pool of worker processes
+    (``workers <= 1`` runs inline); only a few pages per worker are loaded
+    at a time.
+    """
+    name = "tesseract"
+
+    def __init__(self, languages=DEFAULT_LANGUAGES, workers=DEFAULT_WORKERS,
+                 min_confidence=DEFAULT_MIN_CONFIDENCE, progress_callback=None, cancel_token=None,
+                 raster_dpi=DEFAULT_RASTER_DPI):
+        super().__init__(progress_callback, cancel_token, raster_dpi)
+        self.languages = languages
+        self.workers = workers
+        self.min_confidence = min_confidence
+
+    def _check_ready(self):
+        if not TESSERACT_AVAILABLE:
+            raise RuntimeError("Local OCR needs pytesseract and Pillow (pip install pytesseract Pillow) "
+                               "and the tesseract binary with Hindi/Sanskrit language data.")
+
+    def recognize(self, sources, indices=None, on_page=None):
+        """
+        OCRs ``sources`` (or only ``indices``). Returns {index: (text, confidence, error)}.
+        ``on_page(index, page)`` is called as each page finishes.
+        """
+        indices = list(range(len(sources))) if indices is None else list(indices)
+        pages = {}
+        started = time.perf_counter()
+
+        def finish(idx, page):
+            pages[idx] = page
+            if on_page:
+                on_page(idx, page)
+
+        if self.workers <= 1:
+            for idx in indices:
+                if self.cancel_token.cancelled:
+                    break
+                finish(idx, _ocr_job(sources[idx].load(), sources[idx].mime_type, self.languages))
+        else:
+            pending = {}
+            queue = iter(indices)
+            with ProcessPoolExecutor(self.workers) as pool:
+                while True:
+                    # Keep two pages per worker in flight so file data is loaded just in time
+                    while len(pending) < self.workers * 2 and not self.cancel_token.cancelled:
+                        idx = next(queue, None)
+                        if idx is None:
+                            break
+                        pending[pool.submit(_ocr_job, sources[idx].load(), sources[idx].mime_type, self.languages)] = idx
+                    if not pending:
+                        break
+                    done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(pending.pop(future), future.result())
+                    if self.cancel_token.cancelled:
+                        for future in pending:
+                            future.cancel()
+                        break
+
+        logger.info(f"Local OCR: {len(pages)} pages in {time.perf_counter() - started:.2f}s ({self.workers} workers)")
+        return pages
+
+    def to_result(self, page):
+        text, confidence, error = page
+        if error or not text:
+            return {"error": error or "Local OCR found no text", "ocr_confidence": round(confidence, 1)}
+        return {
+            "hindi_ocr": text_to_html(text),
+            "english_translation": "",
+            "ocr_confidence": round(confidence, 1),
+            "backend": self.name,
+        }
+
+    def _translate_sources(self, sources):
+        def on_page(idx, page):
+            self._report_progress([idx], [self.to_result(page)])
+
+        pages = self.recognize(sources, on_page=on_page)
+        return [self.to_result(pages[idx]) if idx in pages else self._cancelled_result()
+                for idx in range(len(sources))]
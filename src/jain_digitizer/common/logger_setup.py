@@ -1,11 +1,82 @@
+import atexit
+import gzip
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from rich.logging import RichHandler
 
+# Maximum number of characters of a payload (e.g. a raw model response) that
+# goes into the regular log. Set LOG_RAW_RESPONSES=1 to keep the full text in
+# a gzip-compressed sidecar file next to app.log.
+PAYLOAD_LIMIT = int(os.environ.get("LOG_PAYLOAD_LIMIT", "2000"))
+RAW_RESPONSES_ENABLED = os.environ.get("LOG_RAW_RESPONSES", "").lower() in ("1", "true", "yes")
+
+_listeners = {}
+
+
+class CompressedPayloadHandler(logging.Handler):
+    """
+    Appends the full payload attached to a record (``extra={"payload": ...}``)
+    as a JSON line to a gzip-compressed sidecar file.
+    """
+    def __init__(self, filename):
+        super().__init__(logging.DEBUG)
+        self.filename = filename
+        self.stream = None
+
+    def emit(self, record):
+        payload = getattr(record, "payload", None)
+        if payload is None:
+            return
+        try:
+            if self.stream is None:
+                self.stream = gzip.open(self.filename, "at", encoding="utf-8")
+            entry = {"time": record.created, "message": record.getMessage(), "payload": payload}
+            self.stream.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+
+def truncate_payload(text, limit=None):
+    """Shortens a large payload for logging, noting how much was dropped."""
+    limit = PAYLOAD_LIMIT if limit is None else limit
+    if text is None:
+        return ""
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def log_payload(message, payload, level=logging.DEBUG, log=None):
+    """
+    Logs a truncated preview of ``payload``. The full payload rides along on the
+    record and is only written out by the sidecar handler, off the calling thread.
+    """
+    log = log or logger
+    if not log.isEnabledFor(level):
+        return
+    log.log(level, f"{message}: {truncate_payload(payload)}", extra={"payload": payload}, stacklevel=2)
+
+
 def setup_logger(name="jain_digitizer"):
     """
     Configures a centralized logger with both console (Rich) and file handlers.
+
+    The handlers run on a background ``QueueListener`` thread so that logging
+    never blocks the caller on console rendering or disk I/O.
     """
     # Create logs directory if it doesn't exist
     log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
@@ -37,11 +108,22 @@ def setup_logger(name="jain_digitizer"):
     )
     file_handler.setFormatter(file_formatter)
 
-    logger.addHandler(rich_handler)
-    logger.addHandler(file_handler)
+    handlers = [rich_handler, file_handler]
+
+    # 3. Optional compressed sidecar for full raw payloads
+    if RAW_RESPONSES_ENABLED:
+        handlers.append(CompressedPayloadHandler(os.path.join(log_dir, "raw_responses.jsonl.gz")))
+
+    # The logger itself only enqueues records; the listener thread does the work.
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    _listeners[name] = listener
+
+    logger.addHandler(QueueHandler(log_queue))
 
     return logger
 
 # Create a default instance
 logger = setup_logger()
-
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Latency samples kept per label for percentile estimates
+LATENCY_WINDOW = 500
+# Seconds of finished pages used for the live pages-per-minute rate
+THROUGHPUT_WINDOW = 60
+
+
+def size_class(pages):
+    """Buckets a request by its page count (1, 2-3, 4-7, 8+) so latencies compare like with like."""
+    if pages <= 1:
+        return "1"
+    if pages <= 3:
+        return "2-3"
+    if pages <= 7:
+        return "4-7"
+    return "8+"
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (0 < pct <= 100), or None if empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return round(ordered[min(rank, len(ordered) - 1)], 4)
+
+
+class _LabelStats:
+    def __init__(self):
+        self.requests = 0
+        self.pages = 0
+        self.errors = 0
+        self.escalations = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.class_latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+
+class RequestMetrics:
+    """
+    Thread-safe, in-process counters for API requests, grouped by a label
+    such as the model tier that served them.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = defaultdict(_LabelStats)
+        self._caches = defaultdict(lambda: [0, 0])
+        self._skipped = defaultdict(int)
+        # (time, pages) of recently finished pages, for the live throughput
+        self._finished = deque()
+
+    def record_request(self, label, pages, latency, prompt_tokens=0, output_tokens=0, error=False):
+        with self._lock:
+            stats = self._stats[label]
+            stats.requests += 1
+            stats.pages += pages
+            stats.errors += int(error)
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.output_tokens += output_tokens or 0
+            stats.latencies.append(latency)
+            stats.class_latencies[size_class(pages)].append(latency)
+
+    @contextmanager
+    def in_flight(self, label):
+        """Counts a ``label`` request as in flight for the duration of the block."""
+        with self._lock:
+            self._stats[label].in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stats[label].in_flight -= 1
+
+    def record_api_error(self, label, throttled=False, retried=False):
+        """Counts a failed ``label`` request: ``throttled`` for quota errors (HTTP 429), ``retried`` if it was re-sent."""
+        with self._lock:
+            stats = self._stats[label]
+            stats.throttled += int(throttled)
+            stats.retries += int(retried)
+
+    def record_cache(self, name, hit, count=1):
+        """Counts ``count`` lookups in the ``name`` cache (e.g. OCR or translation stage)."""
+        with self._lock:
+            self._caches[name][0 if hit else 1] += count
+
+    def record_skipped(self, page_type, pages=1):
+        """Counts pages answered locally (e.g. blank pages) without an API call."""
+        with self._lock:
+            self._skipped[page_type] += pages
+
+    def skipped(self):
+        with self._lock:
+            return dict(self._skipped)
+
+    def record_pages_done(self, pages):
+        with self._lock:
+            now = self.clock()
+            self._finished.append((now, pages))
+            while self._finished and self._finished[0][0] < now - THROUGHPUT_WINDOW:
+                self._finished.popleft()
+
+    def pages_per_minute(self):
+        """Pages finished over the last THROUGHPUT_WINDOW seconds, as a per-minute rate."""
+        with self._lock:
+            cutoff = self.clock() - THROUGHPUT_WINDOW
+            pages = sum(n for t, n in self._finished if t >= cutoff)
+        return pages * 60 / THROUGHPUT_WINDOW
+
+    def caches(self):
+        """Per-cache hits, misses and hit rate."""
+        with self._lock:
+            return {
+                name: {"hits": hits, "misses": misses,
+                       "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+                for name, (hits, misses) in self._caches.items()
+            }
+
+    def record_escalation(self, label, pages=1):
+        """Counts pages from ``label`` that had to be re-sent to a stronger tier."""
+        with self._lock:
+            self._stats[label].escalations += pages
+
+    def record_hedge(self, label, won):
+        """Counts a duplicate request sent for a slow ``label`` request, and whether it finished first."""
+        with self._lock:
+            stats = self._stats[label]
+            stats.hedges += 1
+            stats.hedge_wins += int(won)
+
+    def latency_percentile(self, label, pages, pct, min_samples=1):
+        """Latency percentile of ``label`` requests in the size class of ``pages``; None with too few samples."""
+        with self._lock:
+            stats = self._stats.get(label)
+            samples = list(stats.class_latencies.get(size_class(pages), ())) if stats else []
+        return percentile(samples, pct) if len(samples) >= min_samples else None
+
+    def snapshot(self):
+        """Returns a plain dict of per-label stats, safe to serialize or display."""
+        with self._lock:
+            report = {}
+            for label, stats in self._stats.items():
+                latencies = list(stats.latencies)
+                report[label] = {
+                    "requests": stats.requests,
+                    "pages": stats.pages,
+                    "errors": stats.errors,
+                    "escalations": stats.escalations,
+                    "escalation_rate": round(stats.escalations / stats.pages, 4) if stats.pages else 0.0,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "output_tokens": stats.output_tokens,
+                    "latency_p50": percentile(latencies, 50),
+                    "latency_p95": percentile(latencies, 95),
+                    "latency_p99": percentile(latencies, 99),
+                    "hedges": stats.hedges,
+                    "hedge_wins": stats.hedge_wins,
+                    "in_flight": stats.in_flight,
+                    "retries": stats.retries,
+                    "throttled": stats.throttled,
+                }
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._caches.clear()
+            self._skipped.clear()
+            self._finished.clear()
+
+
+# Process-wide metrics shared by every Translator
+default_metrics = RequestMetrics()
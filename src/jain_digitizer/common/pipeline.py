@@ -0,0 +1,290 @@
+import html
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google.genai import types
+from jain_digitizer.common.translator import Translator, SKIPPED_PAGES
+from jain_digitizer.common.constants import OCR_PROMPT, TRANSLATION_PROMPT, DEFAULT_STAGE_CACHE
+from jain_digitizer.common.context_cache import prompt_digest
+from jain_digitizer.common.stage_cache import StageCache, cache_key
+from jain_digitizer.common.cancellation import OperationCancelled, RequestTimeout
+from jain_digitizer.common.local_ocr import TesseractBackend, text_to_html
+from jain_digitizer.common.logger_setup import logger
+
+
+# Page type of each blank/picture placeholder, which stands in for a skipped page's OCR text
+PAGE_TYPES = {placeholder: page_type for page_type, placeholder in SKIPPED_PAGES.items()}
+
+
+class TwoStageTranslator(Translator):
+    """
+    Runs OCR and translation as separate stages, each with its own prompt,
+    cache and worker pool. Translation works from the cached OCR text, so a
+    changed translation prompt re-runs only the text-only translation stage,
+    with no image uploads. Pages move on to translation as soon as their OCR
+    chunk returns, so the two stages overlap.
+    """
+    def __init__(self, api_key, ocr_prompt=OCR_PROMPT, translation_prompt=TRANSLATION_PROMPT,
+                 cache=None, ocr_workers=2, translation_workers=4, translation_chunk_size=4, **kwargs):
+        super().__init__(api_key, ocr_prompt, **kwargs)
+        self.ocr_prompt = ocr_prompt
+        self.translation_prompt = translation_prompt
+        self.cache = cache or StageCache(DEFAULT_STAGE_CACHE)
+        self.ocr_workers = ocr_workers
+        self.translation_workers = translation_workers
+        self.translation_chunk_size = translation_chunk_size
+
+    def translate_ocr(self, ocr_results):
+        """
+        Translates existing OCR results (dicts with ``hindi_ocr``) without
+        touching the images, e.g. after the translation prompt changed.
+        """
+        self._check_api_key()
+        ocr_texts = [r.get("hindi_ocr") if r and "error" not in r else None for r in ocr_results]
+        translations = {}
+        with ThreadPoolExecutor(self.translation_workers) as pool:
+            futures = [pool.submit(self._translation_stage, chunk, ocr_texts, None)
+                       for chunk in self._translation_chunks([i for i, t in enumerate(ocr_texts) if t], ocr_texts)]
+            for future in as_completed(futures):
+                chunk_translations = future.result()
+                translations.update(chunk_translations)
+                indices = sorted(chunk_translations)
+                self._report_progress(indices, [self._merge_page(ocr_results[idx], ocr_texts[idx], chunk_translations[idx])
+                                                for idx in indices])
+        self._mark_cancelled(ocr_texts, translations)
+        return self._merge(ocr_results, ocr_texts, translations)
+
+    def _translate_sources(self, sources):
+        ocr_texts = [None] * len(sources)
+        ocr_errors = {}
+        translations = {}
+        ocr_model_key = f"{self.model}:{prompt_digest(self.ocr_prompt)}"
+
+        # OCR cache lookups only need a streamed digest of each file, not an upload
+        ocr_keys = [cache_key(src.digest(), ocr_model_key) for src in sources]
+        for idx, key in enumerate(ocr_keys):
+            ocr_texts[idx] = self.cache.get("ocr", key)
+            if ocr_texts[idx] in PAGE_TYPES:
+                # Never reuse a blank/picture placeholder: the filter may be off now, or have been wrong
+                ocr_texts[idx] = None
+            self.metrics.record_cache("ocr", ocr_texts[idx] is not None)
+        misses = [idx for idx, text in enumerate(ocr_texts) if text is None]
+        logger.info(f"OCR cache: {len(sources) - len(misses)} hits, {len(misses)} misses")
+
+        if misses:
+            for idx, text in self._local_ocr(sources, misses).items():
+                ocr_texts[idx] = text
+            misses = [idx for idx in misses if ocr_texts[idx] is None]
+
+        with ThreadPoolExecutor(self.ocr_workers) as ocr_pool, \
+                ThreadPoolExecutor(self.translation_workers) as translation_pool:
+            translation_futures = [
+                translation_pool.submit(self._translation_stage, chunk, ocr_texts, sources)
+                for chunk in self._translation_chunks([i for i in range(len(sources)) if ocr_texts[i] is not None], ocr_texts)
+            ]
+
+            ocr_futures = []
+            for indices in self._plan_chunks(sources, misses, self.chunk_size, self.memory_budget, f"{self.model}:ocr"):
+                ocr_futures.append(ocr_pool.submit(self._ocr_stage, sources, indices, ocr_keys))
+
+            # Hand each OCR chunk to the translation pool as soon as it's done
+            for future in as_completed(ocr_futures):
+                done = []
+                failed = []
+                for idx, text, error in future.result():
+                    if error:
+                        ocr_errors[idx] = error
+                        failed.append(idx)
+                    else:
+                        ocr_texts[idx] = text
+                        done.append(idx)
+                if failed:
+                    self._report_progress(failed, [ocr_errors[idx] for idx in failed])
+                for chunk in self._translation_chunks(done, ocr_texts):
+                    translation_futures.append(translation_pool.submit(self._translation_stage, chunk, ocr_texts, sources))
+
+            for future in as_completed(translation_futures):
+                chunk_translations = future.result()
+                translations.update(chunk_translations)
+                indices = sorted(chunk_translations)
+                self._report_progress(indices, [self._merge_page({}, ocr_texts[idx], chunk_translations[idx])
+                                                for idx in indices])
+
+        self._mark_cancelled(ocr_texts, translations)
+        results = self._merge([{}] * len(sources), ocr_texts, translations)
+        for idx, error in ocr_errors.items():
+            results[idx] = error
+        if self.cancel_token.cancelled:
+            # Pages that never got through OCR
+            for idx, text in enumerate(ocr_texts):
+                if text is None and idx not in ocr_errors:
+                    results[idx] = self._cancelled_result()
+        logger.info(f"Stage cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        if self.hedge_policy:
+            self.hedge_policy.log_summary()
+        return results
+
+    def _local_ocr(self, sources, indices):
+        """Hook for OCR done before the remote stage. Returns {index: hindi_ocr html}."""
+        return {}
+
+    def _mark_cancelled(self, ocr_texts, translations):
+        """After a cancel, pages with OCR but no translation keep their OCR text and a cancelled translation."""
+        if not self.cancel_token.cancelled:
+            return
+        for idx, text in enumerate(ocr_texts):
+            if text is not None and idx not in translations:
+                translations[idx] = self._cancelled_result()
+
+    def _translation_chunks(self, indices, ocr_texts):
+        """Packs pages for translation by the estimated output of their OCR text."""
+        sizes = [len(ocr_texts[idx].encode("utf-8")) for idx in indices]
+        return self._plan_chunks(None, indices, max(self.translation_chunk_size or 1, 1), None,
+                                 f"{self.model}:translation", sizes)
+
+    def _ocr_stage(self, sources, indices, ocr_keys):
+        """OCRs one chunk of images. Returns (index, hindi_ocr, error_result) tuples."""
+        try:
+            self.cancel_token.check()
+            results = self._send_pages(sources, indices, self._ocr_request, label=f"{self.model}:ocr",
+                                       fields=("hindi_ocr",))
+        except OperationCancelled:
+            return []
+        except RequestTimeout as e:
+            return [(idx, None, {"error": str(e)}) for idx in indices]
+        except Exception as e:
+            logger.exception(f"OCR of files {indices[0]+1}-{indices[-1]+1} failed: {str(e)}")
+            return [(idx, None, {"error": str(e)}) for idx in indices]
+        if len(results) != len(indices):
+            error = results[0] if results and "error" in results[0] else {"error": "OCR response did not match the number of files"}
+            return [(idx, None, error) for idx in indices]
+
+        out = []
+        for idx, result in zip(indices, results):
+            text = result.get("hindi_ocr") if isinstance(result, dict) else None
+            if not text:
+                out.append((idx, None, result if isinstance(result, dict) and "error" in result
+                            else {"error": "OCR returned no text"}))
+                continue
+            if "page_type" not in result:
+                # Cached under the page itself, so OCR accepted from a preview is reused at any resolution
+                self.cache.put("ocr", ocr_keys[idx], text)
+            out.append((idx, text, None))
+        return out
+
+    def _ocr_request(self, sources, indices, label):
+        return self._generate(self._build_parts(sources, indices), len(indices),
+                              system_prompt=self.ocr_prompt, label=label)
+
+    def _translation_stage(self, indices, ocr_texts, sources):
+        """Translates the OCR text of one chunk of pages. Returns {index: translation or error dict}."""
+        translation_key = f"{self.model}:{prompt_digest(self.translation_prompt)}"
+        out = {}
+        pending = []
+        for idx in indices:
+            if ocr_texts[idx] in PAGE_TYPES:
+                # Blank and picture pages keep their placeholder
+                out[idx] = ocr_texts[idx]
+                continue
+            cached = self.cache.get("translation", cache_key(ocr_texts[idx], translation_key))
+            self.metrics.record_cache("translation", cached is not None)
+            if cached is not None:
+                out[idx] = cached
+            else:
+                pending.append(idx)
+        if not pending:
+            return out
+
+        parts = []
+        for idx in pending:
+            name = sources[idx].filename if sources else f"page {idx+1}"
+            parts.append(types.Part.from_text(text=f"File {idx+1}: {name}\n\n{ocr_texts[idx]}"))
+        try:
+            results = self._generate(parts, len(pending), system_prompt=self.translation_prompt,
+                                     label=f"{self.model}:translation")
+        except OperationCancelled:
+            return out
+        except RequestTimeout as e:
+            out.update((idx, {"error": str(e)}) for idx in pending)
+            return out
+        except Exception as e:
+            logger.exception(f"Translation of pages {pending[0]+1}-{pending[-1]+1} failed: {str(e)}")
+            out.update((idx, {"error": str(e)}) for idx in pending)
+            return out
+        if len(results) != len(pending):
+            error = results[0] if results and "error" in results[0] else {"error": "Translation response did not match the number of pages"}
+            for idx in pending:
+                out[idx] = error
+            return out
+
+        for idx, result in zip(pending, results):
+            text = result.get("english_translation") if isinstance(result, dict) else None
+            if text:
+                self.cache.put("translation", cache_key(ocr_texts[idx], translation_key), text)
+                out[idx] = text
+            else:
+                out[idx] = result if isinstance(result, dict) and "error" in result else {"error": "Translation returned no text"}
+        return out
+
+    def _merge(self, base_results, ocr_texts, translations):
+        return [self._merge_page(base, ocr_texts[idx], translations.get(idx))
+                for idx, base in enumerate(base_results)]
+
+    def _merge_page(self, base, ocr_text, translation):
+        if ocr_text is None:
+            return base if base else {"error": "No OCR text"}
+        result = dict(base or {})
+        result["hindi_ocr"] = ocr_text
+        if ocr_text in PAGE_TYPES:
+            result["page_type"] = PAGE_TYPES[ocr_text]
+        if isinstance(translation, dict):
+            # Keep the OCR text visible even if translation failed
+            message = translation.get("error", json.dumps(translation))
+            result["english_translation"] = f"<p>[Translation failed: {html.escape(message)}]</p>"
+            result["translation_error"] = message
+        else:
+            result["english_translation"] = translation or ""
+        return result
+
+
+class LocalFirstTranslator(TwoStageTranslator):
+    """
+    Two-stage pipeline that OCRs every page with the local Tesseract engine
+    first. Pages it reads with enough confidence skip the remote OCR stage
+    (no image upload); the rest, and anything the local engine can't read,
+    go to the remote model. All pages are then translated from text.
+    """
+    def __init__(self, api_key, local_backend=None, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.local_backend = local_backend or TesseractBackend(cancel_token=self.cancel_token)
+
+    def _local_ocr(self, sources, indices):
+        try:
+            self.local_backend._check_ready()
+        except RuntimeError as e:
+            logger.warning(f"Local OCR unavailable, sending all pages to {self.model}: {e}")
+            return {}
+
+        local_model_key = f"{self.local_backend.name}:{self.local_backend.languages}"
+        keys = {idx: cache_key(sources[idx].digest(), local_model_key) for idx in indices}
+        accepted = {}
+        for idx in indices:
+            cached = self.cache.get("ocr", keys[idx])
+            if cached is not None:
+                accepted[idx] = cached
+
+        todo = [idx for idx in indices if idx not in accepted]
+        started = time.perf_counter()
+        pages = self.local_backend.recognize(sources, todo) if todo else {}
+        for idx, (text, confidence, error) in pages.items():
+            if error or not text or confidence < self.local_backend.min_confidence:
+                continue
+            accepted[idx] = text_to_html(text)
+            self.cache.put("ocr", keys[idx], accepted[idx])
+        if todo:
+            self.metrics.record_request(f"{self.local_backend.name}:ocr", len(todo), time.perf_counter() - started)
+
+        logger.info(f"Local OCR accepted {len(accepted)} of {len(indices)} pages "
+                    f"(min confidence {self.local_backend.min_confidence:g}); "
+                    f"{len(indices) - len(accepted)} go to {self.model}")
+        return accepted
@@ -0,0 +1,167 @@
+"""
+Deterministic clean-up of model output, applied locally to the
+``hindi_ocr`` and ``english_translation`` HTML of every page.
+
+- Unicode: text is NFC-normalized; zero-width spaces, soft hyphens and
+  byte-order marks are removed, and runs of spaces are collapsed (outside ``<pre>``).
+- Devanagari: ASCII pipes are turned into dandas (``|`` → ``।``, ``||`` and
+  ``।।`` → ``॥``).
+- IAST: ISO 15919 letters the model sometimes mixes in are mapped to IAST
+  (``ṁ`` → ``ṃ``, ``r̥`` → ``ṛ``...), and glossary terms written without
+  diacritics get their canonical form (``Tirthankara`` → ``Tīrthaṅkara``).
+
+The glossary is compiled once into a trie-shaped regular expression, and
+every rule runs over a whole field at once, so a book is matched in C by
+the regex engine instead of character by character in Python. Rules skip
+anything inside a tag (``href="sutra.html"`` stays as it is), and all of
+them are idempotent, so running them twice changes nothing.
+"""
+import os
+import re
+import unicodedata
+from jain_digitizer.common.constants import DEFAULT_GLOSSARY
+from jain_digitizer.common.logger_setup import logger
+
+# Appended to a rule so it doesn't match inside a tag: no ">" ahead before the next "<"
+OUTSIDE_TAG = r"(?![^<>]*>)"
+PRE_RE = re.compile(r"(<pre\b.*?</pre>)", re.IGNORECASE | re.DOTALL)
+# Characters that continue a word: letters, digits, combining marks, Devanagari
+WORD_CHARS = r"\w\u0300-\u036f\u0900-\u097f"
+
+# Removed outright: zero-width space, soft hyphen, byte-order mark (ZWJ/ZWNJ shape conjuncts and are kept)
+INVISIBLE_RE = re.compile("[\u200b\u00ad\ufeff]")
+SPACES_RE = re.compile(r"[ \t]{2,}" + OUTSIDE_TAG)
+
+DANDA_RULES = [
+    (re.compile(r"(?:\|\||।।)" + OUTSIDE_TAG), "॥"),
+    (re.compile(r"\|" + OUTSIDE_TAG), "।"),
+]
+
+# ISO 15919 to IAST, longest first (applied after NFC, which leaves r̥/l̥ decomposed)
+IAST_RULES = [
+    ("r\u0325\u0304", "\u1e5d"), ("R\u0325\u0304", "\u1e5c"),  # r̥̄ → ṝ
+    ("l\u0325\u0304", "\u1e39"), ("L\u0325\u0304", "\u1e38"),  # l̥̄ → ḹ
+    ("r\u0325", "\u1e5b"), ("R\u0325", "\u1e5a"),  # r̥ → ṛ
+    ("l\u0325", "\u1e37"), ("L\u0325", "\u1e36"),  # l̥ → ḷ
+    ("\u1e41", "\u1e43"), ("\u1e40", "\u1e42"),  # ṁ → ṃ
+]
+IAST_RE = re.compile("(?:" + "|".join(re.escape(old) for old, _ in IAST_RULES) + ")" + OUTSIDE_TAG)
+IAST_MAP = dict(IAST_RULES)
+
+
+def load_glossary(path=DEFAULT_GLOSSARY):
+    """Reads a ``variant<TAB>canonical`` file (``#`` starts a comment) into a dict."""
+    glossary = {}
+    if not path or not os.path.exists(path):
+        logger.warning(f"Glossary not found: {path}")
+        return glossary
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split("\t")
+            if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+                raise ValueError(f"{path}:{number}: expected 'variant<TAB>canonical'")
+            glossary[parts[0].strip()] = unicodedata.normalize("NFC", parts[1].strip())
+    return glossary
+
+
+def _key(text):
+    return " ".join(text.lower().split())
+
+
+def trie_pattern(words):
+    """
+    A regular expression matching any of ``words``, shaped like their trie
+    (shared prefixes are matched once; longer words are tried first).
+    A space in a word matches any run of whitespace.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + emit(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _match_case(canonical, matched):
+    if matched.isupper() and len(matched) > 1:
+        return canonical.upper()
+    if matched.istitle():
+        return " ".join(word[:1].upper() + word[1:] for word in canonical.split(" "))
+    if matched[:1].isupper():
+        return canonical[:1].upper() + canonical[1:]
+    return canonical
+
+
+class PostProcessor:
+    """Applies the clean-up rules and a glossary (``{variant: canonical}``) to page results."""
+    def __init__(self, glossary=None):
+        self.glossary = {_key(variant): canonical for variant, canonical in (glossary or {}).items()}
+        self.glossary_re = None
+        if self.glossary:
+            self.glossary_re = re.compile(
+                rf"(?<![{WORD_CHARS}])(?:{trie_pattern(self.glossary)})(?![{WORD_CHARS}]){OUTSIDE_TAG}",
+                re.IGNORECASE,
+            )
+        # Replacement per matched spelling; a book repeats the same few terms thousands of times
+        self._replacements = {}
+
+    def _replace_term(self, match):
+        matched = match.group(0)
+        replacement = self._replacements.get(matched)
+        if replacement is None:
+            replacement = self._replacements[matched] = _match_case(self.glossary[_key(matched)], matched)
+        return replacement
+
+    def hindi(self, html):
+        """Cleans the Devanagari HTML of a page."""
+        html = self._common(html)
+        for pattern, replacement in DANDA_RULES:
+            html = pattern.sub(replacement, html)
+        return html
+
+    def english(self, html):
+        """Cleans the translation/IAST HTML of a page."""
+        html = IAST_RE.sub(lambda m: IAST_MAP[m.group(0)], self._common(html))
+        if self.glossary_re:
+            html = self.glossary_re.sub(self._replace_term, html)
+        return html
+
+    def _common(self, html):
+        html = INVISIBLE_RE.sub("", unicodedata.normalize("NFC", html))
+        if "<pre" not in html and "<PRE" not in html:
+            return SPACES_RE.sub(" ", html)
+        # Odd items are <pre> blocks, whose spacing is meaningful
+        parts = PRE_RE.split(html)
+        return "".join(part if idx % 2 else SPACES_RE.sub(" ", part) for idx, part in enumerate(parts))
+
+    def result(self, result):
+        """Cleans one page result in place and returns it."""
+        if not isinstance(result, dict):
+            return result
+        if isinstance(result.get("hindi_ocr"), str):
+            result["hindi_ocr"] = self.hindi(result["hindi_ocr"])
+        if isinstance(result.get("english_translation"), str):
+            result["english_translation"] = self.english(result["english_translation"])
+        return result
+
+    def results(self, results):
+        for result in results:
+            self.result(result)
+        return results
+
+
+# Process-wide post-processor with the configured glossary, shared by every backend
+default_postprocessor = PostProcessor(load_glossary())
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+
+# Chunk completions used for the rolling throughput estimate
+RATE_WINDOW = 10
+
+
+def format_eta(seconds):
+    """Formats a duration in seconds as e.g. ``1h 05m``, ``3m 20s`` or ``45s``."""
+    if seconds is None:
+        return "--"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {secs:02d}s"
+    return f"{secs}s"
+
+
+class ProgressTracker:
+    """
+    Counts finished pages for one batch and estimates throughput and time
+    remaining from the most recent chunk completions, so the ETA follows the
+    current rate rather than the average since the start. Thread-safe.
+    """
+    def __init__(self, total, window=RATE_WINDOW, clock=time.monotonic):
+        self.total = total
+        self.clock = clock
+        self.started = clock()
+        self.pages_done = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        # (timestamp, pages_done) after each completion, seeded with the start
+        self._samples = deque([(self.started, 0)], maxlen=window + 1)
+
+    def update(self, pages, errors=0):
+        """Records ``pages`` finished pages, ``errors`` of which failed. Returns a snapshot."""
+        with self._lock:
+            self.pages_done = min(self.pages_done + pages, self.total)
+            self.errors += errors
+            self._samples.append((self.clock(), self.pages_done))
+            return self._snapshot()
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        (first_time, first_pages), (last_time, last_pages) = self._samples[0], self._samples[-1]
+        elapsed = last_time - first_time
+        rate = (last_pages - first_pages) / elapsed if elapsed > 0 else None
+        remaining = self.total - self.pages_done
+        if remaining == 0:
+            eta = 0.0
+        elif rate:
+            # Count time since the last completion against the estimate
+            eta = max(remaining / rate - (self.clock() - last_time), 0.0)
+        else:
+            eta = None
+        return {
+            "pages_done": self.pages_done,
+            "total": self.total,
+            "errors": self.errors,
+            "elapsed": round(self.clock() - self.started, 2),
+            "pages_per_minute": round(rate * 60, 2) if rate else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
@@ -0,0 +1,136 @@
+"""
+Renders PDF pages to compressed images in a process pool.
+
+Large scanned PDFs are split into one image per page instead of being sent
+whole. Pages are rendered in order by a pool of worker processes, and each
+page becomes a ``PageSource`` straight away, so translation of the first
+pages starts while later ones are still rendering. Rendered pages are
+cached on disk, keyed by the PDF's digest, page number and render settings.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from jain_digitizer.common.constants import (DEFAULT_RASTER_DPI, DEFAULT_RASTER_QUALITY, DEFAULT_RASTER_CACHE,
+                                             RASTER_COLOR)
+from jain_digitizer.common.ingestion import PageSource, read_file, file_digest, spill_to_disk
+from jain_digitizer.common.stage_cache import cache_key
+from jain_digitizer.common.metrics import default_metrics
+from jain_digitizer.common.logger_setup import logger
+
+try:
+    import pymupdf
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+# Pages rendered per worker task; larger batches reopen the PDF less often
+PAGES_PER_TASK = 4
+# Rough JPEG size per pixel of a scanned text page, used to plan chunks before rendering
+BYTES_PER_PIXEL = 0.15
+
+
+def _render_batch(pdf_path, pages, out_paths, dpi, quality, color):
+    """Worker process entry point: renders ``pages`` of ``pdf_path`` to JPEG files."""
+    doc = pymupdf.open(pdf_path)
+    try:
+        for page_no, out_path in zip(pages, out_paths):
+            if os.path.exists(out_path):
+                continue
+            pix = doc[page_no].get_pixmap(dpi=dpi, colorspace=pymupdf.csRGB if color else pymupdf.csGRAY)
+            tmp_path = f"{out_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pix.tobytes("jpeg", jpg_quality=quality))
+            os.replace(tmp_path, out_path)
+    finally:
+        doc.close()
+    return out_paths
+
+
+class PdfRasterizer:
+    """
+    Turns PDFs into per-page image sources. The render pool is created on
+    first use; call ``close()`` once the pages have been consumed.
+    """
+    def __init__(self, dpi=DEFAULT_RASTER_DPI, quality=DEFAULT_RASTER_QUALITY, color=RASTER_COLOR,
+                 cache_dir=DEFAULT_RASTER_CACHE, workers=None):
+        self.dpi = dpi
+        self.quality = quality
+        self.color = color
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            # Don't wait for pages nobody will read (e.g. after a cancel)
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _page_path(self, digest, page_no):
+        mode = "rgb" if self.color else "gray"
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-p{page_no + 1:05d}-{self.dpi}dpi-{mode}-q{self.quality}.jpg")
+
+    def page_sources(self, path, filename=None, digest=None):
+        """
+        Returns one ``PageSource`` per page of the PDF at ``path``. Cached
+        pages load immediately; the rest block in ``load()`` until rendered.
+        """
+        filename = filename or os.path.basename(path)
+        digest = digest or file_digest(path)
+        os.makedirs(os.path.join(self.cache_dir, digest[:2]), exist_ok=True)
+
+        doc = pymupdf.open(path)
+        try:
+            areas = [page.rect.width * page.rect.height for page in doc]
+        finally:
+            doc.close()
+        scale = (self.dpi / 72) ** 2
+        out_paths = [self._page_path(digest, page_no) for page_no in range(len(areas))]
+
+        missing = [page_no for page_no, out in enumerate(out_paths) if not os.path.exists(out)]
+        futures = {}
+        for start in range(0, len(missing), PAGES_PER_TASK):
+            batch = missing[start:start + PAGES_PER_TASK]
+            future = self._get_pool().submit(_render_batch, path, batch, [out_paths[p] for p in batch],
+                                             self.dpi, self.quality, self.color)
+            for page_no in batch:
+                futures[page_no] = future
+        default_metrics.record_cache("pages", True, len(areas) - len(missing))
+        default_metrics.record_cache("pages", False, len(missing))
+        logger.info(f"{filename}: {len(areas)} pages, {len(areas) - len(missing)} cached, "
+                    f"rendering {len(missing)} at {self.dpi} dpi")
+
+        sources = []
+        for page_no, out_path in enumerate(out_paths):
+            future = futures.get(page_no)
+            size = os.path.getsize(out_path) if future is None else int(areas[page_no] * scale * BYTES_PER_PIXEL)
+            sources.append(PageSource(
+                f"{filename} p{page_no + 1}",
+                "image/jpeg",
+                size,
+                self._loader(out_path, future),
+                # Stable per page, without waiting for (or re-reading) the render
+                lambda page_no=page_no: cache_key(digest, f"page-{page_no}-{self.dpi}-{self.color}-{self.quality}"),
+            ))
+            sources[-1].page = page_no + 1
+        return sources
+
+    def page_sources_from_bytes(self, data, filename):
+        """Like ``page_sources`` for an uploaded PDF; the bytes are spilled to the cache directory once."""
+        tmp_path, digest = spill_to_disk(data, self.cache_dir, ".pdf")
+        path = os.path.join(self.cache_dir, f"{digest}.pdf")
+        os.replace(tmp_path, path)
+        return self.page_sources(path, filename, digest)
+
+    @staticmethod
+    def _loader(out_path, future):
+        def load():
+            if future is not None:
+                # Re-raises render errors for this page's batch
+                future.result()
+            return read_file(out_path)
+        return load
@@ -0,0 +1,207 @@
+"""
+Full-text search over digitized pages, backed by SQLite FTS5.
+
+Every page's ``hindi_ocr`` and ``english_translation`` is stored once in a
+``pages`` table (keyed by book and page) and indexed by an external-content
+FTS5 table. The tokenizer keeps Devanagari vowel signs and viramas inside
+words and folds IAST diacritics, so ``acarya`` finds ``ācārya``.
+
+    python -m jain_digitizer.common.search_index "अरिहंत*"
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+import unicodedata
+from jain_digitizer.common.constants import DEFAULT_SEARCH_INDEX
+from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.validation import strip_tags
+
+DEFAULT_INDEX_PATH = DEFAULT_SEARCH_INDEX
+
+# Devanagari combining marks (matras, virama, anusvara, nukta...) must count as
+# part of a word, otherwise unicode61 splits "नमस्ते" into "नमस" and "त".
+DEVANAGARI_MARKS = "".join(
+    chr(cp) for cp in range(0x0900, 0x0980) if unicodedata.category(chr(cp)).startswith("M")
+)
+TOKENIZER = f"unicode61 remove_diacritics 2 tokenchars '{DEVANAGARI_MARKS}'"
+
+# bm25 ranking scores every matching page. Terms matching more pages than this
+# carry little signal, so those results are returned newest-first instead.
+RANK_LIMIT = 5000
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    book TEXT NOT NULL,
+    page TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    hindi TEXT,
+    english TEXT,
+    hindi_html TEXT,
+    english_html TEXT,
+    updated REAL,
+    UNIQUE(book, page)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    hindi, english, content='pages', content_rowid='id', tokenize="{TOKENIZER}"
+);
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts(rowid, hindi, english) VALUES (new.id, new.hindi, new.english);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, hindi, english) VALUES ('delete', old.id, old.hindi, old.english);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+    INSERT INTO pages_fts(pages_fts, rowid, hindi, english) VALUES ('delete', old.id, old.hindi, old.english);
+    INSERT INTO pages_fts(rowid, hindi, english) VALUES (new.id, new.hindi, new.english);
+END;
+"""
+
+
+def normalize_text(text):
+    """Strips HTML and normalizes to NFC so equivalent Devanagari spellings index alike."""
+    return unicodedata.normalize("NFC", strip_tags(text or ""))
+
+
+def build_query(text):
+    """
+    Turns free text into an FTS5 query: every term is quoted (so punctuation
+    can't break the syntax) and a trailing ``*`` keeps prefix search.
+    """
+    terms = []
+    for term in unicodedata.normalize("NFC", text).split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    A local SQLite FTS5 index of digitized pages. Connections are not shared
+    across threads; create one ``SearchIndex`` per thread.
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_page(self, book, page, result):
+        """
+        Adds or updates one page. Returns False if the page was already indexed
+        with identical content (nothing is rewritten).
+        """
+        if not result or "error" in result:
+            return False
+        hindi_html = result.get("hindi_ocr", "")
+        english_html = result.get("english_translation", "")
+        digest = hashlib.sha256(f"{hindi_html}\x00{english_html}".encode("utf-8")).hexdigest()
+
+        row = self.conn.execute("SELECT digest FROM pages WHERE book = ? AND page = ?", (book, page)).fetchone()
+        if row and row["digest"] == digest:
+            return False
+        self.conn.execute(
+            """INSERT INTO pages (book, page, digest, hindi, english, hindi_html, english_html, updated)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(book, page) DO UPDATE SET
+                   digest = excluded.digest, hindi = excluded.hindi, english = excluded.english,
+                   hindi_html = excluded.hindi_html, english_html = excluded.english_html,
+                   updated = excluded.updated""",
+            (book, page, digest, normalize_text(hindi_html), normalize_text(english_html),
+             hindi_html, english_html, time.time()),
+        )
+        return True
+
+    def add_results(self, book, results, pages):
+        """Indexes a batch of results in one transaction. Returns the number of pages written."""
+        written = 0
+        with self.conn:
+            for page, result in zip(pages, results):
+                written += self.add_page(book, page, result)
+        logger.info(f"Indexed {written} new or changed pages of '{book}' ({len(results) - written} unchanged or skipped)")
+        return written
+
+    def remove_book(self, book):
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE book = ?", (book,))
+
+    def search(self, query, limit=20, raw=False):
+        """
+        Returns the best matching pages as dicts with book, page and highlighted
+        snippets. ``raw=True`` passes ``query`` through as FTS5 syntax.
+        """
+        match = query if raw else build_query(query)
+        if not match:
+            return []
+        matches = self.conn.execute("SELECT COUNT(*) FROM pages_fts WHERE pages_fts MATCH ?", (match,)).fetchone()[0]
+        order = "rank" if matches <= RANK_LIMIT else "pages_fts.rowid DESC"
+        rows = self.conn.execute(
+            f"""SELECT p.id, p.book, p.page,
+                      snippet(pages_fts, 0, '«', '»', '…', 12) AS hindi_snippet,
+                      snippet(pages_fts, 1, '«', '»', '…', 12) AS english_snippet
+               FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+               WHERE pages_fts MATCH ?
+               ORDER BY {order} LIMIT ?""",
+            (match, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_page(self, page_id):
+        """Returns the stored HTML for a page found by ``search``."""
+        row = self.conn.execute(
+            "SELECT book, page, hindi_html, english_html FROM pages WHERE id = ?", (page_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def page_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def optimize(self):
+        """Merges FTS segments; worth running after large imports."""
+        with self.conn:
+            self.conn.execute("INSERT INTO pages_fts(pages_fts) VALUES ('optimize')")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the Jain Digitizer full-text index")
+    parser.add_argument("query", help="Search terms (Devanagari or IAST; diacritics optional, end a term with * for prefix)")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Path to the index database")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--raw", action="store_true", help="Treat the query as FTS5 syntax (AND/OR/NEAR, column filters)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.index):
+        print(f"No index found at {args.index}", file=sys.stderr)
+        return 1
+
+    with SearchIndex(args.index) as index:
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit, raw=args.raw)
+        elapsed = (time.perf_counter() - started) * 1000
+        for hit in hits:
+            print(f"{hit['book']} / {hit['page']}")
+            for snippet in (hit["hindi_snippet"], hit["english_snippet"]):
+                if "«" in snippet:
+                    print(f"    {snippet}")
+        print(f"{len(hits)} results in {elapsed:.1f} ms ({index.page_count()} pages indexed)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Per-session page results for the web app, kept on disk instead of in
+``st.session_state``.
+
+Each browser session gets a small SQLite file with one row per page result,
+so a rerun only reads and renders the pages in view, however long the book.
+Edits made in a view are stored per view and used for the downloads. Session
+files are evicted least-recently-used once there are more than ``max_sessions``.
+"""
+import glob
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from jain_digitizer.common.constants import DEFAULT_SESSION_DIR, MAX_SESSIONS, RESULTS_VIEW_SIZE
+from jain_digitizer.common.logger_setup import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    idx INTEGER PRIMARY KEY,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edits (
+    field TEXT NOT NULL,
+    view INTEGER NOT NULL,
+    html TEXT NOT NULL,
+    PRIMARY KEY (field, view)
+);
+"""
+
+# Results read per query when streaming all pages (exports, downloads)
+READ_BATCH = 100
+
+
+class SessionResults:
+    """
+    Page results of one session, in order, in a SQLite file. Pages are shown
+    in views of ``view_size`` pages. Safe to share between threads.
+    """
+    def __init__(self, path, view_size=RESULTS_VIEW_SIZE):
+        self.path = path
+        self.view_size = view_size
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def __iter__(self):
+        """Streams every result in order, READ_BATCH pages at a time."""
+        start = 0
+        while True:
+            batch = self.pages(start, start + READ_BATCH)
+            yield from batch
+            if len(batch) < READ_BATCH:
+                return
+            start += READ_BATCH
+
+    def replace(self, results):
+        """Stores a new batch's results, dropping the previous ones and their edits."""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM pages")
+                self.conn.execute("DELETE FROM edits")
+                self.conn.executemany(
+                    "INSERT INTO pages (idx, result) VALUES (?, ?)",
+                    ((idx, json.dumps(result, ensure_ascii=False)) for idx, result in enumerate(results)),
+                )
+
+    def pages(self, start, stop):
+        """Results of pages ``start`` (inclusive) to ``stop`` (exclusive)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT result FROM pages WHERE idx >= ? AND idx < ? ORDER BY idx", (start, stop)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def view_count(self):
+        return -(-len(self) // self.view_size)
+
+    def view(self, number):
+        """Returns ``(first page index, results)`` of view ``number`` (0-based)."""
+        start = number * self.view_size
+        return start, self.pages(start, start + self.view_size)
+
+    def edit(self, field, view):
+        """The edited HTML of ``field`` in ``view``, or None if it wasn't edited."""
+        with self._lock:
+            row = self.conn.execute("SELECT html FROM edits WHERE field = ? AND view = ?", (field, view)).fetchone()
+        return row[0] if row else None
+
+    def save_edit(self, field, view, html):
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO edits (field, view, html) VALUES (?, ?, ?)",
+                                  (field, view, html))
+
+    def clear(self):
+        self.replace([])
+
+    def touch(self):
+        """Marks the session as recently used, so it's the last to be evicted."""
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_session(session_id=None, directory=DEFAULT_SESSION_DIR, max_sessions=MAX_SESSIONS,
+                 view_size=RESULTS_VIEW_SIZE):
+    """
+    Opens (or creates) the results file of ``session_id`` (default: a new
+    id) and evicts the least recently used other sessions beyond ``max_sessions``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{session_id or uuid.uuid4().hex}.db")
+    store = SessionResults(path, view_size)
+    store.touch()
+    evict_sessions(directory, max_sessions, keep=path)
+    return store
+
+
+def evict_sessions(directory, max_sessions, keep=None):
+    """Deletes the least recently used session files until at most ``max_sessions`` remain."""
+    sessions = []
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        try:
+            sessions.append((os.path.getmtime(path), path))
+        except OSError:
+            # Evicted by another session in the meantime
+            continue
+    sessions.sort(reverse=True)
+    evicted = 0
+    for _, path in sessions[max_sessions:]:
+        if path == keep:
+            continue
+        for name in (path, f"{path}-wal", f"{path}-shm", f"{path}-journal"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Still open on platforms that lock open files; it goes next time
+                logger.debug(f"Could not evict {name}: {str(e)}")
+        evicted += 1
+    if evicted:
+        logger.info(f"Evicted {evicted} least recently used session results from {directory}")
+    return evicted
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_results (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL,
+    PRIMARY KEY (stage, key)
+)
+"""
+
+
+def cache_key(*parts):
+    """Digest of the inputs that determine a stage's output (input digest, prompt, model...)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8") if isinstance(part, str) else part)
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Persistent per-page cache for pipeline stages, e.g. OCR text keyed by
+    image digest and OCR prompt, or translations keyed by OCR text and
+    translation prompt. Safe to share between worker threads.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def get(self, stage, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM stage_results WHERE stage = ? AND key = ?", (stage, key)
+            ).fetchone()
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, stage, key, value):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stage_results (stage, key, value, created) VALUES (?, ?, ?, ?)",
+                (stage, key, value, time.time()),
+            )
+            self.conn.commit()
+
+    def clear(self, stage=None):
+        with self._lock:
+            if stage:
+                self.conn.execute("DELETE FROM stage_results WHERE stage = ?", (stage,))
+            else:
+                self.conn.execute("DELETE FROM stage_results")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
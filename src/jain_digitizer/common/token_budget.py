@@ -0,0 +1,103 @@
+"""
+Output-token estimates for packing pages into requests.
+
+A multi-page request returns one JSON array for all of its pages; if that
+array runs past the model's output limit the response is cut off and the
+whole request fails. ``OutputTokenEstimator`` predicts each page's output
+from its size, starting from conservative per-kind rates and learning the
+real rate from the usage reported on past responses.
+"""
+import threading
+from jain_digitizer.common.logger_setup import logger
+
+IMAGE = "image"
+PDF = "pdf"
+TEXT = "text"
+
+# Starting output tokens per input byte. A 200 dpi scan of a dense page is
+# ~200 KB and yields ~2,500 tokens of OCR and translation HTML; OCR text in
+# the two-stage translation step is ~3 bytes per Devanagari character.
+DEFAULT_TOKENS_PER_BYTE = {IMAGE: 0.012, PDF: 0.012, TEXT: 0.15}
+# Floor per page, so small or heavily compressed pages aren't underestimated
+MIN_PAGE_TOKENS = {IMAGE: 800, PDF: 800, TEXT: 200}
+# Fraction of the output limit that packing fills, leaving room for estimate error
+HEADROOM = 0.8
+# Weight of the newest observation in the learned rate
+SMOOTHING = 0.3
+# Rate increase after a response was cut off at the output limit
+TRUNCATION_PENALTY = 1.5
+
+
+def kind_of(mime_type):
+    if mime_type == "application/pdf":
+        return PDF
+    if mime_type and mime_type.startswith("image/"):
+        return IMAGE
+    return TEXT
+
+
+def part_sizes(parts):
+    """(kind, bytes) of each page in a request. Bare "File N: name" label parts are skipped."""
+    pages = []
+    for part in parts:
+        inline = getattr(part, "inline_data", None)
+        if inline is not None and inline.data is not None:
+            pages.append((kind_of(inline.mime_type), len(inline.data)))
+        elif part.text:
+            label, sep, body = part.text.partition("\n\n")
+            if sep and label.startswith("File "):
+                pages.append((TEXT, len(body.encode("utf-8"))))
+    return pages
+
+
+def packing_budget(output_token_budget):
+    """Estimated output tokens packing may put in one request (None = no limit)."""
+    return int(output_token_budget * HEADROOM) if output_token_budget else None
+
+
+class OutputTokenEstimator:
+    """
+    Per-page output token estimates. Rates are learned separately for each
+    request label (model or pipeline stage) and input kind. Thread-safe.
+    """
+    def __init__(self):
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def rate(self, label, kind):
+        with self._lock:
+            return self._rates.get((label, kind), DEFAULT_TOKENS_PER_BYTE[kind])
+
+    def estimate(self, label, mime_type, size):
+        kind = kind_of(mime_type)
+        return max(int(self.rate(label, kind) * size), MIN_PAGE_TOKENS[kind])
+
+    def observe(self, label, parts, output_tokens):
+        """Updates the rate from a parsed response's output token count."""
+        pages = part_sizes(parts)
+        kinds = {kind for kind, _ in pages}
+        total = sum(size for _, size in pages)
+        # Mixed requests can't be attributed to one kind
+        if not output_tokens or not total or len(kinds) != 1:
+            return
+        kind = kinds.pop()
+        observed = output_tokens / total
+        with self._lock:
+            current = self._rates.get((label, kind), DEFAULT_TOKENS_PER_BYTE[kind])
+            self._rates[(label, kind)] = current + SMOOTHING * (observed - current)
+
+    def penalize(self, label, mime_types):
+        """Raises the rates behind a request whose response was cut off."""
+        with self._lock:
+            for kind in {kind_of(m) for m in mime_types}:
+                current = self._rates.get((label, kind), DEFAULT_TOKENS_PER_BYTE[kind])
+                self._rates[(label, kind)] = current * TRUNCATION_PENALTY
+                logger.info(f"Output estimate for {label} {kind} pages raised to {self._rates[(label, kind)]:.4f} tokens/byte")
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{label}:{kind}": round(rate, 5) for (label, kind), rate in self._rates.items()}
+
+
+# Shared so rates learned in one batch carry over to the next
+default_estimator = OutputTokenEstimator()
@@ -1,100 +1,481 @@
 import os
+import html
 import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google import genai
 from google.genai import types
-from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.logger_setup import logger, log_payload
+from jain_digitizer.common.constants import (DEFAULT_MEMORY_BUDGET, DEFAULT_REQUEST_TIMEOUT, DEFAULT_RASTER_DPI,
+                                             DEFAULT_OUTPUT_TOKEN_BUDGET, DEFAULT_PREVIEW_SCALE, DEFAULT_PAGE_FILTER,
+                                             MULTI_FILE_INSTRUCTION, SINGLE_FILE_INSTRUCTION)
+from jain_digitizer.common.cassette import default_client_factory, REPLAY_KEY
+from jain_digitizer.common.key_pool import shared_pool, mask_key, THROTTLED, INVALID
+from jain_digitizer.common.cancellation import OperationCancelled, RequestTimeout, run_cancellable, run_hedged_calls
+from jain_digitizer.common.hedging import HedgePolicy
+from jain_digitizer.common.ingestion import plan_chunks, pack_chunks, PageSource
+from jain_digitizer.common.token_budget import default_estimator, packing_budget
+from jain_digitizer.common.backend import OCRBackend
+from jain_digitizer.common.metrics import default_metrics
+from jain_digitizer.common.validation import validate_result, preview_issues, REQUIRED_FIELDS
+from jain_digitizer.common.imaging import (load_preview, classify_page, IMAGING_AVAILABLE, NUMPY_AVAILABLE,
+                                           PREVIEW_TYPES)
+from jain_digitizer.common.context_cache import default_registry
 
-class Translator:
+# Placeholder text for pages answered locally, by page type
+SKIPPED_PAGES = {"blank": "<p>[Blank page]</p>", "picture": "<p>[Picture page, no text]</p>"}
+
+def skipped_notice(result, label):
+    """Editor HTML for a page the page filter answered locally, or None for any other result."""
+    page_type = (result or {}).get("page_type")
+    if page_type not in SKIPPED_PAGES:
+        return None
+    return (f"<p style='color:#888'><i>⏭ {html.escape(label)}: skipped as a {page_type} page, not sent to Gemini. "
+            "Turn off \"Skip blank and picture pages\" to send it.</i></p>")
+
+def _token_count(usage, field):
+    value = getattr(usage, field, None)
+    return value if isinstance(value, int) else 0
+
+class Translator(OCRBackend):
     """
     A non-UI library class that handles communication with the Gemini API
      for OCR and translation of philological texts.
     """
-    def __init__(self, api_key, system_prompt):
+    name = "gemini"
+
+    def __init__(self, api_key, system_prompt, chunk_size=None, memory_budget=DEFAULT_MEMORY_BUDGET,
+                 use_context_cache=False, cache_registry=None,
+                 escalation_model=None, min_quality=0.5, metrics=None, progress_callback=None,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, cancel_token=None, key_pool=None, client_factory=None,
+                 raster_dpi=DEFAULT_RASTER_DPI, output_token_budget=DEFAULT_OUTPUT_TOKEN_BUDGET, token_estimator=None,
+                 hedge_budget=0.0, preview_scale=DEFAULT_PREVIEW_SCALE, page_filter=DEFAULT_PAGE_FILTER):
+        super().__init__(progress_callback, cancel_token, raster_dpi)
         self.api_key = api_key
+        # Builds the API client (e.g. a cassette recorder/replayer); None = CASSETTE_MODE or genai.Client
+        self.client_factory = client_factory
+        # api_key may hold several keys (comma/space separated); chunks are spread across them
+        self.key_pool = key_pool or shared_pool(api_key or (REPLAY_KEY if self._replaying() else ""))
         self.system_prompt = system_prompt
         self.model = "gemini-2.0-flash"
+        # Files per request (None = as many as the memory budget allows)
+        self.chunk_size = chunk_size
+        # Maximum bytes of file data held for one in-flight request
+        self.memory_budget = memory_budget
+        # Reuse a server-side cached context for the system prompt instead of resending it
+        self.use_context_cache = use_context_cache
+        self.cache_registry = cache_registry or default_registry
+        # Pages failing validation on self.model are re-sent to this stronger model (None = off)
+        self.escalation_model = escalation_model
+        self.min_quality = min_quality
+        self.metrics = metrics or default_metrics
+        # Seconds per API request
+        self.request_timeout = request_timeout
+        # Model output limit per request; pages are packed so responses stay under it (0 = don't pack by output)
+        self.output_token_budget = output_token_budget
+        self.token_estimator = token_estimator or default_estimator
+        # Duplicate requests that run past their size class's p95, as a fraction of requests (0 = no hedging)
+        self.hedge_policy = HedgePolicy(self.metrics, hedge_budget) if hedge_budget else None
+        # Page images are sent downscaled by this factor first; only pages failing cheap checks are re-sent (0 = off)
+        self.preview_scale = preview_scale
+        # Blank and picture-only pages are answered with a placeholder instead of being sent
+        self.page_filter = page_filter
         logger.debug(f"Translator initialized with model: {self.model}")
 
-    def translate_files(self, file_paths):
+    def _translate_sources(self, sources):
+        # One chunk in flight per key; concurrent chunks share the memory budget
+        workers = max(self.key_pool.usable(), 1)
+        budget = self.memory_budget // workers if self.memory_budget else self.memory_budget
+        chunks = self._plan_chunks(sources, list(range(len(sources))), self.chunk_size, budget, self.model)
+        workers = min(workers, len(chunks)) or 1
+
+        chunk_results = [None] * len(chunks)
+        if workers == 1:
+            for pos, chunk in enumerate(chunks):
+                chunk_results[pos] = self._process_chunk(sources, chunk)
+                if chunk_results[pos] is None:
+                    break
+        else:
+            logger.info(f"Spreading {len(chunks)} requests over {workers} API keys")
+            with ThreadPoolExecutor(workers) as pool:
+                futures = {pool.submit(self._process_chunk, sources, chunk): pos for pos, chunk in enumerate(chunks)}
+                for future in as_completed(futures):
+                    chunk_results[futures[future]] = future.result()
+            for key, stats in self.key_pool.snapshot().items():
+                logger.info(f"Key {key}: {stats['requests']} requests, {stats['errors']} errors, "
+                            f"{stats['throttled']} throttled")
+
+        # Packed chunks needn't be contiguous, so results are placed by file index
+        results = [None] * len(sources)
+        done = 0
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            if chunk_result is None:
+                # Keep finished pages; everything not yet done is marked as cancelled
+                for idx in chunk:
+                    results[idx] = self._cancelled_result()
+            else:
+                for idx, result in zip(chunk, chunk_result):
+                    results[idx] = result
+                done += len(chunk)
+        if self.cancel_token.cancelled:
+            logger.warning(f"Batch stopped after {done} of {len(sources)} files: {self.cancel_token.reason}")
+        if self.hedge_policy:
+            self.hedge_policy.log_summary()
+
+        if self.escalation_model:
+            for tier, stats in self.metrics.snapshot().items():
+                logger.info(f"Tier {tier}: {stats['pages']} pages, {stats['requests']} requests, "
+                            f"p50 {stats['latency_p50']}s, {stats['output_tokens']} output tokens, "
+                            f"escalation rate {stats['escalation_rate']:.1%}")
+        return results
+
+    def _plan_chunks(self, sources, indices, max_files, memory_budget, label, sizes=None):
         """
-        Takes a list of file paths and sends them all to Gemini in a single request.
+        Groups ``indices`` into requests, packed by estimated output tokens
+        (under ``label``'s learned rates). Returns chunks of source indices.
         """
-        if isinstance(file_paths, str):
-            file_paths = [file_paths]
+        sizes = sizes or [sources[idx].size for idx in indices]
+        token_budget = packing_budget(self.output_token_budget)
+        if token_budget:
+            estimates = [self.token_estimator.estimate(label, sources[idx].mime_type if sources else "text/html", size)
+                         for idx, size in zip(indices, sizes)]
+            chunks = pack_chunks(sizes, estimates, token_budget, max_files, memory_budget)
+        else:
+            chunks = plan_chunks(sizes, max_files, memory_budget)
+        return [[indices[pos] for pos in chunk] for chunk in chunks]
 
-        parts = []
-        for idx, path in enumerate(file_paths):
-            logger.debug(f"Preparing file {idx+1}: {path}")
-            mime_type = self._get_mime_type(path)
-            with open(path, "rb") as f:
-                data = f.read()
-            parts.append(types.Part.from_bytes(data=data, mime_type=mime_type))
-            parts.append(types.Part.from_text(text=f"File {idx+1}: {os.path.basename(path)}"))
-        
-        return self._generate(parts, len(file_paths))
+    def _process_chunk(self, sources, chunk):
+        """Translates one chunk (with escalation). Returns its results, or None if the batch was cancelled first."""
+        if self.cancel_token.cancelled:
+            return None
+        try:
+            chunk_results = self._send_pages(sources, chunk, self._generate_chunk)
+            if self.escalation_model:
+                chunk_results = self._escalate(sources, chunk, chunk_results)
+        except OperationCancelled:
+            return None
+        except RequestTimeout as e:
+            logger.error(f"Files {chunk[0]+1}-{chunk[-1]+1}: {e}")
+            chunk_results = [{"error": str(e)} for _ in chunk]
+        except Exception as e:
+            # A failed request (server error, network, no usable key) only fails its own pages
+            logger.exception(f"Files {chunk[0]+1}-{chunk[-1]+1} failed: {str(e)}")
+            chunk_results = [{"error": str(e)} for _ in chunk]
+        if len(chunk_results) != len(chunk):
+            # Every page gets a result, even when the response can't be matched to pages
+            error = chunk_results[0] if len(chunk_results) == 1 and "error" in chunk_results[0] \
+                else {"error": "Response did not match the number of files"}
+            chunk_results = [dict(error) for _ in chunk]
+        self._report_progress(chunk, chunk_results)
+        return chunk_results
+
+    def _generate_chunk(self, sources, chunk, label=None):
+        """
+        Sends one chunk. A multi-page response that can't be parsed was almost
+        always cut off at the output limit, so the chunk is retried in halves.
+        """
+        results = self._generate(self._build_parts(sources, chunk), len(chunk), label=label)
+        if len(chunk) > 1 and len(results) == 1 and "raw" in results[0]:
+            self.token_estimator.penalize(label or self.model, [sources[idx].mime_type for idx in chunk])
+            self.metrics.record_api_error(label or self.model, retried=True)
+            logger.warning(f"Response for {len(chunk)} files was cut off or malformed; splitting the request")
+            mid = len(chunk) // 2
+            return self._generate_chunk(sources, chunk[:mid], label) + self._generate_chunk(sources, chunk[mid:], label)
+        return results
+
+    def _send_pages(self, sources, chunk, send, label=None, fields=REQUIRED_FIELDS):
+        """
+        Sends one chunk through ``send(sources, chunk, label)``. Blank and
+        picture-only pages get a placeholder result without a request; the
+        rest go through ``_send_adaptive``.
+        """
+        skipped = self._skip_pages(sources, chunk) if self.page_filter else {}
+        if not skipped:
+            return self._send_adaptive(sources, chunk, send, label, fields)
+        rest = [idx for idx in chunk if idx not in skipped]
+        results = self._send_adaptive(sources, rest, send, label, fields) if rest else []
+        if len(results) != len(rest):
+            error = results[0] if len(results) == 1 and "error" in results[0] \
+                else {"error": "Response did not match the number of files"}
+            results = [dict(error) for _ in rest]
+        sent = dict(zip(rest, results))
+        return [skipped[idx] if idx in skipped else sent[idx] for idx in chunk]
 
-    def translate_bytes(self, files_data):
+    def _skip_pages(self, sources, chunk):
+        """Returns {index: placeholder result} for the chunk's blank and picture-only page images."""
+        if not (IMAGING_AVAILABLE and NUMPY_AVAILABLE):
+            return {}
+        skipped = {}
+        for idx in chunk:
+            source = sources[idx]
+            if source.mime_type not in PREVIEW_TYPES:
+                continue
+            try:
+                # A cached preview is much cheaper to decode than the full page
+                preview = load_preview(source, self.preview_scale) if self.preview_scale else None
+                page_type = classify_page(preview[0] if preview else source.load())
+            except Exception as e:
+                logger.debug(f"File {idx+1}: page not classified ({str(e)})")
+                continue
+            if page_type in SKIPPED_PAGES:
+                skipped[idx] = {"hindi_ocr": SKIPPED_PAGES[page_type], "english_translation": SKIPPED_PAGES[page_type],
+                                "page_type": page_type}
+                self.metrics.record_skipped(page_type)
+                logger.info(f"File {idx+1} ({source.filename}) looks like a {page_type} page; not sending it")
+        return skipped
+
+    def _send_adaptive(self, sources, chunk, send, label=None, fields=REQUIRED_FIELDS):
         """
-        Takes a list of (bytes, filename, mime_type) tuples.
+        Sends ``chunk`` through ``send(sources, chunk, label)`` with its page
+        images downscaled by ``preview_scale`` first, then re-sends at full
+        resolution only the pages whose results fail ``preview_issues``.
         """
+        label = label or self.model
+        previews = self._previews(sources, chunk) if self.preview_scale else {}
+        if not previews:
+            return send(sources, chunk, label)
+
+        view = list(sources)
+        for idx, (preview, _) in previews.items():
+            view[idx] = preview
+        results = send(view, chunk, f"{label}:preview")
+        if len(results) != len(chunk):
+            # The response can't be matched to pages, so every page goes again
+            retry = list(range(len(chunk)))
+            results = [None] * len(chunk)
+        else:
+            retry = []
+            for pos, idx in enumerate(chunk):
+                issues = preview_issues(results[pos], previews[idx][1], fields) if idx in previews else []
+                if issues:
+                    logger.info(f"File {idx+1}: re-sending at full resolution ({', '.join(issues)})")
+                    retry.append(pos)
+
+        full_bytes = sum(sources[idx].size for idx in chunk)
+        sent_bytes = sum(view[idx].size for idx in chunk) + sum(sources[chunk[pos]].size for pos in retry)
+        logger.info(f"Preview pass: {len(chunk) - len(retry)} of {len(chunk)} files accepted at "
+                    f"{self.preview_scale:.0%} scale, {len(retry)} re-sent; uploaded {sent_bytes // 1024} KB "
+                    f"instead of {full_bytes // 1024} KB")
+        if not retry:
+            return results
+        full = send(sources, [chunk[pos] for pos in retry], label)
+        if len(full) != len(retry):
+            return full if None in results else results
+        for pos, result in zip(retry, full):
+            # A failed full-resolution retry keeps whatever the preview produced
+            if results[pos] is None or not (isinstance(result, dict) and "error" in result):
+                results[pos] = result
+        return results
+
+    def _previews(self, sources, chunk):
+        """Returns {index: (preview PageSource, ink density)} for the chunk's previewable images."""
+        previews = {}
+        for idx in chunk:
+            try:
+                preview = load_preview(sources[idx], self.preview_scale)
+            except Exception as e:
+                logger.warning(f"File {idx+1}: no preview ({str(e)}); sending full resolution")
+                continue
+            if preview is None:
+                continue
+            data, ink = preview
+            source = PageSource.from_bytes(data, sources[idx].filename, "image/jpeg")
+            source.page = sources[idx].page
+            previews[idx] = (source, ink)
+        return previews
+
+    def _build_parts(self, sources, chunk):
+        """Loads the file data for one chunk and interleaves it with file labels."""
         parts = []
-        for idx, (data, filename, mime_type) in enumerate(files_data):
-            parts.append(types.Part.from_bytes(data=data, mime_type=mime_type))
-            parts.append(types.Part.from_text(text=f"File {idx+1}: {filename}"))
-        
-        return self._generate(parts, len(files_data))
+        for idx in chunk:
+            source = sources[idx]
+            logger.debug(f"Preparing file {idx+1}: {source.filename}")
+            parts.append(types.Part.from_bytes(data=source.load(), mime_type=source.mime_type))
+            parts.append(types.Part.from_text(text=f"File {idx+1}: {source.filename}"))
+        return parts
+
+    def _escalate(self, sources, chunk, chunk_results):
+        """
+        Re-sends pages whose fast-tier result failed validation to the
+        escalation model, one page per request.
+        """
+        if len(chunk_results) != len(chunk):
+            # The response can't be matched to pages (e.g. truncated JSON), so every page is suspect
+            failing = list(range(len(chunk)))
+            chunk_results = [None] * len(chunk)
+        else:
+            failing = []
+            for pos, result in enumerate(chunk_results):
+                issues = validate_result(result, self.min_quality)
+                if issues:
+                    logger.info(f"Escalating file {chunk[pos]+1} to {self.escalation_model}: {', '.join(issues)}")
+                    failing.append(pos)
 
-    def _generate(self, parts, num_files):
-        if not self.api_key:
+        if failing:
+            self.metrics.record_escalation(self.model, len(failing))
+        for pos in failing:
+            idx = chunk[pos]
+            escalated = self._generate(self._build_parts(sources, [idx]), 1, model=self.escalation_model)
+            chunk_results[pos] = escalated[0] if escalated else {"error": "Empty response from escalation model"}
+        return chunk_results
+
+    def _send_with_pool(self, model, instruct, parts, cancel_token=None):
+        """
+        Sends the request with a key from the pool. If the key is throttled or
+        rejected and another key is available, the request moves to that key.
+        ``cancel_token`` (default: the batch's) stops it early.
+        """
+        cancel_token = cancel_token or self.cancel_token
+        attempts = 0
+        while True:
+            key = self.key_pool.acquire(cancel_token)
+            try:
+                response = self._send(key, model, instruct, parts, cancel_token)
+            except OperationCancelled:
+                self.key_pool.release(key)
+                raise
+            except Exception as e:
+                kind = self.key_pool.release(key, e)
+                attempts += 1
+                retry = kind in (THROTTLED, INVALID) and attempts < self.key_pool.size and self.key_pool.usable()
+                self.metrics.record_api_error(model, throttled=kind == THROTTLED, retried=retry)
+                if retry:
+                    logger.warning(f"Key {mask_key(key)} {kind}; retrying on another key")
+                    continue
+                raise
+            self.key_pool.release(key)
+            return response
+
+    def _send_hedged(self, model, instruct, parts, hedge):
+        """
+        Sends the request, and a duplicate if it's still running after
+        ``hedge.after``. Each call takes its own key from the pool (another
+        key when one is ready), and the losing call is stopped and its client closed.
+        """
+        if hedge is None:
+            return self._send_with_pool(model, instruct, parts)
+        return run_hedged_calls(
+            lambda attempt_token: self._send_with_pool(model, instruct, parts, attempt_token),
+            self.cancel_token, hedge=hedge
+        )
+
+    def _send(self, api_key, model, instruct, parts, cancel_token=None):
+        cancel_token = cancel_token or self.cancel_token
+        http_options = None
+        if self.request_timeout:
+            # Let the HTTP layer give up shortly after we stop waiting, so abandoned calls don't linger
+            http_options = types.HttpOptions(timeout=int((self.request_timeout + 5) * 1000))
+        factory = self.client_factory or default_client_factory() or genai.Client
+        client = factory(api_key=api_key, http_options=http_options)
+        try:
+            return self._send_with_client(client, api_key, model, instruct, parts, cancel_token)
+        finally:
+            # Also cuts off a call abandoned on cancellation, timeout or a lost hedge
+            close = getattr(client, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Closing the API client failed: {str(e)}")
+
+    def _send_with_client(self, client, api_key, model, instruct, parts, cancel_token):
+        cached_context = None
+        if self.use_context_cache:
+            cached_context = self.cache_registry.get(client, api_key, model, instruct)
+
+        if cached_context:
+            config = types.GenerateContentConfig(
+                cached_content=cached_context,
+                response_mime_type="application/json"
+            )
+        else:
+            config = types.GenerateContentConfig(
+                system_instruction=instruct,
+                response_mime_type="application/json"
+            )
+
+        try:
+            return run_cancellable(
+                client.models.generate_content, cancel_token, self.request_timeout,
+                model=model,
+                config=config,
+                contents=parts
+            )
+        except (OperationCancelled, RequestTimeout):
+            raise
+        except Exception as e:
+            if not cached_context:
+                raise
+            # The cached context may have been evicted server-side; drop it and resend inline
+            logger.warning(f"Request with cached context {cached_context} failed ({e}); retrying with inline prompt")
+            self.cache_registry.invalidate(api_key, model, instruct)
+            config = types.GenerateContentConfig(
+                system_instruction=instruct,
+                response_mime_type="application/json"
+            )
+            return run_cancellable(
+                client.models.generate_content, cancel_token, self.request_timeout,
+                model=model,
+                config=config,
+                contents=parts
+            )
+
+    def _check_ready(self):
+        self._check_api_key()
+
+    def _replaying(self):
+        """True when responses come from a cassette, so no API key is needed."""
+        return getattr(self.client_factory or default_client_factory(), "replay", False)
+
+    def _check_api_key(self):
+        if not self.api_key and not self._replaying():
             logger.error("Attempted to translate without API key")
             raise ValueError("Gemini API Key is not set.")
 
+    def _generate(self, parts, num_files, model=None, system_prompt=None, label=None):
+        """
+        Sends one request and returns the parsed list of per-file results.
+        ``label`` names the request in metrics (defaults to the model).
+        """
+        self._check_api_key()
+        model = model or self.model
+
         logger.info(f"Starting translation for {num_files} files")
-        client = genai.Client(api_key=self.api_key)
-        
         # Update prompt to handle multiple files if needed
-        instruct = self.system_prompt
-        if num_files > 1:
-            instruct += "\n\nCRITICAL: You are processing multiple files. Return a JSON ARRAY of objects, one for each file in the same order."
-        else:
-            instruct += "\n\nReturn a single JSON object for the file."
+        instruct = system_prompt or self.system_prompt
+        instruct += MULTI_FILE_INSTRUCTION if num_files > 1 else SINGLE_FILE_INSTRUCTION
 
-        config = types.GenerateContentConfig(
-            system_instruction=instruct,
-            response_mime_type="application/json"
-        )
-        
-        logger.debug("Calling Gemini API...")
-        response = client.models.generate_content(
-            model=self.model,
-            config=config,
-            contents=parts
-        )
+        logger.debug(f"Calling Gemini API ({model})...")
+        hedge = self.hedge_policy.plan(label or model, num_files) if self.hedge_policy else None
+        started = time.perf_counter()
+        with self.metrics.in_flight(label or model):
+            response = self._send_hedged(model, instruct, parts, hedge)
 
-        
+        usage = getattr(response, "usage_metadata", None)
         raw_response = response.text
-        logger.debug(f"Received raw response from Gemini: {raw_response}")
+        parsed_ok = True
+        log_payload("Received raw response from Gemini", raw_response)
         
         try:
             results = json.loads(raw_response)
             logger.info("Successfully received and parsed Gemini response")
-            # Ensure it's a list if multiple files were sent
+            # Ensure it's a list; a single-file request is asked for a single object
             if num_files >= 1 and not isinstance(results, list):
-                logger.warning("Expected list from API but got single object; wrapping in list")
-                return [results]
-            return results if isinstance(results, list) else [results]
+                if num_files > 1:
+                    logger.warning("Expected list from API but got single object; wrapping in list")
+                results = [results]
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON response from Gemini. Error: {str(e)}\nRaw Response Content: {raw_response}")
-            return [{"error": f"Invalid JSON response from API: {str(e)}", "raw": raw_response}]
-
-    def _get_mime_type(self, file_path):
-        """Determines the MIME type based on file extension."""
-        ext = file_path.lower().split('.')[-1]
-        if ext == 'pdf':
-            return "application/pdf"
-        elif ext in ['jpg', 'jpeg']:
-            return "image/jpeg"
-        elif ext == 'png':
-            return "image/png"
-        else:
-            return f"image/{ext}"  # Best effort
+            log_payload(f"Failed to decode JSON response from Gemini. Error: {str(e)}\nRaw Response Content", raw_response, level=logging.ERROR)
+            results = [{"error": f"Invalid JSON response from API: {str(e)}", "raw": raw_response}]
+            parsed_ok = False
+
+        if parsed_ok:
+            self.token_estimator.observe(label or model, parts, _token_count(usage, "candidates_token_count"))
+        self.metrics.record_request(
+            label or model, num_files, time.perf_counter() - started,
+            prompt_tokens=_token_count(usage, "prompt_token_count"),
+            output_tokens=_token_count(usage, "candidates_token_count"),
+            error=not parsed_ok,
+        )
+        return results
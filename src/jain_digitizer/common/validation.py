@@ -0,0 +1,106 @@
+import re
+
+TAG_RE = re.compile(r"<[^>]*>")
+OPEN_TAG_RE = re.compile(r"<(p|blockquote|ul|ol|li|table|tr|td|footer|h[1-6])(\s[^>]*)?>", re.IGNORECASE)
+CLOSE_TAG_RE = re.compile(r"</(p|blockquote|ul|ol|li|table|tr|td|footer|h[1-6])\s*>", re.IGNORECASE)
+DEVANAGARI_RE = re.compile(r"[\u0900-\u097F\uA8E0-\uA8FF]")
+
+REQUIRED_FIELDS = ("hindi_ocr", "english_translation")
+
+# A page whose OCR is less than this share Devanagari is probably misread
+MIN_DEVANAGARI_RATIO = 0.5
+# English output much shorter than the source usually means a dropped section
+MIN_TRANSLATION_RATIO = 0.3
+# OCR characters expected per unit of ink density; well below a printed page
+# (a page ~25% ink holds ~2000 characters), so only clearly short reads fail
+MIN_CHARS_PER_INK = 1000
+# Pages with less ink than this are (nearly) blank and may legitimately be empty
+MIN_INK = 0.01
+
+
+def strip_tags(html):
+    return TAG_RE.sub("", html or "")
+
+
+def devanagari_ratio(text):
+    """Share of script characters in ``text`` that are Devanagari."""
+    devanagari = len(DEVANAGARI_RE.findall(text))
+    other = sum(1 for ch in DEVANAGARI_RE.sub("", text) if ch.isalpha())
+    if not devanagari + other:
+        return 0.0
+    return devanagari / (devanagari + other)
+
+
+def looks_truncated(html):
+    """True if the HTML stops mid-tag or leaves block elements open."""
+    html = (html or "").rstrip()
+    if not html:
+        return True
+    if html.rfind("<") > html.rfind(">"):
+        return True
+    return len(OPEN_TAG_RE.findall(html)) > len(CLOSE_TAG_RE.findall(html))
+
+
+def quality_score(result):
+    """
+    Cheap 0..1 heuristic for a page result, combining how much of the OCR is
+    Devanagari and whether the translation is proportionate to the source.
+    """
+    hindi = strip_tags(result.get("hindi_ocr", ""))
+    english = strip_tags(result.get("english_translation", ""))
+    if not hindi.strip() or not english.strip():
+        return 0.0
+    script_score = min(devanagari_ratio(hindi) / MIN_DEVANAGARI_RATIO, 1.0)
+    length_score = min(len(english) / (len(hindi) * MIN_TRANSLATION_RATIO), 1.0)
+    return script_score * length_score
+
+
+def validate_result(result, min_quality=0.5):
+    """
+    Returns a list of problems found in a single page result; an empty list
+    means the page looks fine.
+    """
+    if not isinstance(result, dict):
+        return ["not a JSON object"]
+    if "error" in result:
+        return [f"error: {result['error']}"]
+    if "page_type" in result:
+        # Blank and picture pages were answered locally; there's nothing to check
+        return []
+
+    issues = []
+    for field in REQUIRED_FIELDS:
+        if not result.get(field):
+            issues.append(f"missing {field}")
+        elif looks_truncated(result[field]):
+            issues.append(f"truncated {field}")
+    if not issues:
+        score = quality_score(result)
+        if score < min_quality:
+            issues.append(f"low quality score {score:.2f}")
+    return issues
+
+
+def preview_issues(result, ink=None, fields=REQUIRED_FIELDS):
+    """
+    Cheap checks on a result from a downscaled page: complete JSON fields,
+    mostly Devanagari OCR, and OCR length in line with the page's ink
+    density. Returns a list of problems; empty means the preview was enough.
+    """
+    if not isinstance(result, dict):
+        return ["not a JSON object"]
+    if "error" in result:
+        return [f"error: {result['error']}"]
+
+    issues = []
+    for field in fields:
+        if not result.get(field):
+            issues.append(f"missing {field}")
+        elif looks_truncated(result[field]):
+            issues.append(f"truncated {field}")
+    hindi = strip_tags(result.get("hindi_ocr", ""))
+    if hindi.strip() and devanagari_ratio(hindi) < MIN_DEVANAGARI_RATIO:
+        issues.append(f"low Devanagari ratio {devanagari_ratio(hindi):.2f}")
+    if ink is not None and ink >= MIN_INK and len(hindi.strip()) < ink * MIN_CHARS_PER_INK:
+        issues.append(f"{len(hindi.strip())} characters for {ink:.0%} ink")
+    return issues
@@ -0,0 +1,386 @@
+"""
+Headless watch mode: digitizes scanner output as it lands in a folder.
+
+New images and PDFs in the watched folders are picked up once they have
+stopped changing, grouped into batches (by count or by waiting time) and
+run through the configured engine. Every page's result is kept in a SQLite
+results store and added to the full-text index; files already in the store
+are not processed again, so the daemon can be restarted at any time.
+
+    python -m jain_digitizer.common.watch_folder /srv/scans --batch-size 8 --batch-seconds 30
+
+On Linux the folders are watched with inotify (``pip install inotify_simple``);
+elsewhere, or with ``--polling``, they are rescanned every few seconds.
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from jain_digitizer.common.constants import (DEFAULT_PROMPT, DEFAULT_ESCALATION_MODEL, OCR_ENGINES,
+                                             DEFAULT_OCR_ENGINE, DEFAULT_WATCH_RESULTS)
+from jain_digitizer.common.backend import group_by_file
+from jain_digitizer.common.ingestion import file_digest
+from jain_digitizer.common.search_index import SearchIndex, DEFAULT_INDEX_PATH
+from jain_digitizer.common.logger_setup import logger
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+DEFAULT_RESULTS_PATH = DEFAULT_WATCH_RESULTS
+EXTENSIONS = (".png", ".jpg", ".jpeg", ".pdf")
+# Partial downloads and editor/scanner temp files
+IGNORED_SUFFIXES = (".part", ".tmp", ".crdownload", "~")
+# Seconds a file's size and mtime must stay unchanged before it's considered fully written
+DEFAULT_STABLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_BATCH_SECONDS = 30.0
+# Failed files are retried in later batches up to this many attempts
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    digest TEXT,
+    status TEXT,
+    attempts INTEGER DEFAULT 0,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT NOT NULL,
+    page TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    updated REAL,
+    PRIMARY KEY (path, page)
+);
+"""
+
+
+def is_candidate(path):
+    name = os.path.basename(path)
+    lower = name.lower()
+    return (not name.startswith(".") and lower.endswith(EXTENSIONS)
+            and not lower.endswith(IGNORED_SUFFIXES))
+
+
+class ResultsStore:
+    """
+    Per-file status and per-page results of the watch daemon. A file is
+    known by its path, size and mtime, so a rescanned or replaced file is
+    processed again.
+    """
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def needs_processing(self, path, stat):
+        with self._lock:
+            row = self.conn.execute("SELECT size, mtime_ns, status, attempts FROM files WHERE path = ?",
+                                    (path,)).fetchone()
+        if row is None or (row[0], row[1]) != (stat.st_size, stat.st_mtime_ns):
+            return True
+        return row[2] == "error" and row[3] < MAX_ATTEMPTS
+
+    def record(self, path, stat, page_results):
+        """Stores a processed file's [(page, result)]; the file counts as failed if any page failed."""
+        now = time.time()
+        failed = any(not r or "error" in r for _, r in page_results)
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT size, mtime_ns, attempts FROM files WHERE path = ?", (path,)).fetchone()
+            attempts = row[2] + 1 if row and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns) else 1
+            self.conn.execute(
+                """INSERT OR REPLACE INTO files (path, size, mtime_ns, digest, status, attempts, updated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (path, stat.st_size, stat.st_mtime_ns, file_digest(path), "error" if failed else "done", attempts, now),
+            )
+            self.conn.execute("DELETE FROM pages WHERE path = ?", (path,))
+            self.conn.executemany(
+                "INSERT INTO pages (path, page, result, error, updated) VALUES (?, ?, ?, ?, ?)",
+                [(path, page, json.dumps(result, ensure_ascii=False),
+                  (result or {}).get("error", "No result") if not result or "error" in result else None, now)
+                 for page, result in page_results],
+            )
+        return not failed
+
+    def pages(self, path):
+        with self._lock:
+            rows = self.conn.execute("SELECT page, result FROM pages WHERE path = ? ORDER BY rowid", (path,)).fetchall()
+        return [(page, json.loads(result)) for page, result in rows]
+
+    def counts(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+
+class FolderWatcher:
+    """
+    Reports files in ``folders`` once they are fully written, i.e. non-empty
+    with size and mtime unchanged for ``stable_seconds``. Each file is
+    reported once per version. Uses inotify to notice changes when
+    available, and otherwise rescans every ``poll_interval`` seconds.
+    """
+    def __init__(self, folders, stable_seconds=DEFAULT_STABLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 use_inotify=True, clock=time.monotonic):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.clock = clock
+        # path -> (size, mtime_ns, time the file was last seen changing)
+        self._pending = {}
+        # path -> (size, mtime_ns) already reported
+        self._reported = {}
+        self._inotify = None
+        # inotify watch descriptor -> folder
+        self._watches = {}
+        self._last_scan = None
+        if use_inotify and INOTIFY_AVAILABLE:
+            self._inotify = INotify()
+            mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE
+                    | inotify_flags.MODIFY | inotify_flags.DELETE)
+            for folder in self.folders:
+                self._watches[self._inotify.add_watch(folder, mask)] = folder
+            logger.info(f"Watching {', '.join(self.folders)} with inotify")
+        else:
+            logger.info(f"Watching {', '.join(self.folders)} by polling every {poll_interval:g}s")
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _scan(self):
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file() and is_candidate(entry.name):
+                            self._observe(entry.path)
+            except FileNotFoundError:
+                logger.warning(f"Watched folder {folder} does not exist")
+
+    def _observe(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            return
+        version = (stat.st_size, stat.st_mtime_ns)
+        if self._reported.get(path) == version:
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[:2] != version:
+            self._pending[path] = (*version, self.clock())
+
+    def _read_events(self, timeout):
+        changed = set()
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            folder = self._watches.get(event.wd)
+            if folder is None or not event.name or not is_candidate(event.name):
+                continue
+            path = os.path.join(folder, event.name)
+            if os.path.exists(path) or path in self._pending:
+                changed.add(path)
+        return changed
+
+    def poll(self, timeout=None):
+        """
+        Waits up to ``timeout`` seconds (default: one poll interval) for
+        changes and returns the paths that have become stable, oldest first
+        (by name within the same moment, so scanner pages keep their order).
+        """
+        timeout = self.poll_interval if timeout is None else timeout
+        now = self.clock()
+        if self._inotify:
+            # Full rescans are only a safety net for events inotify can't see (e.g. network shares)
+            if self._last_scan is None or now - self._last_scan >= self.poll_interval * 10:
+                self._scan()
+                self._last_scan = now
+            # Wake up in time to notice pending files becoming stable
+            wait = min([timeout] + [max(t + self.stable_seconds - now, 0.0) for _, _, t in self._pending.values()])
+            for path in self._read_events(wait):
+                self._observe(path)
+        else:
+            self._scan()
+            time.sleep(timeout)
+        for path in list(self._pending):
+            self._observe(path)
+
+        now = self.clock()
+        ready = []
+        for path, (size, mtime_ns, changed) in sorted(self._pending.items(), key=lambda item: (item[1][2], item[0])):
+            if size > 0 and now - changed >= self.stable_seconds:
+                ready.append(path)
+                self._reported[path] = (size, mtime_ns)
+                del self._pending[path]
+        return ready
+
+
+class WatchDaemon:
+    """
+    Batches ready files from a FolderWatcher and runs them through a fresh
+    backend from ``backend_factory()``. A batch is sent once it holds
+    ``batch_size`` files or its oldest file has waited ``batch_seconds``.
+    """
+    def __init__(self, watcher, store, backend_factory, batch_size=DEFAULT_BATCH_SIZE,
+                 batch_seconds=DEFAULT_BATCH_SECONDS, index_path=DEFAULT_INDEX_PATH, clock=time.monotonic):
+        self.watcher = watcher
+        self.store = store
+        self.backend_factory = backend_factory
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.index_path = index_path
+        self.clock = clock
+        self.queue = []
+        self.queued_at = None
+        self.stop_event = threading.Event()
+        self.backend = None
+
+    def stop(self):
+        self.stop_event.set()
+        if self.backend is not None:
+            self.backend.cancel_token.cancel("Watch daemon stopped")
+
+    def enqueue(self, paths):
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if path not in self.queue and self.store.needs_processing(path, stat):
+                self.queue.append(path)
+        if self.queue and self.queued_at is None:
+            self.queued_at = self.clock()
+
+    def batch_due(self):
+        if not self.queue:
+            return False
+        return len(self.queue) >= self.batch_size or self.clock() - self.queued_at >= self.batch_seconds
+
+    def process_batch(self):
+        """Processes up to ``batch_size`` queued files. Returns the number of files stored."""
+        batch, self.queue = self.queue[:self.batch_size], self.queue[self.batch_size:]
+        self.queued_at = self.clock() if self.queue else None
+        stats = {path: os.stat(path) for path in batch if os.path.exists(path)}
+        batch = [path for path in batch if path in stats]
+        if not batch:
+            return 0
+
+        logger.info(f"Watch batch: {len(batch)} files")
+        self.backend = self.backend_factory()
+        try:
+            results = self.backend.translate_files(batch)
+        except Exception as e:
+            logger.exception(f"Watch batch failed: {str(e)}")
+            results = [{"error": str(e)} for _ in batch]
+        finally:
+            self.backend = None
+
+        by_file = group_by_file(batch, results)
+        stored = 0
+        for path in batch:
+            if not by_file[path] or any(r and r.get("cancelled") for _, r in by_file[path]):
+                # Stopped mid-batch; leave it for the next run
+                continue
+            if not self.store.record(path, stats[path], by_file[path]) and not self.stop_event.is_set():
+                # Failed pages are retried in a later batch, up to MAX_ATTEMPTS
+                self.enqueue([path])
+            stored += 1
+        self._index(by_file)
+        return stored
+
+    def _index(self, by_file):
+        if not self.index_path:
+            return
+        try:
+            with SearchIndex(self.index_path) as index:
+                for path, pages in by_file.items():
+                    book = os.path.basename(os.path.dirname(path)) or "Untitled"
+                    index.add_results(book, [r for _, r in pages], [p for p, _ in pages])
+        except Exception as e:
+            logger.exception(f"Failed to index watch batch: {str(e)}")
+
+    def run(self):
+        logger.info(f"Watch daemon started ({self.watcher.mode}); batches of {self.batch_size} files "
+                    f"or every {self.batch_seconds:g}s")
+        while not self.stop_event.is_set():
+            self.enqueue(self.watcher.poll())
+            while self.batch_due() and not self.stop_event.is_set():
+                self.process_batch()
+        logger.info(f"Watch daemon stopped; results: {self.store.counts()}")
+
+
+def backend_factory(engine, api_key, prompt=DEFAULT_PROMPT):
+    """Returns a function building a fresh backend for each batch, as the desktop app does."""
+    from jain_digitizer.common.translator import Translator
+    from jain_digitizer.common.pipeline import LocalFirstTranslator
+    from jain_digitizer.common.local_ocr import TesseractBackend
+
+    def factory():
+        if engine == "local":
+            return TesseractBackend()
+        if engine == "local-first":
+            return LocalFirstTranslator(api_key)
+        return Translator(api_key, prompt, escalation_model=DEFAULT_ESCALATION_MODEL)
+    return factory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Digitize scanner output as it arrives in watched folders")
+    parser.add_argument("folders", nargs="+", help="Folders to watch")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, help="Results store (SQLite)")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Full-text index to add pages to ('' to skip)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Files per batch")
+    parser.add_argument("--batch-seconds", type=float, default=DEFAULT_BATCH_SECONDS,
+                        help="Send a partial batch once its oldest file has waited this long")
+    parser.add_argument("--stable-seconds", type=float, default=DEFAULT_STABLE_SECONDS,
+                        help="Seconds a file must stop changing before it is processed")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--polling", action="store_true", help="Rescan folders instead of using inotify")
+    parser.add_argument("--engine", choices=list(OCR_ENGINES), default=DEFAULT_OCR_ENGINE)
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY", ""))
+    args = parser.parse_args(argv)
+
+    if not args.api_key and args.engine != "local":
+        print("Set GEMINI_API_KEY or pass --api-key", file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(args.folders, args.stable_seconds, args.poll_interval, use_inotify=not args.polling)
+    store = ResultsStore(args.results)
+    daemon = WatchDaemon(watcher, store, backend_factory(args.engine, args.api_key),
+                         args.batch_size, args.batch_seconds, args.index)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        watcher.close()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,28 @@
 import os
 import json
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QPushButton, QMessageBox, QSplitter, QApplication, QProgressBar)
+                             QHBoxLayout, QPushButton, QMessageBox, QSplitter, QApplication, QProgressBar, QDockWidget)
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QIcon
 
 from jain_digitizer.desktop.rich_editor import HtmlRichEditor
 from jain_digitizer.desktop.settings_dialog import SettingsDialog
 from jain_digitizer.desktop.file_drop_zone import FileDropZone
-from jain_digitizer.common.constants import DEFAULT_PROMPT
-from jain_digitizer.common.translator import Translator
-from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.constants import (DEFAULT_PROMPT, OCR_PROMPT, TRANSLATION_PROMPT,
+                                             DEFAULT_BATCH_DEADLINE, DEFAULT_OCR_ENGINE, CASSETTE_MODE,
+                                             DEFAULT_RASTER_DPI, DEFAULT_ENGINE_PROCESS, DEFAULT_PAGE_FILTER)
+from jain_digitizer.common.backend import group_by_file, starts_file
+from jain_digitizer.common.cancellation import CancelToken
+from jain_digitizer.common.engine_process import EngineProcess, build_backend
+from jain_digitizer.common.metrics import default_metrics
+from jain_digitizer.common.translator import skipped_notice
+from jain_digitizer.common.export import export_book, LAYOUTS
+from jain_digitizer.common.search_index import SearchIndex, DEFAULT_INDEX_PATH
+from jain_digitizer.common.progress import ProgressTracker, format_eta
+from jain_digitizer.common.logger_setup import logger, truncate_payload
 from jain_digitizer.desktop.overlay import LoadingOverlay
+from jain_digitizer.desktop.search_panel import SearchPanel
+from jain_digitizer.desktop.perf_panel import PerfPanel
 try:
     from jain_digitizer.desktop.camera_dialog import CameraDialog
     MULTIMEDIA_AVAILABLE = True
@@ -20,27 +31,97 @@ except ImportError as e:
     MULTIMEDIA_AVAILABLE = False
 from PySide6.QtWidgets import QLabel
 
+def page_labels(file_list, results):
+    """Per-result labels: the page name for rasterized PDF pages, the file name otherwise."""
+    return [label for pages in group_by_file(file_list, results).values() for label, _ in pages]
+
 class TranslationWorker(QThread):
     finished = Signal(list)
     error = Signal(str)
+    # Emitted per finished chunk: ProgressTracker snapshot plus "pages": [(index, result), ...]
+    progress = Signal(dict)
 
-    def __init__(self, translator, file_list):
+    def __init__(self, translator, file_list, index_path=None):
         super().__init__()
         self.translator = translator
         self.file_list = file_list
+        self.index_path = index_path
+        self.tracker = ProgressTracker(len(file_list))
 
     def run(self):
+        self.translator.progress_callback = self.report_progress
         try:
             results = self.translator.translate_files(self.file_list)
+            self.index_results(results)
+            self.finished.emit(results)
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def cancel(self):
+        """Stops scheduling new requests and abandons in-flight ones; finished pages are still emitted."""
+        self.translator.cancel_token.cancel()
+
+    def report_progress(self, indices, results):
+        # May be called from the translator's pool threads; Qt queues the signal to the GUI thread
+        errors = sum(1 for r in results if not r or "error" in r or "translation_error" in r)
+        if self.translator.page_total:
+            # PDFs are split into pages, so the batch can be larger than the file list
+            self.tracker.total = self.translator.page_total
+        event = self.tracker.update(len(indices), errors)
+        event["pages"] = list(zip(indices, results))
+        self.progress.emit(event)
+
+    def index_results(self, results):
+        """Adds the batch to the full-text index; failures never fail the batch."""
+        if not self.index_path or not self.file_list:
+            return
+        try:
+            with SearchIndex(self.index_path) as index:
+                # Each page belongs to the book (folder) of its own file
+                for path, pages in group_by_file(self.file_list, results).items():
+                    book = os.path.basename(os.path.dirname(os.path.abspath(path))) or "Untitled"
+                    index.add_results(book, [r for _, r in pages], [label for label, _ in pages])
+        except Exception as e:
+            logger.exception(f"Failed to index results: {str(e)}")
+
+class ProcessTranslationWorker(TranslationWorker):
+    """
+    Runs the batch in a child process (see ``common/engine_process.py``).
+    This thread only decodes the compact page messages and emits the same
+    signals as ``TranslationWorker``.
+    """
+    def __init__(self, settings, file_list, index_path=None):
+        super().__init__(None, file_list, index_path)
+        self.engine = EngineProcess(settings, file_list, on_pages=self.report_pages)
+        self.metrics = self.engine.metrics
+
+    def run(self):
+        try:
+            results = self.engine.run()
+            self.index_results(results)
             self.finished.emit(results)
         except Exception as e:
             self.error.emit(str(e))
 
+    def cancel(self):
+        self.engine.cancel()
+
+    def report_pages(self, page_total, indices, results):
+        errors = sum(1 for r in results if not r or "error" in r or "translation_error" in r)
+        if page_total:
+            self.tracker.total = page_total
+        event = self.tracker.update(len(indices), errors)
+        event["pages"] = list(zip(indices, results))
+        self.progress.emit(event)
+
 class JainDigitizer(QMainWindow):
     def __init__(self):
         super().__init__()
         logger.info("Initializing Main Window")
         self.setWindowTitle("Jain Digitizer")
+        if CASSETTE_MODE:
+            # Make it obvious that Gemini traffic is being recorded or replayed
+            self.setWindowTitle(f"Jain Digitizer [{CASSETTE_MODE}]")
         self.resize(1200, 900)
         
         # Set Window Icon
@@ -51,7 +132,20 @@ class JainDigitizer(QMainWindow):
         # App State
         self.api_key = ""
         self.system_prompt = DEFAULT_PROMPT
+        self.context_cache = False
+        self.two_stage = False
+        self.ocr_prompt = OCR_PROMPT
+        self.translation_prompt = TRANSLATION_PROMPT
+        self.ocr_engine = DEFAULT_OCR_ENGINE
+        self.raster_dpi = DEFAULT_RASTER_DPI
+        self.page_filter = DEFAULT_PAGE_FILTER
+        self.engine_process = DEFAULT_ENGINE_PROCESS
         self.file_list = []
+        self.results = [] # Per-page results of the last batch, used for export
+        self.pending_pages = {} # Finished pages waiting for earlier ones before display
+        self.next_display = 0 # Index of the next page to append to the editors
+        self.display_file = -1 # Position in file_list of the last page appended
+        self.index_path = DEFAULT_INDEX_PATH
         self.worker = None # Track worker
         
         self.init_ui()
@@ -125,6 +219,36 @@ class JainDigitizer(QMainWindow):
         
         top_layout.addWidget(btn_container)
 
+        # Secondary button stack
+        btn_container2 = QWidget()
+        btn_layout2 = QVBoxLayout(btn_container2)
+        btn_layout2.setContentsMargins(0, 0, 0, 0)
+        btn_layout2.setSpacing(5)
+        self.btn_export = QPushButton("💾 Export")
+        self.btn_export.setFixedHeight(30)
+        self.btn_export.setFixedWidth(150)
+        self.btn_export.setToolTip("Export processed pages to DOCX, HTML, EPUB or Markdown")
+        self.btn_export.clicked.connect(self.export_results)
+
+        self.btn_search = QPushButton("🔍 Search")
+        self.btn_search.setFixedHeight(30)
+        self.btn_search.setFixedWidth(150)
+        self.btn_search.setToolTip("Search every digitized page")
+        self.btn_search.clicked.connect(self.toggle_search)
+
+        self.btn_stats = QPushButton("📈 Stats")
+        self.btn_stats.setFixedHeight(30)
+        self.btn_stats.setFixedWidth(150)
+        self.btn_stats.setToolTip("Live request, latency, token and cache stats")
+        self.btn_stats.clicked.connect(self.toggle_stats)
+
+        btn_layout2.addWidget(self.btn_export)
+        btn_layout2.addWidget(self.btn_search)
+        btn_layout2.addWidget(self.btn_stats)
+        btn_layout2.addStretch()
+
+        top_layout.addWidget(btn_container2)
+
         # --- Workspace ---
         splitter = QSplitter(Qt.Horizontal)
         self.hindi_editor = HtmlRichEditor("HINDI OCR (SOURCE)...")
@@ -137,15 +261,14 @@ class JainDigitizer(QMainWindow):
         
         # --- Progress Bar ---
         self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 0) # Indeterminate
-        self.progress_bar.setHeight = 10
+        self.progress_bar.setRange(0, 0) # Indeterminate until the batch size is known
         self.progress_bar.setVisible(False)
         self.progress_bar.setStyleSheet("""
             QProgressBar {
                 border: 1px solid rgba(128, 128, 128, 0.5);
                 border-radius: 5px;
                 text-align: center;
-                height: 10px;
+                height: 16px;
             }
             QProgressBar::chunk {
                 background-color: #3498db;
@@ -157,6 +280,21 @@ class JainDigitizer(QMainWindow):
         main_layout.addWidget(self.progress_bar)
         main_layout.addWidget(splitter)
 
+        # --- Search Dock ---
+        self.search_panel = SearchPanel(self.index_path)
+        self.search_panel.page_selected.connect(self.show_indexed_page)
+        self.search_dock = QDockWidget("Search", self)
+        self.search_dock.setWidget(self.search_panel)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.search_dock)
+        self.search_dock.hide()
+
+        # --- Stats Dock ---
+        self.perf_panel = PerfPanel()
+        self.stats_dock = QDockWidget("Stats", self)
+        self.stats_dock.setWidget(self.perf_panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.stats_dock)
+        self.stats_dock.hide()
+
         # --- Loading Overlay ---
         self.loading_overlay = LoadingOverlay(self.centralWidget())
         self.loading_overlay.hide()
@@ -168,26 +306,60 @@ class JainDigitizer(QMainWindow):
                     data = json.load(f)
                     self.api_key = data.get("api_key", "")
                     self.system_prompt = data.get("prompt", DEFAULT_PROMPT)
+                    self.context_cache = data.get("context_cache", False)
+                    self.two_stage = data.get("two_stage", False)
+                    self.ocr_prompt = data.get("ocr_prompt", OCR_PROMPT)
+                    self.translation_prompt = data.get("translation_prompt", TRANSLATION_PROMPT)
+                    self.ocr_engine = data.get("ocr_engine", DEFAULT_OCR_ENGINE)
+                    self.raster_dpi = data.get("raster_dpi", DEFAULT_RASTER_DPI)
+                    self.engine_process = data.get("engine_process", DEFAULT_ENGINE_PROCESS)
+                    self.page_filter = data.get("page_filter", DEFAULT_PAGE_FILTER)
             except: pass
 
     def save_settings(self):
         with open("settings.json", "w") as f:
-            json.dump({"api_key": self.api_key, "prompt": self.system_prompt}, f)
+            json.dump({
+                "api_key": self.api_key,
+                "prompt": self.system_prompt,
+                "context_cache": self.context_cache,
+                "two_stage": self.two_stage,
+                "ocr_prompt": self.ocr_prompt,
+                "translation_prompt": self.translation_prompt,
+                "ocr_engine": self.ocr_engine,
+                "raster_dpi": self.raster_dpi,
+                "engine_process": self.engine_process,
+                "page_filter": self.page_filter,
+            }, f)
 
     def open_settings(self):
-        diag = SettingsDialog(self, self.api_key, self.system_prompt)
+        diag = SettingsDialog(self, self.api_key, self.system_prompt, self.context_cache,
+                              self.two_stage, self.ocr_prompt, self.translation_prompt, self.ocr_engine,
+                              self.raster_dpi, self.engine_process, self.page_filter)
         if diag.exec():
             self.api_key = diag.api_key_input.text()
             self.system_prompt = diag.prompt_input.toPlainText()
+            self.context_cache = diag.context_cache_input.isChecked()
+            self.two_stage = diag.two_stage_input.isChecked()
+            self.ocr_prompt = diag.ocr_prompt_input.toPlainText()
+            self.translation_prompt = diag.translation_prompt_input.toPlainText()
+            self.ocr_engine = diag.ocr_engine_input.currentData()
+            self.raster_dpi = diag.raster_dpi_input.value()
+            self.engine_process = diag.engine_process_input.isChecked()
+            self.page_filter = diag.page_filter_input.isChecked()
             self.save_settings()
 
     def process_file(self):
+        if self.worker is not None and self.worker.isRunning():
+            # The process button doubles as Stop while a batch runs
+            self.cancel_processing()
+            return
+
         if not self.file_list:
             logger.warning("Process clicked with no files selected")
             QMessageBox.warning(self, "No Files", "Please select or drop files first.")
             return
 
-        if not self.api_key:
+        if not self.api_key and self.ocr_engine != "local" and CASSETTE_MODE != "replay":
             logger.error("Process clicked without API key")
             QMessageBox.critical(self, "Error", "Please provide a Gemini API Key in Settings.")
             return
@@ -195,59 +367,129 @@ class JainDigitizer(QMainWindow):
         logger.info(f"UI initiating batch processing for {len(self.file_list)} files")
         
         # UI Feedback
-        self.btn_process.setEnabled(False)
         self.btn_clear.setEnabled(False)
-        self.btn_process.setText("⏳ Processing...")
+        self.btn_process.setText("⏹ Stop")
+        self.btn_process.setStyleSheet("background-color: #e74c3c; color: white; font-weight: bold;")
+        self.progress_bar.setRange(0, len(self.file_list))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat(f"0 / {len(self.file_list)} pages")
         self.progress_bar.setVisible(True)
+        # The overlay only covers the wait for the first pages; it's removed once results arrive
         self.loading_overlay.setGeometry(self.centralWidget().rect())
         self.loading_overlay.show()
         
         # Clear editors before starting
         self.hindi_editor.clear()
         self.english_editor.clear()
+        self.results = []
+        self.pending_pages = {}
+        self.next_display = 0
+        self.display_file = -1
 
-        # Initialize the Translator library
-        translator = Translator(self.api_key, self.system_prompt)
+        settings = {
+            "api_key": self.api_key,
+            "system_prompt": self.system_prompt,
+            "context_cache": self.context_cache,
+            "two_stage": self.two_stage,
+            "ocr_prompt": self.ocr_prompt,
+            "translation_prompt": self.translation_prompt,
+            "ocr_engine": self.ocr_engine,
+            "raster_dpi": self.raster_dpi,
+            "page_filter": self.page_filter,
+        }
+        if self.engine_process:
+            # The engine and its metrics live in the child process
+            self.worker = ProcessTranslationWorker(settings, self.file_list, self.index_path)
+            self.perf_panel.metrics = self.worker.metrics
+        else:
+            translator = build_backend(settings, CancelToken(DEFAULT_BATCH_DEADLINE))
+            self.worker = TranslationWorker(translator, self.file_list, self.index_path)
+            self.perf_panel.metrics = default_metrics
 
-        # Create and start the worker thread
-        self.worker = TranslationWorker(translator, self.file_list)
+        # Start the worker thread
         self.worker.finished.connect(self.on_processing_finished)
         self.worker.error.connect(self.on_processing_error)
+        self.worker.progress.connect(self.on_processing_progress)
         self.worker.start()
 
+    def cancel_processing(self):
+        logger.info("User requested to stop processing")
+        self.btn_process.setEnabled(False)
+        self.btn_process.setText("⏳ Stopping...")
+        self.worker.cancel()
+
+    def on_processing_progress(self, event):
+        self.loading_overlay.hide()
+        self.progress_bar.setMaximum(event["total"])
+        self.progress_bar.setValue(event["pages_done"])
+        text = f"{event['pages_done']} / {event['total']} pages"
+        if event["pages_per_minute"]:
+            text += f" · {event['pages_per_minute']:.1f} pages/min · ETA {format_eta(event['eta_seconds'])}"
+        if event["errors"]:
+            text += f" · {event['errors']} errors"
+        self.progress_bar.setFormat(text)
+
+        # Pages can finish out of order; show them in file order as soon as the gap closes
+        for idx, result in event["pages"]:
+            self.pending_pages[idx] = result
+        while self.next_display in self.pending_pages:
+            self.display_result(self.next_display, self.pending_pages.pop(self.next_display))
+            self.next_display += 1
+
     def on_processing_finished(self, results):
-        logger.info("Background processing finished successfully")
+        cancelled = sum(1 for r in results if r and r.get("cancelled"))
+        if cancelled:
+            logger.warning(f"Background processing stopped; {cancelled} files were not processed")
+        else:
+            logger.info("Background processing finished successfully")
+        self.results = results
         try:
-            for idx, result in enumerate(results):
-                file_path = self.file_list[idx] if idx < len(self.file_list) else "Unknown"
-                basename = os.path.basename(file_path)
-                logger.debug(f"Displaying results for {basename}")
-                
-                if result:
-                    if "error" in result:
-                        logger.error(f"Error result received for {basename}: {result['error']}")
-                        if "raw" in result:
-                            logger.error(f"Full raw response for {basename} that failed to parse: {result['raw']}")
-                        self.hindi_editor.append(f"\n[ERROR processing {basename}: {result['error']}]\n")
-                        continue
-                        
-                    # Append Results
-                    # The prompt now provides HTML headers like <h1>[X] File: Filename</h1>
-                    # We can just append the HTML directly.
-                    
-                    # Hindi OCR
-                    self.hindi_editor.append(result.get("hindi_ocr", ""))
-                    self.hindi_editor.append("<hr/>") # Add a separator between files
-                    
-                    # English/IAST
-                    self.english_editor.append(result.get("english_translation", ""))
-                    self.english_editor.append("<hr/>") # Add a separator between files
+            for idx in range(self.next_display, len(results)):
+                self.display_result(idx, results[idx])
+            self.next_display = len(results)
         except Exception as e:
             logger.exception(f"Error display results: {str(e)}")
             QMessageBox.critical(self, "Display Error", f"Error displaying results: {str(e)}")
         finally:
             self.finalize_processing()
 
+    def display_result(self, idx, result):
+        # Pages arrive in order; a rasterized PDF contributes several of them
+        if self.display_file < 0 or starts_file(result):
+            self.display_file += 1
+        file_path = self.file_list[self.display_file] if self.display_file < len(self.file_list) else "Unknown"
+        basename = (result or {}).get("source") or os.path.basename(file_path)
+        logger.debug(f"Displaying results for {basename}")
+
+        if not result or result.get("cancelled"):
+            return
+        if "error" in result:
+            logger.error(f"Error result received for {basename}: {result['error']}")
+            if "raw" in result:
+                logger.error(f"Full raw response for {basename} that failed to parse: {truncate_payload(result['raw'])}")
+            self.hindi_editor.append(f"\n[ERROR processing {basename}: {result['error']}]\n")
+            return
+
+        # Append Results
+        # The prompt now provides HTML headers like <h1>[X] File: Filename</h1>
+        # We can just append the HTML directly.
+
+        notice = skipped_notice(result, basename)
+        if notice:
+            # Answered by the page filter rather than the model
+            for editor in (self.hindi_editor, self.english_editor):
+                editor.append(notice)
+                editor.append("<hr/>")
+            return
+
+        # Hindi OCR
+        self.hindi_editor.append(result.get("hindi_ocr", ""))
+        self.hindi_editor.append("<hr/>") # Add a separator between files
+
+        # English/IAST
+        self.english_editor.append(result.get("english_translation", ""))
+        self.english_editor.append("<hr/>") # Add a separator between files
+
     def on_processing_error(self, error_msg):
         logger.error(f"Background processing error: {error_msg}")
         QMessageBox.critical(self, "Processing Error", error_msg)
@@ -255,11 +497,55 @@ class JainDigitizer(QMainWindow):
 
     def finalize_processing(self):
         self.btn_process.setText("🚀 Start Processing")
+        self.btn_process.setStyleSheet("background-color: #2ecc71; color: white; font-weight: bold;")
         self.btn_process.setEnabled(True)
         self.btn_clear.setEnabled(True)
         self.progress_bar.setVisible(False)
         self.loading_overlay.hide()
 
+    def export_results(self):
+        if not self.results:
+            QMessageBox.warning(self, "Nothing to Export", "Please process some files first.")
+            return
+
+        from PySide6.QtWidgets import QFileDialog, QInputDialog
+        filters = {
+            "Word Document (*.docx)": ".docx",
+            "HTML (*.html)": ".html",
+            "EPUB (*.epub)": ".epub",
+            "Markdown (*.md)": ".md",
+        }
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Book", "book.docx", ";;".join(filters))
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += filters.get(selected_filter, ".docx")
+
+        layout, ok = QInputDialog.getItem(self, "Export Layout", "Page layout:", list(LAYOUTS), 0, False)
+        if not ok:
+            return
+
+        try:
+            labels = page_labels(self.file_list, self.results)
+            pages = export_book(self.results, path, layout=layout, labels=labels)
+            QMessageBox.information(self, "Export Complete", f"Exported {pages} pages to {path}")
+        except Exception as e:
+            logger.exception(f"Export failed: {str(e)}")
+            QMessageBox.critical(self, "Export Error", f"Error exporting results: {str(e)}")
+
+    def toggle_search(self):
+        self.search_dock.setVisible(not self.search_dock.isVisible())
+        if self.search_dock.isVisible():
+            self.search_panel.query_input.setFocus()
+
+    def toggle_stats(self):
+        self.stats_dock.setVisible(not self.stats_dock.isVisible())
+
+    def show_indexed_page(self, page):
+        logger.info(f"Opening indexed page {page['book']} / {page['page']}")
+        self.hindi_editor.setHtml(page.get("hindi_html") or "")
+        self.english_editor.setHtml(page.get("english_html") or "")
+
     def open_camera(self):
         diag = CameraDialog(self)
         diag.image_captured.connect(self.add_files)
@@ -284,6 +570,7 @@ class JainDigitizer(QMainWindow):
 
     def clear_files(self):
         self.file_list = []
+        self.results = []
         self.update_drop_zone_text()
         self.hindi_editor.clear()
         self.english_editor.clear()
@@ -299,6 +586,12 @@ class JainDigitizer(QMainWindow):
             self.drop_zone.setText(f"Selected {len(self.file_list)} files")
             self.drop_zone.set_default_style()
 
+    def closeEvent(self, event):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait(1000)
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if hasattr(self, 'loading_overlay') and self.loading_overlay.isVisible():
@@ -1,8 +1,11 @@
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from jain_digitizer.desktop.app_window import JainDigitizer
 
 def main():
+    # The local OCR engine runs in worker processes; needed for frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = JainDigitizer()
     window.show()
@@ -0,0 +1,107 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QGridLayout, QLabel, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt, QTimer
+from jain_digitizer.common.metrics import default_metrics
+
+# Milliseconds between refreshes while the panel is visible
+REFRESH_INTERVAL = 1000
+
+COLUMNS = [
+    ("Tier", None),
+    ("Requests", "requests"),
+    ("In flight", "in_flight"),
+    ("p50 s", "latency_p50"),
+    ("p95 s", "latency_p95"),
+    ("p99 s", "latency_p99"),
+    ("In tokens", "prompt_tokens"),
+    ("Out tokens", "output_tokens"),
+    ("Errors", "errors"),
+    ("429s", "throttled"),
+    ("Retries", "retries"),
+    ("Hedges", "hedges"),
+]
+
+
+def _cell(value):
+    if value is None:
+        return "–"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+class PerfPanel(QWidget):
+    """
+    Live runtime stats from the in-process request metrics: requests in
+    flight, throughput, latency percentiles, tokens, cache hit rates and
+    retries. Refreshes on a timer, only while visible; each refresh reads
+    one metrics snapshot and never waits on a request.
+    """
+    def __init__(self, metrics=default_metrics, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        summary = QGridLayout()
+        self.summary_labels = {}
+        for pos, (key, title) in enumerate([
+            ("in_flight", "In flight"),
+            ("pages_per_minute", "Pages/min"),
+            ("tokens", "Tokens in / out"),
+            ("caches", "Cache hit rate"),
+            ("retries", "Retries / 429s"),
+        ]):
+            summary.addWidget(QLabel(f"{title}:"), pos, 0)
+            value = QLabel("–")
+            value.setStyleSheet("font-weight: bold;")
+            value.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            summary.addWidget(value, pos, 1)
+            self.summary_labels[key] = value
+        layout.addLayout(summary)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table, 1)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        tiers = self.metrics.snapshot()
+        caches = self.metrics.caches()
+
+        total = lambda field: sum(stats[field] for stats in tiers.values())
+        self.summary_labels["in_flight"].setText(str(total("in_flight")))
+        self.summary_labels["pages_per_minute"].setText(f"{self.metrics.pages_per_minute():.1f}")
+        self.summary_labels["tokens"].setText(f"{total('prompt_tokens'):,} / {total('output_tokens'):,}")
+        self.summary_labels["caches"].setText(", ".join(
+            f"{name} {stats['hit_rate']:.0%}" for name, stats in sorted(caches.items()) if stats["hit_rate"] is not None
+        ) or "–")
+        self.summary_labels["retries"].setText(f"{total('retries')} / {total('throttled')}")
+
+        self.table.setRowCount(len(tiers))
+        for row, (tier, stats) in enumerate(sorted(tiers.items())):
+            for col, (_, field) in enumerate(COLUMNS):
+                text = tier if field is None else _cell(stats[field])
+                item = self.table.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if field is not None:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.table.setItem(row, col, item)
+                item.setText(text)
@@ -0,0 +1,87 @@
+import os
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel)
+from PySide6.QtCore import Qt, QTimer, Signal
+from jain_digitizer.common.search_index import SearchIndex, DEFAULT_INDEX_PATH
+from jain_digitizer.common.logger_setup import logger
+
+class SearchPanel(QWidget):
+    """
+    Search box over the local full-text index of every digitized page.
+    Double-clicking a hit emits ``page_selected`` with the page's stored HTML.
+    """
+    page_selected = Signal(dict)
+
+    def __init__(self, index_path=DEFAULT_INDEX_PATH, parent=None):
+        super().__init__(parent)
+        self.index_path = index_path
+        self.index = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(5, 5, 5, 5)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("Search Hindi or IAST (e.g. अरिहंत*, acarya)")
+        self.query_input.textChanged.connect(self.schedule_search)
+        layout.addWidget(self.query_input)
+
+        self.results_list = QListWidget()
+        self.results_list.setWordWrap(True)
+        self.results_list.itemDoubleClicked.connect(self.open_result)
+        layout.addWidget(self.results_list, 1)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #888; font-size: 11px;")
+        layout.addWidget(self.status_label)
+
+        # Debounce typing so we query once the user pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
+
+    def schedule_search(self):
+        self.search_timer.start()
+
+    def _get_index(self):
+        if self.index is None:
+            if not os.path.exists(self.index_path):
+                return None
+            self.index = SearchIndex(self.index_path)
+        return self.index
+
+    def run_search(self):
+        self.results_list.clear()
+        query = self.query_input.text().strip()
+        if not query:
+            self.status_label.setText("")
+            return
+
+        index = self._get_index()
+        if index is None:
+            self.status_label.setText("Nothing indexed yet. Process some pages first.")
+            return
+
+        try:
+            hits = index.search(query)
+        except Exception as e:
+            logger.warning(f"Search failed for '{query}': {e}")
+            self.status_label.setText("Invalid search query")
+            return
+
+        for hit in hits:
+            snippet = hit["hindi_snippet"] if "«" in hit["hindi_snippet"] else hit["english_snippet"]
+            item = QListWidgetItem(f"{hit['book']} / {hit['page']}\n{snippet}")
+            item.setData(Qt.UserRole, hit["id"])
+            self.results_list.addItem(item)
+        self.status_label.setText(f"{len(hits)} results")
+
+    def open_result(self, item):
+        page = self._get_index().get_page(item.data(Qt.UserRole))
+        if page:
+            self.page_selected.emit(page)
+
+    def closeEvent(self, event):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        super().closeEvent(event)
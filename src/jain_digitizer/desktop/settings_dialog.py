@@ -1,12 +1,15 @@
 import os
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, 
-                             QLabel, QPushButton, QSizePolicy, QHBoxLayout, QWidget, QPlainTextEdit, QSplitter, QTextEdit)
+                             QLabel, QPushButton, QSizePolicy, QHBoxLayout, QWidget, QPlainTextEdit, QSplitter, QTextEdit, QCheckBox, QTabWidget, QComboBox, QSpinBox)
 from PySide6.QtGui import QFont
 from PySide6.QtCore import Qt
 from jain_digitizer.version import __version__, __commit__
+from jain_digitizer.common.constants import OCR_ENGINES, DEFAULT_RASTER_DPI, DEFAULT_PAGE_FILTER
 
 class SettingsDialog(QDialog):
-    def __init__(self, parent=None, api_key="", prompt=""):
+    def __init__(self, parent=None, api_key="", prompt="", context_cache=False,
+                 two_stage=False, ocr_prompt="", translation_prompt="", ocr_engine="gemini",
+                 raster_dpi=DEFAULT_RASTER_DPI, engine_process=False, page_filter=DEFAULT_PAGE_FILTER):
         super().__init__(parent)
         self.setWindowTitle("Settings")
         self.resize(800, 600)
@@ -14,7 +17,7 @@ class SettingsDialog(QDialog):
         main_layout = QVBoxLayout(self)
         
         # API Key Section
-        label_api = QLabel("Gemini API Key:")
+        label_api = QLabel("Gemini API Key(s):")
         main_layout.addWidget(label_api)
         
         # API Key Field with Show/Hide toggle
@@ -23,7 +26,8 @@ class SettingsDialog(QDialog):
         self.api_key_layout.setContentsMargins(0, 0, 0, 0)
         
         self.api_key_input = QLineEdit(api_key)
-        self.api_key_input.setPlaceholderText("Enter your Gemini API Key")
+        self.api_key_input.setPlaceholderText("Enter your Gemini API Key (separate several keys with commas)")
+        self.api_key_input.setToolTip("With several keys, requests are spread across them and throttled keys are rested.")
         self.api_key_input.setEchoMode(QLineEdit.Password)
         
         self.reveal_btn = QPushButton("Show")
@@ -36,6 +40,58 @@ class SettingsDialog(QDialog):
         self.api_key_layout.addWidget(self.reveal_btn)
         
         main_layout.addWidget(self.api_key_container)
+
+        # Context caching
+        self.context_cache_input = QCheckBox("Cache system prompt on Gemini servers (faster, cheaper for large batches)")
+        self.context_cache_input.setChecked(context_cache)
+        main_layout.addWidget(self.context_cache_input)
+
+        # Two-stage pipeline
+        self.two_stage_input = QCheckBox("Two-stage pipeline: OCR first, then translate the cached OCR text")
+        self.two_stage_input.setToolTip("Editing the translation prompt then re-runs only the translation, without re-uploading images")
+        self.two_stage_input.setChecked(two_stage)
+        main_layout.addWidget(self.two_stage_input)
+
+        # OCR engine
+        engine_row = QWidget()
+        engine_layout = QHBoxLayout(engine_row)
+        engine_layout.setContentsMargins(0, 0, 0, 0)
+        engine_layout.addWidget(QLabel("OCR engine:"))
+        self.ocr_engine_input = QComboBox()
+        for engine, label in OCR_ENGINES.items():
+            self.ocr_engine_input.addItem(label, engine)
+        self.ocr_engine_input.setCurrentIndex(max(self.ocr_engine_input.findData(ocr_engine), 0))
+        self.ocr_engine_input.setToolTip("Local engines need Tesseract with Hindi/Sanskrit data. "
+                                         "Local first always uses the two-stage prompts.")
+        engine_layout.addWidget(self.ocr_engine_input, 1)
+        main_layout.addWidget(engine_row)
+
+        # PDF rasterization
+        dpi_row = QWidget()
+        dpi_layout = QHBoxLayout(dpi_row)
+        dpi_layout.setContentsMargins(0, 0, 0, 0)
+        dpi_layout.addWidget(QLabel("PDF page resolution (DPI):"))
+        self.raster_dpi_input = QSpinBox()
+        self.raster_dpi_input.setRange(0, 600)
+        self.raster_dpi_input.setSingleStep(50)
+        self.raster_dpi_input.setSpecialValueText("Send PDFs whole")
+        self.raster_dpi_input.setValue(raster_dpi)
+        self.raster_dpi_input.setToolTip("PDFs are split into one image per page at this resolution. "
+                                         "Lower is faster and cheaper; raise it for small print.")
+        dpi_layout.addWidget(self.raster_dpi_input, 1)
+        main_layout.addWidget(dpi_row)
+
+        # Page filter
+        self.page_filter_input = QCheckBox("Skip blank and picture pages (answered locally, not sent to Gemini)")
+        self.page_filter_input.setToolTip("Skipped pages are marked in the editors. Turn this off if text pages are being skipped.")
+        self.page_filter_input.setChecked(page_filter)
+        main_layout.addWidget(self.page_filter_input)
+
+        # Engine process
+        self.engine_process_input = QCheckBox("Run processing in a separate process (smoother window on large batches)")
+        self.engine_process_input.setToolTip("Takes a second or two to start. Uses another CPU core for parsing and image work.")
+        self.engine_process_input.setChecked(engine_process)
+        main_layout.addWidget(self.engine_process_input)
         
         # Prompt Header with Preview Button
         prompt_header = QWidget()
@@ -86,7 +142,16 @@ class SettingsDialog(QDialog):
         self.splitter.setStretchFactor(0, 1)
         self.splitter.setStretchFactor(1, 1)
         
-        main_layout.addWidget(self.splitter, 1) # Set stretch factor to 1 to take max height
+        # Stage prompts for the two-stage pipeline
+        self.ocr_prompt_input = self._create_prompt_editor(ocr_prompt)
+        self.translation_prompt_input = self._create_prompt_editor(translation_prompt)
+
+        self.prompt_tabs = QTabWidget()
+        self.prompt_tabs.addTab(self.splitter, "Single-pass Prompt")
+        self.prompt_tabs.addTab(self.ocr_prompt_input, "OCR Prompt")
+        self.prompt_tabs.addTab(self.translation_prompt_input, "Translation Prompt")
+        
+        main_layout.addWidget(self.prompt_tabs, 1) # Set stretch factor to 1 to take max height
         
         # Render initial preview
         self.render_preview()
@@ -107,6 +172,19 @@ class SettingsDialog(QDialog):
         version_label.setStyleSheet("color: #888; font-size: 11px; margin-top: 10px; font-style: italic;")
         main_layout.addWidget(version_label)
 
+    def _create_prompt_editor(self, text):
+        editor = QPlainTextEdit()
+        editor.setPlainText(text)
+        editor.setFont(QFont("Courier New", 12) if os.name != 'posix' else QFont("Menlo", 12))
+        editor.setStyleSheet("""
+            QPlainTextEdit {
+                border: 1px solid #ccc;
+                border-radius: 4px;
+                padding: 10px;
+            }
+        """)
+        return editor
+
     def toggle_api_key_visibility(self):
         if self.reveal_btn.isChecked():
             self.api_key_input.setEchoMode(QLineEdit.Normal)
@@ -1,10 +1,18 @@
 import streamlit as st
 import os
 import json
+import tempfile
 from streamlit_quill import st_quill
-from jain_digitizer.common.translator import Translator
-from jain_digitizer.common.constants import DEFAULT_PROMPT
+from jain_digitizer.common.translator import Translator, skipped_notice
+from jain_digitizer.common.pipeline import TwoStageTranslator, LocalFirstTranslator
+from jain_digitizer.common.local_ocr import TesseractBackend
+from jain_digitizer.common.constants import (DEFAULT_PROMPT, DEFAULT_ESCALATION_MODEL, OCR_PROMPT, TRANSLATION_PROMPT,
+                                             OCR_ENGINES, DEFAULT_OCR_ENGINE, CASSETTE_MODE, DEFAULT_RASTER_DPI,
+                                             DEFAULT_HEDGE_BUDGET, DEFAULT_UPLOAD_DIR, DEFAULT_PAGE_FILTER)
+from jain_digitizer.common.ingestion import spill_to_disk
+from jain_digitizer.common.session_results import open_session
 from jain_digitizer.common.logger_setup import logger
+from jain_digitizer.common.export import export_book, FORMATS, LAYOUTS
 
 # --- Page Config ---
 st.set_page_config(
@@ -55,8 +63,25 @@ if 'api_key' not in st.session_state:
     st.session_state.api_key = os.getenv("GEMINI_API_KEY", "")
 if 'system_prompt' not in st.session_state:
     st.session_state.system_prompt = DEFAULT_PROMPT
-if 'results' not in st.session_state:
-    st.session_state.results = []
+if 'context_cache' not in st.session_state:
+    st.session_state.context_cache = os.getenv("CONTEXT_CACHE", "") == "1"
+if 'ocr_engine' not in st.session_state:
+    st.session_state.ocr_engine = DEFAULT_OCR_ENGINE
+if 'raster_dpi' not in st.session_state:
+    st.session_state.raster_dpi = DEFAULT_RASTER_DPI
+if 'page_filter' not in st.session_state:
+    st.session_state.page_filter = DEFAULT_PAGE_FILTER
+if 'two_stage' not in st.session_state:
+    st.session_state.two_stage = False
+if 'ocr_prompt' not in st.session_state:
+    st.session_state.ocr_prompt = OCR_PROMPT
+if 'translation_prompt' not in st.session_state:
+    st.session_state.translation_prompt = TRANSLATION_PROMPT
+if 'results_store' not in st.session_state:
+    st.session_state.results_store = open_session()
+if 'results_view' not in st.session_state:
+    st.session_state.results_view = 0
+st.session_state.results_store.touch()
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Main Window"
 
@@ -71,19 +96,71 @@ with st.sidebar:
         key="nav_radio"
     )
     st.session_state.current_page = page
-    
+
     st.markdown("---")
+    st.session_state.page_filter = st.checkbox(
+        "Skip blank and picture pages",
+        value=st.session_state.page_filter,
+        help="Pages that look blank or picture-only are answered locally instead of being sent to Gemini. "
+             "They are marked in the results; turn this off if text pages are being skipped."
+    )
     st.info("System Status: Online 🟢")
 
 # --- Cached Proxy Functions ---
-@st.cache_data(show_spinner=False)
-def get_translation_proxy(api_key, system_prompt, files_data):
+# Memoized batches live in server memory, so only the most recent few are kept
+@st.cache_data(show_spinner=False, max_entries=4)
+def get_translation_proxy(api_key, system_prompt, _files, digests, context_cache=False,
+                          two_stage=False, ocr_prompt=None, translation_prompt=None, ocr_engine="gemini",
+                          raster_dpi=DEFAULT_RASTER_DPI, page_filter=DEFAULT_PAGE_FILTER):
     """
     Proxy function to call the translator with caching.
-    The cache keys are based on the api_key, system_prompt, and the actual file data.
+    The cache keys are based on the api_key, system_prompt, and the (filename,
+    mime_type, digest) of each upload; ``_files`` holds the spilled
+    (path, filename, mime_type, digest) tuples and isn't hashed.
     """
-    translator = Translator(api_key, system_prompt)
-    return translator.translate_bytes(files_data)
+    if ocr_engine == "local":
+        translator = TesseractBackend(raster_dpi=raster_dpi)
+    elif ocr_engine == "local-first":
+        translator = LocalFirstTranslator(api_key, ocr_prompt=ocr_prompt, translation_prompt=translation_prompt,
+                                          use_context_cache=context_cache, raster_dpi=raster_dpi,
+                                          hedge_budget=DEFAULT_HEDGE_BUDGET, page_filter=page_filter)
+    elif two_stage:
+        translator = TwoStageTranslator(api_key, ocr_prompt, translation_prompt, use_context_cache=context_cache,
+                                        raster_dpi=raster_dpi, hedge_budget=DEFAULT_HEDGE_BUDGET,
+                                        page_filter=page_filter)
+    else:
+        translator = Translator(api_key, system_prompt, use_context_cache=context_cache,
+                                escalation_model=DEFAULT_ESCALATION_MODEL, raster_dpi=raster_dpi,
+                                hedge_budget=DEFAULT_HEDGE_BUDGET, page_filter=page_filter)
+    return translator.translate_paths(_files)
+
+# --- Results Rendering ---
+def view_html(page_results, field, missing):
+    """HTML of one field for the pages in view, as shown in the editor."""
+    return "<hr/>".join(
+        f"<div>{skipped_notice(res, res.get('source') or 'Page') or res.get(field, missing)}</div>" for res in page_results
+    )
+
+def write_document(store, field, missing):
+    """Writes a .doc (HTML) of one field for every page, using the edited HTML of edited views."""
+    fd, path = tempfile.mkstemp(suffix=".doc", prefix="jain-digitizer-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("<html><head><meta charset='utf-8'></head><body>")
+        for view in range(store.view_count()):
+            if view:
+                f.write("<hr/>")
+            f.write(store.edit(field, view) or view_html(store.view(view)[1], field, missing))
+        f.write("</body></html>")
+    return path
+
+def remove_files(paths):
+    """Deletes previously prepared download files; ones already gone are ignored."""
+    for path in paths:
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
 
 # --- Define Pages ---
 
@@ -102,23 +179,37 @@ def show_main_page():
         )
         
         if st.button("🚀 Process Files") and uploaded_files:
-            if not st.session_state.api_key:
+            if not st.session_state.api_key and st.session_state.ocr_engine != "local" and CASSETTE_MODE != "replay":
                 st.error("Please enter your Gemini API Key in the Settings page.")
             else:
+                files = []
                 try:
-                    files_data = []
+                    # Spilled straight from the upload buffer; pages are then memory-mapped as they're sent
                     for uploaded_file in uploaded_files:
-                        bytes_data = uploaded_file.getvalue()
-                        mime_type = uploaded_file.type
-                        files_data.append((bytes_data, uploaded_file.name, mime_type))
-                    
+                        path, digest = spill_to_disk(uploaded_file.getbuffer(), DEFAULT_UPLOAD_DIR,
+                                                     os.path.splitext(uploaded_file.name)[1])
+                        files.append((path, uploaded_file.name, uploaded_file.type, digest))
+
                     with st.spinner(f"Digitizing {len(uploaded_files)} files..."):
-                        results = get_translation_proxy(st.session_state.api_key, st.session_state.system_prompt, files_data)
-                        st.session_state.results = results
+                        results = get_translation_proxy(
+                            st.session_state.api_key, st.session_state.system_prompt, files,
+                            [(name, mime_type, digest) for _, name, mime_type, digest in files],
+                            st.session_state.context_cache, st.session_state.two_stage,
+                            st.session_state.ocr_prompt, st.session_state.translation_prompt,
+                            st.session_state.ocr_engine, st.session_state.raster_dpi,
+                            st.session_state.page_filter
+                        )
+                        st.session_state.results_store.replace(results)
+                        st.session_state.results_view = 0
+                        remove_files((st.session_state.get("doc_paths") or {}).values())
+                        st.session_state.doc_paths = None
                         st.success("Processing Complete!")
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
                     logger.exception("Streamlit process error")
+                finally:
+                    for path, *_ in files:
+                        os.remove(path)
 
     with col2:
         st.subheader("📄 Preview")
@@ -131,80 +222,98 @@ def show_main_page():
     st.markdown("---")
 
     # --- Results Section ---
-    if st.session_state.results:
+    store = st.session_state.results_store
+    total = len(store)
+    if total:
         st.markdown("---")
         st.subheader("🎉 Resulting Digitization")
-        
-        # Concatenate results
-        hindi_parts = []
-        english_parts = []
-        
-        for idx, res in enumerate(st.session_state.results):
-            fname = res.get('filename', f'File {idx+1}')
-            
-            # Process Hindi
-            h_html = res.get("hindi_ocr", "No OCR text found.")
-            # If it's already markdown, convert it. If not, markdown() still works fine on plain text.
-            # h_html = markdown.markdown(h_text, extensions=['extra'])
-            # hindi_parts.append(f"<h3>📄 {fname}</h3>{h_html}")
-            hindi_parts.append(f"<div>{h_html}</div>")
-            
-            # Process English
-            e_html = res.get("english_translation", "No translation found.")
-            # e_html = markdown.markdown(e_text, extensions=['extra'])
-            english_parts.append(f"<div>{e_html}</div>")
-        
-        full_hindi_content = "<hr/>".join(hindi_parts)
-        full_english_content = "<hr/>".join(english_parts)
-        
+
+        # Only the pages in view are read from disk and rendered, however long the book
+        views = store.view_count()
+        view = min(st.session_state.results_view, views - 1)
+        col_prev, col_range, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("◀ Previous", disabled=view == 0):
+                view -= 1
+        with col_next:
+            if st.button("Next ▶", disabled=view >= views - 1):
+                view += 1
+        st.session_state.results_view = view
+        first, page_results = store.view(view)
+        with col_range:
+            st.markdown(f"Pages {first + 1}–{first + len(page_results)} of {total}")
+
         col_hindi, col_english = st.columns(2, gap="medium")
-        
-        with col_hindi:
-            st.markdown("#### 🇮🇳 Hindi (Devanagari)")
-            
-            edited_hindi_html = st_quill(
-                value=full_hindi_content,
-                key="quill_hindi_main",
-                toolbar=[
-                    ['bold', 'italic', 'underline', 'strike'],
-                    [{'header': 1}, {'header': 2}, {'header': 3}],
-                    [{'list': 'ordered'}, {'list': 'bullet'}],
-                    ['clean']
-                ]
-            )
-            
-            st.download_button(
-                label="📥 Download Hindi (.doc)",
-                data=f"<html><head><meta charset='utf-8'></head><body>{edited_hindi_html}</body></html>",
-                file_name="hindi_ocr.doc",
-                mime="application/msword",
-                key="dl_hindi"
-            )
-            
-        with col_english:
-            st.markdown("#### 🇬🇧 English Translation")
-            
-            edited_english_html = st_quill(
-                value=full_english_content,
-                key="quill_english_main",
-                toolbar=[
-                    ['bold', 'italic', 'underline', 'strike'],
-                    [{'header': 1}, {'header': 2}, {'header': 3}],
-                    [{'list': 'ordered'}, {'list': 'bullet'}],
-                    ['clean']
-                ]
-            )
-            
-            st.download_button(
-                label="📥 Download English (.doc)",
-                data=f"<html><head><meta charset='utf-8'></head><body>{edited_english_html}</body></html>",
-                file_name="english_translation.doc",
-                mime="application/msword",
-                key="dl_english"
-            )
-        
+        for column, field, title, missing in [
+            (col_hindi, "hindi_ocr", "#### 🇮🇳 Hindi (Devanagari)", "No OCR text found."),
+            (col_english, "english_translation", "#### 🇬🇧 English Translation", "No translation found."),
+        ]:
+            with column:
+                st.markdown(title)
+                html = store.edit(field, view) or view_html(page_results, field, missing)
+                edited_html = st_quill(
+                    value=html,
+                    key=f"quill_{field}_{view}",
+                    toolbar=[
+                        ['bold', 'italic', 'underline', 'strike'],
+                        [{'header': 1}, {'header': 2}, {'header': 3}],
+                        [{'list': 'ordered'}, {'list': 'bullet'}],
+                        ['clean']
+                    ]
+                )
+                if edited_html and edited_html != html:
+                    store.save_edit(field, view, edited_html)
+
+        st.markdown("#### 📥 Download")
+        if st.button("📄 Prepare .doc Downloads"):
+            # Written view by view (with edits) to temp files rather than joined in memory
+            remove_files((st.session_state.get("doc_paths") or {}).values())
+            st.session_state.doc_paths = {field: write_document(store, field, missing) for field, missing in [
+                ("hindi_ocr", "No OCR text found."), ("english_translation", "No translation found.")]}
+        doc_paths = st.session_state.get("doc_paths") or {}
+        col_dl_hindi, col_dl_english = st.columns(2, gap="medium")
+        for column, field, label, file_name, key in [
+            (col_dl_hindi, "hindi_ocr", "📥 Download Hindi (.doc)", "hindi_ocr.doc", "dl_hindi"),
+            (col_dl_english, "english_translation", "📥 Download English (.doc)", "english_translation.doc", "dl_english"),
+        ]:
+            path = doc_paths.get(field)
+            if path and os.path.exists(path):
+                with column, open(path, "rb") as doc_file:
+                    st.download_button(label=label, data=doc_file, file_name=file_name,
+                                       mime="application/msword", key=key)
+
+        st.markdown("#### 📦 Export Book")
+        col_fmt, col_layout, col_export = st.columns(3, gap="medium")
+        with col_fmt:
+            export_format = st.selectbox("Format", FORMATS, format_func=lambda f: f.upper(), key="export_format")
+        with col_layout:
+            export_layout = st.selectbox("Layout", LAYOUTS, format_func=str.title, key="export_layout")
+        with col_export:
+            if st.button("📦 Prepare Export"):
+                # Pages are streamed from the session store to a temp file rather than joined into one string
+                remove_files([st.session_state.get("export_path")])
+                fd, export_path = tempfile.mkstemp(suffix=f".{export_format}", prefix="jain-digitizer-")
+                os.close(fd)
+                export_book(store, export_path, fmt=export_format, layout=export_layout)
+                st.session_state.export_path = export_path
+
+        export_path = st.session_state.get("export_path")
+        if export_path and os.path.exists(export_path):
+            with open(export_path, "rb") as export_file:
+                st.download_button(
+                    label=f"📥 Download {os.path.splitext(export_path)[1].lstrip('.').upper()}",
+                    data=export_file,
+                    file_name=f"jain_digitizer{os.path.splitext(export_path)[1]}",
+                    key="dl_export"
+                )
+
         if st.button("🗑️ Clear All Results"):
-            st.session_state.results = []
+            store.clear()
+            st.session_state.results_view = 0
+            remove_files([st.session_state.get("export_path")])
+            st.session_state.export_path = None
+            remove_files(doc_paths.values())
+            st.session_state.doc_paths = None
             st.rerun()
 
 def show_settings_page():
@@ -218,7 +327,13 @@ def show_settings_page():
             "Gemini API Key", 
             value=st.session_state.api_key, 
             type="password",
-            help="Get your key from https://aistudio.google.com/ and ensure it has access to Gemini 2.0 Flash."
+            help="Get your key from https://aistudio.google.com/ and ensure it has access to Gemini 2.0 Flash. "
+                 "Separate several keys with commas to spread requests across their quotas."
+        )
+        st.session_state.context_cache = st.checkbox(
+            "Cache system prompt on Gemini servers",
+            value=st.session_state.context_cache,
+            help="Creates a server-side cached context for the system prompt and reuses it across chunks and batches."
         )
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -253,6 +368,37 @@ def show_settings_page():
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
+    with st.container():
+        st.markdown("<div class='settings-card'>", unsafe_allow_html=True)
+        st.subheader("🪜 Two-stage Pipeline")
+        st.session_state.two_stage = st.checkbox(
+            "OCR first, then translate the cached OCR text",
+            value=st.session_state.two_stage,
+            help="Each stage has its own prompt and cache. Changing the translation prompt re-runs only the translation, without re-uploading images."
+        )
+        engines = list(OCR_ENGINES)
+        st.session_state.ocr_engine = st.selectbox(
+            "OCR engine",
+            engines,
+            index=engines.index(st.session_state.ocr_engine) if st.session_state.ocr_engine in engines else 0,
+            format_func=OCR_ENGINES.get,
+            help="Local engines need Tesseract with Hindi/Sanskrit data. Local first always uses the two-stage prompts."
+        )
+        st.session_state.raster_dpi = st.number_input(
+            "PDF page resolution (DPI)",
+            min_value=0, max_value=600, step=50,
+            value=int(st.session_state.raster_dpi),
+            help="PDFs are split into one image per page at this resolution (0 sends PDFs whole). Lower is faster and cheaper; raise it for small print."
+        )
+        with st.expander("Stage prompts", expanded=st.session_state.two_stage):
+            st.session_state.ocr_prompt = st.text_area("OCR Prompt", value=st.session_state.ocr_prompt, height=300)
+            st.session_state.translation_prompt = st.text_area("Translation Prompt", value=st.session_state.translation_prompt, height=300)
+            if st.button("♻️ Reset Stage Prompts"):
+                st.session_state.ocr_prompt = OCR_PROMPT
+                st.session_state.translation_prompt = TRANSLATION_PROMPT
+                st.rerun()
+        st.markdown("</div>", unsafe_allow_html=True)
+
 # --- Page Routing ---
 if st.session_state.current_page == "Main Window":
     show_main_page()
@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from jain_digitizer.common.cancellation import CancelToken, OperationCancelled, RequestTimeout, run_cancellable
+from jain_digitizer.common.translator import Translator
+
+def test_token_deadline():
+    now = [0.0]
+    token = CancelToken(deadline=10, clock=lambda: now[0])
+    assert not token.cancelled
+    assert token.remaining() == 10
+    now[0] = 10.0
+    assert token.cancelled
+    assert token.reason == "Batch deadline exceeded"
+    with pytest.raises(OperationCancelled):
+        token.check()
+
+def test_child_token_follows_its_parent_only():
+    now = [0.0]
+    parent = CancelToken(deadline=10, clock=lambda: now[0])
+    first, second = parent.child(), parent.child()
+    assert first.remaining() == 10
+    first.cancel("Lost to the other call of a hedged pair")
+    assert first.cancelled and not second.cancelled and not parent.cancelled
+    now[0] = 10.0
+    assert second.cancelled
+    assert second.reason == "Batch deadline exceeded"
+
+def test_run_cancellable_abandons_hung_call():
+    token = CancelToken()
+    release = threading.Event()
+    threading.Timer(0.2, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(OperationCancelled):
+        run_cancellable(lambda: release.wait(30), token)
+    assert time.monotonic() - started < 1
+    release.set()
+
+def test_run_cancellable_times_out():
+    release = threading.Event()
+    with pytest.raises(RequestTimeout):
+        run_cancellable(lambda: release.wait(30), CancelToken(), timeout=0.2)
+    release.set()
+
+def test_run_cancellable_passes_through_results_and_errors():
+    assert run_cancellable(lambda x: x * 2, CancelToken(), x=21) == 42
+    with pytest.raises(ValueError):
+        run_cancellable(lambda: int("x"), CancelToken())
+
+@patch("google.genai.Client")
+def test_cancel_keeps_finished_pages(mock_client_class, tmp_path):
+    token = CancelToken()
+    calls = []
+
+    def generate(model, config, contents):
+        calls.append(1)
+        if len(calls) == 2:
+            # Second request hangs until the batch is cancelled
+            token.cancel()
+            time.sleep(0.5)
+        response = MagicMock()
+        response.text = '{"hindi_ocr": "पृष्ठ", "english_translation": "page"}'
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    translator = Translator("key", "prompt", chunk_size=1, cancel_token=token)
+    files = []
+    for i in range(4):
+        (tmp_path / f"{i}.jpg").write_bytes(b"data")
+        files.append(str(tmp_path / f"{i}.jpg"))
+
+    results = translator.translate_files(files)
+    assert len(results) == 4
+    assert results[0]["hindi_ocr"] == "पृष्ठ"
+    assert all(r.get("cancelled") for r in results[1:])
+    assert len(calls) == 2
+
+@patch("google.genai.Client")
+def test_request_timeout_fails_only_that_chunk(mock_client_class, tmp_path):
+    calls = []
+
+    def generate(model, config, contents):
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.5)
+        response = MagicMock()
+        response.text = '{"hindi_ocr": "पृष्ठ", "english_translation": "page"}'
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    translator = Translator("key", "prompt", chunk_size=1, request_timeout=0.2)
+    files = []
+    for i in range(2):
+        (tmp_path / f"{i}.jpg").write_bytes(b"data")
+        files.append(str(tmp_path / f"{i}.jpg"))
+
+    results = translator.translate_files(files)
+    assert "timed out" in results[0]["error"]
+    assert results[1]["hindi_ocr"] == "पृष्ठ"
@@ -0,0 +1,81 @@
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from jain_digitizer.common.cassette import Cassette, CassetteMiss, ReplayClient, client_factory, parse_latency
+from jain_digitizer.common.key_pool import KeyPool
+from jain_digitizer.common.translator import Translator
+
+def fake_generate(model, config, contents):
+    labels = [p.text for p in contents if p.text]
+    response = MagicMock()
+    response.text = json.dumps([{"hindi_ocr": f"<p>{label}</p>", "english_translation": f"<p>{label}</p>"} for label in labels])
+    response.usage_metadata = MagicMock(prompt_token_count=100, candidates_token_count=50)
+    return response
+
+def make_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"page{i}.jpg"
+        path.write_bytes(b"image %d" % i)
+        files.append(str(path))
+    return files
+
+def translator(factory, **kwargs):
+    return Translator("key", "prompt", client_factory=factory, key_pool=KeyPool("key"), **kwargs)
+
+@pytest.fixture
+def recorded(tmp_path):
+    """Records one three-page request and returns (cassette path, files, recorded results)."""
+    path = str(tmp_path / "cassette.jsonl")
+    files = make_files(tmp_path, 3)
+    with patch("google.genai.Client") as mock_client_class:
+        mock_client_class.return_value.models.generate_content.side_effect = fake_generate
+        results = translator(client_factory("record", path)).translate_files(files)
+    return path, files, results
+
+def test_replay_serves_recorded_request(recorded):
+    path, files, results = recorded
+    with patch("google.genai.Client") as mock_client_class:
+        replayed = translator(client_factory("replay", path)).translate_files(files)
+        mock_client_class.assert_not_called()
+    assert replayed == results
+
+def test_replay_reassembles_pages_for_other_chunking(recorded):
+    path, files, results = recorded
+    # Fresh cassette object so hit counts are this test's own
+    factory = lambda api_key=None, http_options=None: ReplayClient(Cassette(path))
+    replayed = translator(factory, chunk_size=1).translate_files(files)
+    assert [r["hindi_ocr"] for r in replayed] == [r["hindi_ocr"] for r in results]
+
+def test_replay_miss_fails_only_its_pages(recorded, tmp_path):
+    path, files, results = recorded
+    (tmp_path / "new.jpg").write_bytes(b"never recorded")
+    with pytest.raises(CassetteMiss):
+        Cassette(path).lookup("gemini-2.0-flash", None, [])
+    replayed = translator(client_factory("replay", path), chunk_size=1).translate_files(files + [str(tmp_path / "new.jpg")])
+    assert [r["hindi_ocr"] for r in replayed[:3]] == [r["hindi_ocr"] for r in results]
+    assert "error" in replayed[3]
+
+def test_replay_latency(recorded):
+    path, files, results = recorded
+    started = time.perf_counter()
+    translator(client_factory("replay", path, latency="0.2")).translate_files(files)
+    assert time.perf_counter() - started >= 0.2
+
+def test_replay_needs_no_api_key(recorded):
+    path, files, results = recorded
+    replayer = Translator("", "prompt", client_factory=client_factory("replay", path))
+    assert replayer.translate_files(files) == results
+    # Without a cassette the key is still required
+    with pytest.raises(ValueError, match="API Key"):
+        Translator("", "prompt", client_factory=lambda **kwargs: None).translate_files(files)
+
+def test_parse_latency():
+    assert parse_latency("") == 0.0
+    assert parse_latency("0.5") == 0.5
+    assert parse_latency("Recorded") == "recorded"
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        client_factory("rewind", str(tmp_path / "c.jsonl"))
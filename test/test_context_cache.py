@@ -0,0 +1,103 @@
+import threading
+import time
+from unittest.mock import MagicMock
+from jain_digitizer.common.context_cache import ContextCacheRegistry, prompt_digest
+
+def make_client(names):
+    client = MagicMock()
+    caches = []
+    for name in names:
+        cache = MagicMock()
+        cache.name = name
+        cache.expire_time = None
+        caches.append(cache)
+    client.caches.create.side_effect = caches
+    return client
+
+def test_prompt_digest_is_stable():
+    assert prompt_digest("prompt") == prompt_digest("prompt")
+    assert prompt_digest("prompt") != prompt_digest("prompt2")
+
+def test_registry_reuses_live_handle():
+    client = make_client(["cachedContents/1"])
+    registry = ContextCacheRegistry()
+    assert registry.get(client, "key", "model", "prompt") == "cachedContents/1"
+    assert registry.get(client, "key", "model", "prompt") == "cachedContents/1"
+    assert client.caches.create.call_count == 1
+
+def test_registry_rebuilds_expired_handle(monkeypatch):
+    client = make_client(["cachedContents/1", "cachedContents/2"])
+    registry = ContextCacheRegistry(ttl_seconds=120)
+    assert registry.get(client, "key", "model", "prompt") == "cachedContents/1"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3600)
+    assert registry.get(client, "key", "model", "prompt") == "cachedContents/2"
+
+def test_registry_separates_prompts():
+    client = make_client(["cachedContents/1", "cachedContents/2"])
+    registry = ContextCacheRegistry()
+    assert registry.get(client, "key", "model", "prompt A") == "cachedContents/1"
+    assert registry.get(client, "key", "model", "prompt B") == "cachedContents/2"
+
+def test_registry_invalidate():
+    client = make_client(["cachedContents/1", "cachedContents/2"])
+    registry = ContextCacheRegistry()
+    registry.get(client, "key", "model", "prompt")
+    registry.invalidate("key", "model", "prompt")
+    assert registry.get(client, "key", "model", "prompt") == "cachedContents/2"
+
+class ApiError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+def test_registry_remembers_refusals_only(monkeypatch):
+    client = MagicMock()
+    client.caches.create.side_effect = ApiError(400, "INVALID_ARGUMENT. Cached content is too small")
+    registry = ContextCacheRegistry(ttl_seconds=3600, retry_backoff=30)
+    assert registry.get(client, "key", "model", "small prompt") is None
+    assert registry.get(client, "key", "model", "small prompt") is None
+    assert client.caches.create.call_count == 1
+
+    # A transient error is retried once the short backoff is over
+    client.caches.create.side_effect = [ApiError(503, "UNAVAILABLE"), make_client(["cachedContents/1"]).caches.create()]
+    assert registry.get(client, "key", "model", "large prompt") is None
+    assert registry.get(client, "key", "model", "large prompt") is None
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 31)
+    assert registry.get(client, "key", "model", "large prompt") == "cachedContents/1"
+    assert registry.get(client, "key", "model", "small prompt") is None
+    assert client.caches.create.call_count == 3
+
+def test_registry_creates_other_prompts_while_one_is_pending():
+    started, release = threading.Event(), threading.Event()
+    client = make_client(["cachedContents/B"])
+    slow_client = MagicMock()
+
+    def slow_create(**kwargs):
+        started.set()
+        release.wait(5)
+        cache = MagicMock()
+        cache.name, cache.expire_time = "cachedContents/A", None
+        return cache
+    slow_client.caches.create.side_effect = slow_create
+
+    registry = ContextCacheRegistry()
+    names = []
+    waiters = [threading.Thread(target=lambda: names.append(registry.get(slow_client, "key", "model", "prompt A")))
+               for _ in range(2)]
+    for thread in waiters:
+        thread.start()
+    assert started.wait(5)
+    # The registry isn't locked while prompt A's context is being created
+    other = []
+    thread = threading.Thread(target=lambda: other.append(registry.get(client, "key", "model", "prompt B")))
+    thread.start()
+    thread.join(1)
+    assert other == ["cachedContents/B"]
+    release.set()
+    for thread in waiters:
+        thread.join(5)
+    assert names == ["cachedContents/A", "cachedContents/A"]
+    assert slow_client.caches.create.call_count == 1
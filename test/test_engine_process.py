@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+import pytest
+from jain_digitizer.common import engine_process
+from jain_digitizer.common.engine_process import EngineProcess, encode_message, decode_message, PAGES, DONE
+from jain_digitizer.common.key_pool import KeyPool
+from jain_digitizer.common.metrics import RequestMetrics
+from jain_digitizer.common.rasterize import PdfRasterizer
+from jain_digitizer.common.translator import Translator
+
+PDF_PATH = os.path.join(os.path.dirname(__file__), "data", "jdkpa-548-550.pdf")
+
+# Factories run in the spawned child, so they must be importable module-level functions
+
+class StubBackend:
+    """Reports pages two at a time, like a Translator working through chunks."""
+    def __init__(self, settings, cancel_token):
+        self.settings = settings
+        self.cancel_token = cancel_token
+        self.progress_callback = None
+        self.page_total = None
+        self.metrics = RequestMetrics()
+
+    def translate_files(self, file_list):
+        self.page_total = len(file_list)
+        results = [{"hindi_ocr": f"<p>पृष्ठ {os.path.basename(p)}</p>", "english_translation": "<p>en</p>"}
+                   for p in file_list]
+        for start in range(0, len(results), 2):
+            indices = list(range(start, min(start + 2, len(results))))
+            self.metrics.record_request("stub", len(indices), 0.1)
+            self.progress_callback(indices, [results[idx] for idx in indices])
+        # Changed after it was reported, so it has to come with the final message
+        results[0] = dict(results[0], english_translation="<p>revised</p>")
+        return results
+
+def stub_factory(settings, cancel_token):
+    return StubBackend(settings, cancel_token)
+
+def waiting_factory(settings, cancel_token):
+    class WaitingBackend(StubBackend):
+        def translate_files(self, file_list):
+            while not self.cancel_token.cancelled:
+                time.sleep(0.01)
+            return [{"error": self.cancel_token.reason, "cancelled": True} for _ in file_list]
+    return WaitingBackend(settings, cancel_token)
+
+def failing_factory(settings, cancel_token):
+    raise ValueError("API key is required")
+
+def crashing_factory(settings, cancel_token):
+    os._exit(3)
+
+class PageClient:
+    """Answers each image of a request with one page."""
+    def __init__(self, api_key=None, http_options=None):
+        self.models = self
+
+    def generate_content(self, model, config, contents):
+        pages = [part for part in contents if getattr(part, "inline_data", None) is not None]
+        text = json.dumps([{"hindi_ocr": "<p>पृष्ठ</p>", "english_translation": "<p>page</p>"}] * len(pages))
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+class TmpCacheTranslator(Translator):
+    """Renders PDF pages into the test's own cache directory instead of the user's."""
+    def __init__(self, raster_cache, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.raster_cache = raster_cache
+
+    def _rasterizer(self):
+        return PdfRasterizer(dpi=self.raster_dpi, cache_dir=self.raster_cache, workers=1)
+
+def pdf_factory(settings, cancel_token):
+    return TmpCacheTranslator(settings["raster_cache"], "key-0001", "prompt", client_factory=PageClient,
+                              key_pool=KeyPool("key-0001"), cancel_token=cancel_token, raster_dpi=72,
+                              page_filter=False)
+
+def test_messages_round_trip_and_compress_large_bodies():
+    small = encode_message(PAGES, [1, [0], [{"hindi_ocr": "एक"}]])
+    assert small[:2] == b"P-"
+    assert decode_message(small) == (PAGES, [1, [0], [{"hindi_ocr": "एक"}]])
+
+    pages = {str(i): {"hindi_ocr": "<p>" + "धर्म " * 200 + "</p>"} for i in range(10)}
+    large = encode_message(DONE, [10, pages])
+    assert large[:2] == b"Dz"
+    assert len(large) < len(pages["0"]["hindi_ocr"].encode("utf-8")) * 10 / 5
+    assert decode_message(large) == (DONE, [10, pages])
+
+def test_engine_streams_pages_and_returns_results():
+    events = []
+    engine = EngineProcess({"api_key": "key-0001"}, ["a.jpg", "b.jpg", "c.jpg"], factory=stub_factory,
+                           on_pages=lambda total, indices, results: events.append((total, indices)))
+    results = engine.run()
+
+    assert events == [(3, [0, 1]), (3, [2])]
+    assert [r["hindi_ocr"] for r in results] == ["<p>पृष्ठ a.jpg</p>", "<p>पृष्ठ b.jpg</p>", "<p>पृष्ठ c.jpg</p>"]
+    assert results[0]["english_translation"] == "<p>revised</p>"
+    assert engine.metrics.snapshot()["stub"]["requests"] == 2
+    assert engine.process.exitcode == 0
+
+def test_engine_cancel_stops_the_child():
+    engine = EngineProcess({}, ["a.jpg"], factory=waiting_factory)
+    engine.cancel()
+    results = engine.run()
+    assert results == [{"error": "Cancelled by user", "cancelled": True}]
+
+def test_engine_errors_are_raised_in_the_parent():
+    with pytest.raises(RuntimeError, match="API key is required"):
+        EngineProcess({}, ["a.jpg"], factory=failing_factory).run()
+
+def test_engine_crash_is_reported():
+    with pytest.raises(RuntimeError, match="exited unexpectedly"):
+        EngineProcess({}, ["a.jpg"], factory=crashing_factory).run()
+
+def test_build_backend_follows_settings(tmp_path, monkeypatch):
+    from jain_digitizer.common import pipeline
+    from jain_digitizer.common.pipeline import TwoStageTranslator
+    monkeypatch.setattr(pipeline, "DEFAULT_STAGE_CACHE", str(tmp_path / "stage_cache.db"))
+    from jain_digitizer.common.translator import Translator
+    assert type(engine_process.build_backend({"api_key": "key-0001", "ocr_engine": "gemini"})) is Translator
+    backend = engine_process.build_backend({"api_key": "key-0001", "ocr_engine": "gemini", "two_stage": True,
+                                            "raster_dpi": 150})
+    assert isinstance(backend, TwoStageTranslator) and backend.raster_dpi == 150
+    assert backend.page_filter == engine_process.DEFAULT_PAGE_FILTER
+    assert not engine_process.build_backend({"api_key": "key-0001", "page_filter": False}).page_filter
+
+def test_engine_keeps_pdf_page_labels(tmp_path):
+    pytest.importorskip("pymupdf")
+    settings = {"raster_cache": str(tmp_path)}
+    expected = [r.get("source") for r in pdf_factory(settings, None).translate_files([PDF_PATH])]
+    assert expected == ["jdkpa-548-550.pdf p1", "jdkpa-548-550.pdf p2", "jdkpa-548-550.pdf p3"]
+    # Labels are added after the pages were streamed, so they must come with the final message
+    results = EngineProcess(settings, [PDF_PATH], factory=pdf_factory).run()
+    assert [r.get("source") for r in results] == expected
@@ -0,0 +1,70 @@
+import zipfile
+import xml.dom.minidom
+import pytest
+from jain_digitizer.common.export import export_book, html_to_blocks, get_exporter
+
+RESULTS = [
+    {
+        "hindi_ocr": "<h1>[1] File: page1.jpg</h1><p>णमो <b>अरिहंताणं</b><br>णमो सिद्धाणं</p><blockquote>श्लोक</blockquote>",
+        "english_translation": "<h1>[1] File: page1.jpg</h1><p>Obeisance to the <i>Arihantas</i> & Siddhas</p><p>unclosed <b>tag",
+    },
+    {"error": "Invalid JSON response from API"},
+]
+
+def test_html_to_blocks():
+    blocks = html_to_blocks("<h2>Title</h2><p>a <b>bold</b> word</p><hr/><blockquote><p>verse</p></blockquote>")
+    assert [b.kind for b in blocks] == ["h2", "p", "hr", "quote"]
+    assert ("bold", frozenset({"b"})) in blocks[1].runs
+
+def test_export_markdown(tmp_path):
+    path = tmp_path / "book.md"
+    assert export_book(RESULTS, str(path)) == 2
+    text = path.read_text(encoding="utf-8")
+    assert "# [1] File: page1.jpg" in text
+    assert "णमो **अरिहंताणं**" in text
+    assert "> श्लोक" in text
+    assert "ERROR processing" in text
+
+def test_export_html_single_language(tmp_path):
+    path = tmp_path / "book.html"
+    export_book(RESULTS, str(path), layout="english")
+    text = path.read_text(encoding="utf-8")
+    assert "Arihantas" in text
+    assert "अरिहंताणं" not in text
+
+def test_export_html_balances_model_tags(tmp_path):
+    path = tmp_path / "book.html"
+    export_book(RESULTS * 2, str(path), layout="parallel")
+    text = path.read_text(encoding="utf-8")
+    body = text[text.index("<body>"):text.index("</body>") + len("</body>")]
+    # The unclosed <b> of one page must not run into the next page
+    xml.dom.minidom.parseString(body)
+    assert text.count("<section class='page'>") == 4
+    assert "<b>tag</b>" in text
+
+def test_export_docx_is_valid_package(tmp_path):
+    path = tmp_path / "book.docx"
+    export_book(RESULTS, str(path), layout="parallel")
+    with zipfile.ZipFile(path) as z:
+        document = z.read("word/document.xml").decode("utf-8")
+        for name in z.namelist():
+            xml.dom.minidom.parseString(z.read(name))
+    assert "<w:tbl>" in document
+    assert "अरिहंताणं" in document
+    assert "Obeisance to the " in document
+
+def test_export_epub_is_valid_package(tmp_path):
+    path = tmp_path / "book.epub"
+    export_book(RESULTS, str(path))
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        assert names[0] == "mimetype"
+        assert z.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+        for name in names:
+            if name.endswith((".xhtml", ".opf", ".xml")):
+                xml.dom.minidom.parseString(z.read(name))
+    assert "OEBPS/page-00002.xhtml" in names
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        get_exporter(str(tmp_path / "book.pdf"))
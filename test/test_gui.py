@@ -35,7 +35,7 @@ def test_main_window_single_file_operation(app, qtbot):
     
     mock_results = [{"hindi_ocr": "नमस्तस्यै", "english_translation": "Salutations to her"}]
     
-    with patch("jain_digitizer.desktop.app_window.Translator.translate_files", return_value=mock_results):
+    with patch("jain_digitizer.common.translator.Translator.translate_files", return_value=mock_results):
         qtbot.mouseClick(app.btn_process, Qt.LeftButton)
         
     # Check if results are displayed
@@ -65,7 +65,7 @@ def test_main_window_multiple_file_operation(app, qtbot):
         {"hindi_ocr": "ocr2", "english_translation": "trans2"}
     ]
     
-    with patch("jain_digitizer.desktop.app_window.Translator.translate_files", return_value=mock_results):
+    with patch("jain_digitizer.common.translator.Translator.translate_files", return_value=mock_results):
         qtbot.mouseClick(app.btn_process, Qt.LeftButton)
         
     # Check if both results are displayed
@@ -105,3 +105,93 @@ def test_process_no_api_key_error(app, qtbot):
         qtbot.mouseClick(app.btn_process, Qt.LeftButton)
         mock_critical.assert_called_once()
         assert "Error" in mock_critical.call_args[0][1]
+
+def test_index_results_uses_each_files_book(tmp_path):
+    """A batch mixing folders and a rasterized PDF indexes every page under its own book and name."""
+    from jain_digitizer.desktop.app_window import TranslationWorker
+    from jain_digitizer.common.search_index import SearchIndex
+    index_path = str(tmp_path / "index.db")
+    files = ["/scans/book-a/scan.pdf", "/scans/book-b/p1.jpg"]
+    results = [{"hindi_ocr": "एक", "source": "scan.pdf p1"}, {"hindi_ocr": "दो", "source": "scan.pdf p2"},
+               {"hindi_ocr": "तीन"}]
+    TranslationWorker(None, files, index_path).index_results(results)
+    with SearchIndex(index_path) as index:
+        assert [(h["book"], h["page"]) for h in index.search("दो")] == [("book-a", "scan.pdf p2")]
+        assert [(h["book"], h["page"]) for h in index.search("तीन")] == [("book-b", "p1.jpg")]
+
+def test_skipped_pages_are_marked_in_both_editors(app):
+    app.add_files(["scan.pdf"])
+    app.display_result(0, {"hindi_ocr": "<p>[Blank page]</p>", "english_translation": "<p>[Blank page]</p>",
+                           "page_type": "blank", "source": "scan.pdf p2"})
+    for editor in (app.hindi_editor, app.english_editor):
+        text = editor.toPlainText()
+        assert "scan.pdf p2: skipped as a blank page, not sent to Gemini" in text
+        assert "Skip blank and picture pages" in text
+
+def test_pages_after_a_pdf_are_labelled_by_their_own_file(app):
+    app.add_files(["book.pdf", "img.jpg"])
+    app.display_result(0, {"hindi_ocr": "<p>एक</p>", "source": "book.pdf p1"})
+    app.display_result(1, {"hindi_ocr": "<p>दो</p>", "source": "book.pdf p2"})
+    # Index 2 counts PDF pages; the file is the image, not file_list[2]
+    app.display_result(2, {"error": "500 INTERNAL"})
+    assert "[ERROR processing img.jpg: 500 INTERNAL]" in app.hindi_editor.toPlainText()
+
+def test_progress_displays_pages_in_order(app):
+    """Out-of-order progress events are buffered and shown in file order."""
+    app.add_files(["p1.jpg", "p2.jpg", "p3.jpg"])
+    app.progress_bar.setRange(0, 3)
+
+    def event(done, pages):
+        return {"pages_done": done, "total": 3, "errors": 0, "elapsed": 1.0,
+                "pages_per_minute": 60.0, "eta_seconds": 2.0, "pages": pages}
+
+    app.on_processing_progress(event(1, [(1, {"hindi_ocr": "दो", "english_translation": "two"})]))
+    assert app.hindi_editor.toPlainText() == ""
+
+    app.on_processing_progress(event(2, [(0, {"hindi_ocr": "एक", "english_translation": "one"})]))
+    text = app.hindi_editor.toPlainText()
+    assert "एक" in text and "दो" in text and text.index("एक") < text.index("दो")
+    assert "2 / 3 pages" in app.progress_bar.format()
+    assert "ETA" in app.progress_bar.format()
+
+    # Finishing only appends what hasn't been shown yet
+    app.on_processing_finished([
+        {"hindi_ocr": "एक", "english_translation": "one"},
+        {"hindi_ocr": "दो", "english_translation": "two"},
+        {"hindi_ocr": "तीन", "english_translation": "three"},
+    ])
+    text = app.hindi_editor.toPlainText()
+    assert text.count("एक") == 1 and "तीन" in text
+
+def test_stats_panel_shows_live_metrics(app, qtbot):
+    """The stats dock reads the in-process metrics and refreshes while visible."""
+    from jain_digitizer.common.metrics import RequestMetrics
+    metrics = RequestMetrics()
+    app.perf_panel.metrics = metrics
+    app.show()
+
+    qtbot.mouseClick(app.btn_stats, Qt.LeftButton)
+    assert app.stats_dock.isVisible()
+    assert app.perf_panel.timer.isActive()
+
+    metrics.record_request("gemini-2.0-flash", 2, 1.5, prompt_tokens=1000, output_tokens=400)
+    metrics.record_api_error("gemini-2.0-flash", throttled=True, retried=True)
+    metrics.record_cache("ocr", True)
+    metrics.record_cache("ocr", False)
+    metrics.record_pages_done(2)
+    with metrics.in_flight("gemini-2.0-flash"):
+        app.perf_panel.refresh()
+
+    labels = app.perf_panel.summary_labels
+    assert labels["in_flight"].text() == "1"
+    assert labels["tokens"].text() == "1,000 / 400"
+    assert labels["caches"].text() == "ocr 50%"
+    assert labels["retries"].text() == "1 / 1"
+    assert float(labels["pages_per_minute"].text()) > 0
+    table = app.perf_panel.table
+    assert table.rowCount() == 1
+    assert table.item(0, 0).text() == "gemini-2.0-flash"
+    assert table.item(0, 3).text() == "1.50"
+
+    qtbot.mouseClick(app.btn_stats, Qt.LeftButton)
+    assert not app.perf_panel.timer.isActive()
@@ -0,0 +1,156 @@
+"""
+Rendering time budgets for the desktop editors.
+
+Synthetic Devanagari and IAST results of 1, 50 and 500 pages are pushed
+through the window and the editors, and each operation (layout and paint
+included) must stay under its threshold in data/gui_perf_thresholds.json.
+Set GUI_PERF_SCALE to stretch the thresholds on a slow machine, or
+GUI_PERF_RECORD=1 to rewrite them from this machine's timings.
+"""
+import json
+import math
+import os
+import time
+import pytest
+from PySide6.QtWidgets import QApplication
+from jain_digitizer.desktop.app_window import JainDigitizer
+from jain_digitizer.desktop.rich_editor import HtmlRichEditor
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "data", "gui_perf_thresholds.json")
+PAGE_COUNTS = [1, 50, 500]
+# Best of this many runs, so a stray pause doesn't fail the test
+REPEATS = 3
+# Recorded thresholds are the measured time times this, never below FLOOR seconds
+HEADROOM = 4
+FLOOR = 0.05
+
+SCALE = float(os.environ.get("GUI_PERF_SCALE", "1"))
+RECORD = os.environ.get("GUI_PERF_RECORD", "") not in ("", "0")
+measured = {}
+
+def load_thresholds():
+    if not os.path.exists(THRESHOLDS_PATH):
+        return {}
+    with open(THRESHOLDS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture(scope="module", autouse=True)
+def record_thresholds():
+    yield
+    if RECORD and measured:
+        thresholds = load_thresholds()
+        thresholds.update({name: max(math.ceil(seconds * HEADROOM * 100) / 100, FLOOR)
+                           for name, seconds in measured.items()})
+        with open(THRESHOLDS_PATH, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(thresholds.items())), f, indent=2)
+            f.write("\n")
+
+def page_result(idx):
+    hindi = "<p>णमो अरिहंताणं णमो सिद्धाणं णमो आयरियाणं णमो उवज्झायाणं णमो लोए सव्वसाहूणं। एसो पंच णमोक्कारो सव्वपावप्पणासणो।</p>"
+    english = ("<p><i>ṇamo arihaṃtāṇaṃ ṇamo siddhāṇaṃ ṇamo āyariyāṇaṃ</i> — Obeisance to the Arihantas, "
+               "to the Siddhas, to the Ācāryas, to the Upādhyāyas and to all the Sādhus in the world.</p>")
+    header = f"<h1>[{idx + 1}] File: page{idx + 1}.jpg</h1>"
+    return {"hindi_ocr": header + hindi * 8, "english_translation": header + english * 8}
+
+def settle(*editors):
+    """Lays out the documents and handles pending paint events, as the user would see them."""
+    for editor in editors:
+        editor.editor.document().size()
+    QApplication.processEvents()
+
+def timed(name, run, setup=None):
+    """Best time of ``run`` over REPEATS runs, checked against the stored threshold."""
+    best = math.inf
+    for _ in range(REPEATS):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    measured[name] = best
+    if RECORD:
+        return
+    limit = load_thresholds().get(name)
+    if limit is None:
+        pytest.skip(f"{name}: {best:.4f}s, no stored threshold")
+    assert best <= limit * SCALE, f"{name} took {best:.4f}s, threshold {limit * SCALE:.4f}s"
+
+@pytest.fixture
+def window(qtbot):
+    window = JainDigitizer()
+    qtbot.addWidget(window)
+    window.show()
+    qtbot.waitExposed(window)
+    return window
+
+@pytest.fixture
+def editor(qtbot):
+    editor = HtmlRichEditor()
+    qtbot.addWidget(editor)
+    editor.resize(600, 800)
+    editor.show()
+    qtbot.waitExposed(editor)
+    return editor
+
+def document(pages, field="hindi_ocr"):
+    return "<hr/>".join(page_result(idx)[field] for idx in range(pages))
+
+@pytest.mark.parametrize("pages", PAGE_COUNTS)
+def test_processing_finished(window, pages):
+    results = [page_result(idx) for idx in range(pages)]
+    window.file_list = [f"page{idx + 1}.jpg" for idx in range(pages)]
+
+    def reset():
+        window.hindi_editor.clear()
+        window.english_editor.clear()
+        window.next_display = 0
+        settle(window.hindi_editor, window.english_editor)
+
+    def finish():
+        window.on_processing_finished(results)
+        settle(window.hindi_editor, window.english_editor)
+
+    timed(f"processing_finished-{pages}", finish, reset)
+    assert window.hindi_editor.toPlainText().count("णमो अरिहंताणं") == pages * 8
+
+@pytest.mark.parametrize("pages", PAGE_COUNTS)
+def test_append(editor, pages):
+    fragments = [page_result(idx)["english_translation"] for idx in range(pages)]
+
+    def append_all():
+        for fragment in fragments:
+            editor.append(fragment)
+            editor.append("<hr/>")
+        settle(editor)
+
+    timed(f"append-{pages}", append_all, lambda: (editor.clear(), settle(editor)))
+
+@pytest.mark.parametrize("pages", PAGE_COUNTS)
+def test_set_html(editor, pages):
+    html = document(pages)
+
+    def set_html():
+        editor.setHtml(html)
+        settle(editor)
+
+    timed(f"set_html-{pages}", set_html, lambda: (editor.clear(), settle(editor)))
+
+@pytest.mark.parametrize("pages", PAGE_COUNTS)
+def test_copy_all(editor, pages):
+    editor.setHtml(document(pages, "english_translation"))
+    settle(editor)
+    timed(f"copy_all-{pages}", editor.copy_all)
+    assert "Obeisance" in QApplication.clipboard().mimeData().text()
+
+@pytest.mark.parametrize("pages", PAGE_COUNTS)
+def test_zoom(editor, pages):
+    editor.setHtml(document(pages))
+    settle(editor)
+
+    def zoom():
+        editor.zoomIn()
+        settle(editor)
+        editor.zoomOut()
+        settle(editor)
+
+    timed(f"zoom-{pages}", zoom)
@@ -0,0 +1,137 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from jain_digitizer.common.cancellation import CancelToken, run_hedged
+from jain_digitizer.common.hedging import HedgePolicy
+from jain_digitizer.common.metrics import RequestMetrics, size_class
+from jain_digitizer.common.translator import Translator
+
+def warm_metrics(label="m", pages=1, latency=0.05, count=20):
+    metrics = RequestMetrics()
+    for _ in range(count):
+        metrics.record_request(label, pages, latency)
+    return metrics
+
+def test_size_classes():
+    assert [size_class(n) for n in (1, 2, 3, 4, 7, 8, 40)] == ["1", "2-3", "2-3", "4-7", "4-7", "8+", "8+"]
+
+def test_latency_percentile_per_size_class():
+    metrics = warm_metrics(pages=1, latency=0.05)
+    metrics.record_request("m", 5, 2.0)
+    assert metrics.latency_percentile("m", 1, 95) == 0.05
+    assert metrics.latency_percentile("m", 4, 95) == 2.0
+    # Too few samples to trust
+    assert metrics.latency_percentile("m", 4, 95, min_samples=10) is None
+
+def test_no_hedge_without_enough_samples():
+    policy = HedgePolicy(warm_metrics(count=3), budget=1.0)
+    assert policy.plan("m", 1) is None
+
+def test_hedge_wins_over_slow_call():
+    policy = HedgePolicy(warm_metrics(latency=0.05), budget=1.0)
+    calls = []
+    release = threading.Event()
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            # The first call is stuck in the latency tail
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    assert run_hedged(call, CancelToken(), hedge=policy.plan("m", 1)) == "fast"
+    assert time.monotonic() - started < 1
+    assert policy.snapshot() == {"requests": 1, "hedges": 1, "wins": 1}
+    assert policy.metrics.snapshot()["m"]["hedge_wins"] == 1
+    release.set()
+
+def test_fast_call_is_not_hedged():
+    policy = HedgePolicy(warm_metrics(latency=5.0), budget=1.0)
+    assert run_hedged(lambda: "ok", CancelToken(), hedge=policy.plan("m", 1)) == "ok"
+    assert policy.snapshot()["hedges"] == 0
+
+def test_budget_caps_hedges():
+    policy = HedgePolicy(warm_metrics(), budget=0.1, burst=1)
+    for _ in range(10):
+        policy.plan("m", 1)
+    # 10% of 10 requests, plus the burst allowance
+    assert [policy.acquire() for _ in range(3)] == [True, True, False]
+
+def test_error_waits_for_the_other_call():
+    policy = HedgePolicy(warm_metrics(latency=0.05), budget=1.0)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            raise ValueError("primary failed")
+        time.sleep(0.5)
+        return "hedge"
+
+    assert run_hedged(call, CancelToken(), hedge=policy.plan("m", 1)) == "hedge"
+
+@patch("google.genai.Client")
+def test_translator_hedges_slow_request(mock_client_class, tmp_path):
+    calls = []
+    release = threading.Event()
+
+    def generate(model, config, contents):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+        response = MagicMock()
+        response.text = '{"hindi_ocr": "ocr", "english_translation": "trans"}'
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    (tmp_path / "page.jpg").write_bytes(b"x")
+    metrics = warm_metrics(label="gemini-2.0-flash", latency=0.05)
+    translator = Translator("key-0001", "p", metrics=metrics, hedge_budget=0.1)
+
+    started = time.monotonic()
+    results = translator.translate_files([str(tmp_path / "page.jpg")])
+    assert time.monotonic() - started < 1
+    assert results[0]["hindi_ocr"] == "ocr"
+    assert len(calls) == 2
+    release.set()
+
+def test_hedge_uses_another_key_and_stops_the_loser(tmp_path):
+    from types import SimpleNamespace
+    from jain_digitizer.common.key_pool import KeyPool
+    clients = []
+
+    class StallingClient:
+        """The first request hangs until its client is closed, like a stuck HTTP call."""
+        def __init__(self, api_key=None, http_options=None):
+            self.api_key = api_key
+            self.closed = threading.Event()
+            self.models = self
+            clients.append(self)
+
+        def generate_content(self, model, config, contents):
+            if self is clients[0]:
+                self.closed.wait(5)
+                raise ConnectionError("client closed")
+            return SimpleNamespace(text='{"hindi_ocr": "ocr", "english_translation": "trans"}', usage_metadata=None)
+
+        def close(self):
+            self.closed.set()
+
+    (tmp_path / "page.jpg").write_bytes(b"x")
+    pool = KeyPool("key-0001,key-0002")
+    translator = Translator("key-0001", "p", client_factory=StallingClient, key_pool=pool, page_filter=False,
+                            metrics=warm_metrics(label="gemini-2.0-flash", latency=0.05), hedge_budget=0.1)
+    results = translator.translate_files([str(tmp_path / "page.jpg")])
+
+    assert results[0]["hindi_ocr"] == "ocr"
+    assert [c.api_key for c in clients] == ["key-0001", "key-0002"]
+    # The losing call is cut off and gives its key back
+    assert clients[0].closed.wait(1)
+    deadline = time.monotonic() + 2
+    while any(s["in_flight"] for s in pool.snapshot().values()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [s["in_flight"] for s in pool.snapshot().values()] == [0, 0]
+    assert [s["errors"] for s in pool.snapshot().values()] == [0, 0]
@@ -0,0 +1,67 @@
+import os
+import pytest
+from jain_digitizer.common import imaging
+from jain_digitizer.common.imaging import downscale, ink_density, load_preview, classify_page
+from jain_digitizer.common.ingestion import PageSource
+
+pytestmark = pytest.mark.skipif(not imaging.IMAGING_AVAILABLE, reason="PyMuPDF is not installed")
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "data", "jdkpa-470.jpeg")
+
+def make_png(width, height, dark_rows=0):
+    """A white page whose first ``dark_rows`` rows are black."""
+    pix = imaging.pymupdf.Pixmap(imaging.pymupdf.csGRAY, imaging.pymupdf.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    if dark_rows:
+        pix.clear_with(0, imaging.pymupdf.IRect(0, 0, width, dark_rows))
+    return pix.tobytes("png")
+
+def test_ink_density():
+    assert ink_density(make_png(40, 40)) == 0.0
+    assert ink_density(make_png(40, 40, dark_rows=10)) == pytest.approx(0.25, abs=0.03)
+
+def test_downscale_shrinks_and_keeps_ink():
+    with open(SAMPLE_PAGE, "rb") as f:
+        data = f.read()
+    small = downscale(data, 0.35)
+    assert small.startswith(b"\xff\xd8")
+    assert len(small) < len(data) / 2
+    assert ink_density(small) == pytest.approx(ink_density(data), abs=0.01)
+
+def test_preview_is_cached(tmp_path):
+    source = PageSource.from_path(SAMPLE_PAGE, "image/jpeg")
+    first = load_preview(source, 0.5, cache_dir=str(tmp_path))
+    cached = PageSource(source.filename, source.mime_type, source.size,
+                        lambda: pytest.fail("re-read a cached preview"), source.digest)
+    assert load_preview(cached, 0.5, cache_dir=str(tmp_path)) == first
+    # Another scale is another entry
+    assert load_preview(source, 0.25, cache_dir=str(tmp_path))[0] != first[0]
+
+def test_no_preview_for_pdf(tmp_path):
+    source = PageSource.from_bytes(b"%PDF-1.4", "book.pdf", "application/pdf")
+    assert load_preview(source, 0.5, cache_dir=str(tmp_path)) is None
+
+def make_page(pattern):
+    """Encodes a grayscale page from a 2-D uint8 array."""
+    height, width = pattern.shape
+    return imaging.pymupdf.Pixmap(imaging.pymupdf.csGRAY, width, height, pattern.tobytes(), 0).tobytes("png")
+
+@pytest.mark.skipif(not imaging.NUMPY_AVAILABLE, reason="numpy is not installed")
+def test_classify_page():
+    np = imaging.np
+    rng = np.random.default_rng(0)
+    # Tinted paper with noise, show-through and a dark scanner edge
+    verso = np.clip(rng.normal(205, 6, (1100, 800)), 0, 255)
+    for row in range(150, 950, 30):
+        verso[row:row + 8, 100:700] -= 25
+    verso[:, :40] = 30
+    assert classify_page(make_page(verso.astype(np.uint8))) == "blank"
+
+    # A continuous-tone plate
+    yy, xx = np.mgrid[0:1100, 0:800]
+    plate = 128 + 80 * np.sin(xx / 90) * np.cos(yy / 120) + rng.normal(0, 8, (1100, 800))
+    assert classify_page(make_page(np.clip(plate, 0, 255).astype(np.uint8))) == "picture"
+
+    for name in ["jdkpa-470.jpeg", "jdkpa-548.jpeg", "jdkpa-549.jpeg"]:
+        with open(os.path.join(os.path.dirname(SAMPLE_PAGE), name), "rb") as f:
+            assert classify_page(f.read()) == "text"
@@ -0,0 +1,65 @@
+import hashlib
+import io
+import os
+import tracemalloc
+from jain_digitizer.common.ingestion import read_file, plan_chunks, pack_chunks, spill_to_disk, PageSource
+
+def test_read_file(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(b"\xff\xd8 fake jpeg")
+    assert read_file(str(path)) == b"\xff\xd8 fake jpeg"
+
+def test_read_empty_file(tmp_path):
+    path = tmp_path / "empty.jpg"
+    path.write_bytes(b"")
+    assert read_file(str(path)) == b""
+
+def test_plan_chunks_without_limits():
+    assert plan_chunks([10, 20, 30]) == [[0, 1, 2]]
+
+def test_plan_chunks_by_count():
+    assert plan_chunks([10, 20, 30], max_files=2) == [[0, 1], [2]]
+
+def test_plan_chunks_by_memory_budget():
+    assert plan_chunks([40, 40, 40, 10], memory_budget=90) == [[0, 1], [2, 3]]
+
+def test_plan_chunks_oversized_file_goes_alone():
+    assert plan_chunks([10, 500, 10], memory_budget=100) == [[0], [1], [2]]
+
+def test_pack_chunks_by_output_tokens():
+    # Small pages fill the gap left next to a large one instead of opening a new request
+    assert pack_chunks([1] * 4, [600, 600, 300, 300], token_budget=1000) == [[0, 2], [1, 3]]
+
+def test_pack_chunks_respects_count_and_memory():
+    assert pack_chunks([10, 10, 10], [1, 1, 1], token_budget=100, max_files=2) == [[0, 1], [2]]
+    assert pack_chunks([60, 60, 30], [1, 1, 1], token_budget=100, memory_budget=90) == [[0, 2], [1]]
+
+def test_pack_chunks_oversized_page_goes_alone():
+    assert pack_chunks([1, 1, 1], [100, 2000, 100], token_budget=1000) == [[0, 2], [1]]
+
+def test_pack_chunks_only_fills_recent_chunks():
+    # The first chunk is closed once four newer ones are open, keeping requests near reading order
+    chunks = pack_chunks([1] * 6, [900, 900, 900, 900, 900, 100], token_budget=1000, open_chunks=4)
+    assert chunks == [[0], [1, 5], [2], [3], [4]]
+
+def test_spill_to_disk_without_copying(tmp_path):
+    upload = io.BytesIO(os.urandom(32 * 1024 * 1024))
+    tracemalloc.start()
+    try:
+        path, digest = spill_to_disk(upload.getbuffer(), str(tmp_path / "uploads"), ".pdf")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 1024 * 1024
+    assert path.endswith(".pdf") and os.path.dirname(path) == str(tmp_path / "uploads")
+    assert digest == hashlib.sha256(upload.getvalue()).hexdigest()
+    assert read_file(path) == upload.getvalue()
+
+def test_page_source_with_known_digest_is_not_rehashed(tmp_path):
+    path = tmp_path / "tmp1234.jpg"
+    path.write_bytes(b"page")
+    source = PageSource.from_path(str(path), "image/jpeg", "page 1.jpg", "abc123")
+    assert source.filename == "page 1.jpg"
+    assert source.digest() == "abc123"
+    assert PageSource.from_path(str(path), "image/jpeg").digest() == hashlib.sha256(b"page").hexdigest()
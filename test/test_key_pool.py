@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from jain_digitizer.common.key_pool import KeyPool, parse_keys, classify_error, mask_key, THROTTLED, INVALID, ERROR
+from jain_digitizer.common.translator import Translator
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class QuotaError(Exception):
+    code = 429
+
+def test_parse_keys():
+    assert parse_keys("a, b\nc,,a") == ["a", "b", "c"]
+    assert parse_keys("") == []
+    assert parse_keys(["a", ""]) == ["a"]
+
+def test_classify_error():
+    assert classify_error(QuotaError("quota")) == THROTTLED
+    assert classify_error(Exception("429 RESOURCE_EXHAUSTED")) == THROTTLED
+    assert classify_error(Exception("400 API_KEY_INVALID")) == INVALID
+    assert classify_error(Exception("500 INTERNAL")) == ERROR
+
+def test_mask_key():
+    assert mask_key("AIzaSecret1234") == "…1234"
+
+def test_pool_spreads_in_flight_requests():
+    pool = KeyPool("k1,k2,k3")
+    assert sorted(pool.acquire() for _ in range(3)) == ["k1", "k2", "k3"]
+
+def test_throttled_key_rests_with_backoff():
+    clock = FakeClock()
+    pool = KeyPool("key-0001,key-0002", cooldown=10, clock=clock)
+    key = pool.acquire()
+    assert pool.release(key, QuotaError()) == THROTTLED
+
+    other = "key-0002" if key == "key-0001" else "key-0001"
+    for _ in range(3):
+        assert pool.acquire() == other
+        pool.release(other)
+    assert pool.snapshot()[mask_key(key)]["cooling_down"] == 10
+
+    clock.now += 10
+    assert pool.acquire() == key
+    pool.release(key, QuotaError())
+    # Second consecutive throttle doubles the rest
+    assert pool.snapshot()[mask_key(key)]["cooling_down"] == 20
+
+def test_rejected_key_is_dropped():
+    pool = KeyPool("k1,k2")
+    pool.release(pool.acquire(), Exception("API_KEY_INVALID"))
+    assert pool.usable() == 1
+    pool.release(pool.acquire(), Exception("API_KEY_INVALID"))
+    with pytest.raises(ValueError):
+        pool.acquire()
+
+def response_for(contents):
+    names = [p.text for p in contents if p.text]
+    response = MagicMock()
+    response.text = json.dumps([{"hindi_ocr": n, "english_translation": n} for n in names])
+    return response
+
+@patch("google.genai.Client")
+def test_translator_moves_off_throttled_key(mock_client_class, tmp_path):
+    used = []
+
+    def make_client(api_key, http_options=None):
+        def generate(model, config, contents):
+            used.append(api_key)
+            if api_key == "bad":
+                raise QuotaError("429 RESOURCE_EXHAUSTED")
+            return response_for(contents)
+        client = MagicMock()
+        client.models.generate_content.side_effect = generate
+        return client
+
+    mock_client_class.side_effect = make_client
+    (tmp_path / "a.jpg").write_bytes(b"data")
+    # Both keys are idle, so the first listed ("bad") is tried first
+    translator = Translator("bad,good", "prompt", key_pool=KeyPool("bad,good"))
+
+    results = translator.translate_files([str(tmp_path / "a.jpg")])
+    assert used == ["bad", "good"]
+    assert "error" not in results[0]
+
+@patch("google.genai.Client")
+def test_chunks_run_concurrently_across_keys(mock_client_class, tmp_path):
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def generate(model, config, contents):
+        with lock:
+            active.append(1)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.1)
+        with lock:
+            active.pop()
+        return response_for(contents)
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    files = []
+    for i in range(6):
+        (tmp_path / f"{i}.jpg").write_bytes(b"data")
+        files.append(str(tmp_path / f"{i}.jpg"))
+
+    translator = Translator("key-0001,key-0002,key-0003", "prompt", chunk_size=1,
+                            key_pool=KeyPool("key-0001,key-0002,key-0003"))
+    results = translator.translate_files(files)
+
+    assert [r["hindi_ocr"] for r in results] == [f"File {i+1}: {i}.jpg" for i in range(6)]
+    assert peak[0] == 3
+    requests = [stats["requests"] for stats in translator.key_pool.snapshot().values()]
+    assert sum(requests) == 6 and min(requests) >= 1
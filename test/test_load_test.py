@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+LOAD_TEST = os.path.join(os.path.dirname(os.path.dirname(__file__)), "utils", "load_test.py")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+def test_load_test_drives_one_server(tmp_path):
+    pytest.importorskip("streamlit")
+    pytest.importorskip("streamlit_quill")
+    report_path = tmp_path / "load.json"
+    files = [os.path.join(DATA_DIR, name) for name in ("jdkpa-548.jpeg", "jdkpa-548-550.pdf")]
+    subprocess.run([sys.executable, LOAD_TEST, *files, "--sessions", "2", "--timeout", "120",
+                    "--output", str(report_path)], check=True, timeout=300, stdout=subprocess.DEVNULL)
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["errors"] == 0, report["error_messages"]
+    # Both sessions got the whole book (an image and a three-page PDF)
+    assert report["pages"] == 8
+    assert report["requests"] >= 2
+    assert report["rerun_seconds"]["process"]["count"] == 2
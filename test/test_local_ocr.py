@@ -0,0 +1,74 @@
+import json
+from unittest.mock import MagicMock, patch
+import pytest
+from jain_digitizer.common import local_ocr
+from jain_digitizer.common.local_ocr import TesseractBackend, text_to_html
+from jain_digitizer.common.pipeline import LocalFirstTranslator
+from jain_digitizer.common.stage_cache import StageCache
+
+# Confidence by file content, standing in for Tesseract
+FAKE_PAGES = {
+    b"clean": ("णमो अरिहंताणं", 95.0),
+    b"smudged": ("ण?? अ??", 40.0),
+}
+
+def fake_ocr_job(data, mime_type, languages):
+    text, confidence = FAKE_PAGES[bytes(data)]
+    return text, confidence, None
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    monkeypatch.setattr(local_ocr, "TESSERACT_AVAILABLE", True)
+    monkeypatch.setattr(local_ocr, "_ocr_job", fake_ocr_job)
+
+def write_pages(tmp_path, contents):
+    files = []
+    for i, content in enumerate(contents):
+        path = tmp_path / f"page{i}.png"
+        path.write_bytes(content)
+        files.append(str(path))
+    return files
+
+def test_text_to_html():
+    assert text_to_html("एक\nदो\n\nतीन <") == "<p>एक<br/>दो</p><p>तीन &lt;</p>"
+
+def test_backend_requires_tesseract(monkeypatch):
+    monkeypatch.setattr(local_ocr, "TESSERACT_AVAILABLE", False)
+    with pytest.raises(RuntimeError):
+        TesseractBackend(workers=1).translate_bytes([(b"clean", "a.png", "image/png")])
+
+def test_backend_returns_ocr_only(fake_tesseract, tmp_path):
+    events = []
+    backend = TesseractBackend(workers=1, progress_callback=lambda i, r: events.append(i))
+    results = backend.translate_files(write_pages(tmp_path, [b"clean", b"smudged"]))
+
+    assert results[0]["hindi_ocr"] == "<p>णमो अरिहंताणं</p>"
+    assert results[0]["english_translation"] == ""
+    assert results[0]["ocr_confidence"] == 95.0
+    assert results[1]["ocr_confidence"] == 40.0
+    assert events == [[0], [1]]
+
+@patch("google.genai.Client")
+def test_local_first_sends_only_low_confidence_pages(mock_client_class, fake_tesseract, tmp_path):
+    requests = []
+
+    def generate(model, config, contents):
+        labels = [p.text for p in contents if p.text and p.text.startswith("File ")]
+        is_ocr = "OCR PROMPT" in config.system_instruction
+        requests.append(("ocr" if is_ocr else "translation", labels))
+        key = "hindi_ocr" if is_ocr else "english_translation"
+        response = MagicMock()
+        response.text = json.dumps([{key: f"<p>{label}</p>"} for label in labels])
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    translator = LocalFirstTranslator("key", ocr_prompt="OCR PROMPT", translation_prompt="TRANSLATE",
+                                      cache=StageCache(str(tmp_path / "s.db")),
+                                      local_backend=TesseractBackend(workers=1))
+    results = translator.translate_files(write_pages(tmp_path, [b"clean", b"smudged"]))
+
+    ocr_requests = [labels for kind, labels in requests if kind == "ocr"]
+    assert ocr_requests == [["File 2: page1.png"]]
+    assert results[0]["hindi_ocr"] == "<p>णमो अरिहंताणं</p>"
+    assert results[1]["hindi_ocr"] == "<p>File 2: page1.png</p>"
+    assert all(r["english_translation"] for r in results)
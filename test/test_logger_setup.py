@@ -0,0 +1,31 @@
+import gzip
+import json
+import logging
+from jain_digitizer.common.logger_setup import truncate_payload, log_payload, CompressedPayloadHandler
+
+def test_truncate_payload_short_text_unchanged():
+    assert truncate_payload("नमस्ते", limit=10) == "नमस्ते"
+
+def test_truncate_payload_long_text():
+    text = "x" * 50
+    result = truncate_payload(text, limit=10)
+    assert result.startswith("x" * 10)
+    assert "[40 more chars]" in result
+
+def test_log_payload_writes_full_payload_to_sidecar(tmp_path):
+    sidecar = tmp_path / "raw.jsonl.gz"
+    handler = CompressedPayloadHandler(str(sidecar))
+    log = logging.getLogger("jain_digitizer_test_payload")
+    log.setLevel(logging.DEBUG)
+    log.addHandler(handler)
+    try:
+        payload = "y" * 10000
+        log_payload("Raw response", payload, log=log)
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+    with gzip.open(sidecar, "rt", encoding="utf-8") as f:
+        entry = json.loads(f.readline())
+    assert entry["payload"] == payload
+    assert len(entry["message"]) < len(payload)
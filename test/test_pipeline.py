@@ -0,0 +1,121 @@
+import json
+from unittest.mock import MagicMock, patch
+from jain_digitizer.common.pipeline import TwoStageTranslator
+from jain_digitizer.common.stage_cache import StageCache
+
+def fake_generate(model, config, contents):
+    """Answers OCR requests (image parts) and translation requests (text parts)."""
+    response = MagicMock()
+    pages = [part for part in contents if part.text and part.text.startswith("File ")]
+    if "OCR PROMPT" in config.system_instruction:
+        payload = [{"hindi_ocr": f"<p>पृष्ठ {i}</p>"} for i in range(len(pages))]
+    else:
+        payload = [{"english_translation": f"<p>{config.system_instruction[:8]} {i}</p>"} for i in range(len(pages))]
+    response.text = json.dumps(payload)
+    response.usage_metadata = None
+    return response
+
+def make_files(tmp_path, count):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"page{i}.jpg"
+        path.write_bytes(b"image %d" % i)
+        files.append(str(path))
+    return files
+
+def is_image_request(call):
+    return "OCR PROMPT" in call.kwargs["config"].system_instruction
+
+@patch("google.genai.Client")
+def test_two_stage_translates_ocr_text(mock_client_class, tmp_path):
+    client = mock_client_class.return_value
+    client.models.generate_content.side_effect = fake_generate
+    cache = StageCache(str(tmp_path / "stages.db"))
+
+    translator = TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE v1", cache=cache)
+    results = translator.translate_files(make_files(tmp_path, 3))
+
+    assert [r["hindi_ocr"] for r in results] == ["<p>पृष्ठ 0</p>", "<p>पृष्ठ 1</p>", "<p>पृष्ठ 2</p>"]
+    assert all(r["english_translation"].startswith("<p>TRANSLAT") for r in results)
+    translation_calls = [c for c in client.models.generate_content.call_args_list if not is_image_request(c)]
+    # Translation requests only carry text
+    for call in translation_calls:
+        assert all(part.inline_data is None for part in call.kwargs["contents"])
+
+@patch("google.genai.Client")
+def test_changed_translation_prompt_skips_ocr(mock_client_class, tmp_path):
+    client = mock_client_class.return_value
+    client.models.generate_content.side_effect = fake_generate
+    cache = StageCache(str(tmp_path / "stages.db"))
+    files = make_files(tmp_path, 2)
+
+    TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE v1", cache=cache).translate_files(files)
+    client.models.generate_content.reset_mock()
+
+    results = TwoStageTranslator("key", "OCR PROMPT", "REVISED v2", cache=cache).translate_files(files)
+    calls = client.models.generate_content.call_args_list
+    assert calls and not any(is_image_request(c) for c in calls)
+    assert all(r["english_translation"].startswith("<p>REVISED") for r in results)
+
+    # Same prompts again: everything comes from the cache
+    client.models.generate_content.reset_mock()
+    TwoStageTranslator("key", "OCR PROMPT", "REVISED v2", cache=cache).translate_files(files)
+    client.models.generate_content.assert_not_called()
+
+@patch("google.genai.Client")
+def test_translation_failure_keeps_ocr(mock_client_class, tmp_path):
+    client = mock_client_class.return_value
+
+    def generate(model, config, contents):
+        if "OCR PROMPT" in config.system_instruction:
+            return fake_generate(model, config, contents)
+        response = MagicMock()
+        response.text = "not json"
+        response.usage_metadata = None
+        return response
+
+    client.models.generate_content.side_effect = generate
+    translator = TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE", cache=StageCache(str(tmp_path / "s.db")))
+    results = translator.translate_files(make_files(tmp_path, 1))
+
+    assert results[0]["hindi_ocr"] == "<p>पृष्ठ 0</p>"
+    assert "Translation failed" in results[0]["english_translation"]
+    assert "translation_error" in results[0]
+
+@patch("google.genai.Client")
+def test_translate_ocr_reuses_existing_text(mock_client_class, tmp_path):
+    client = mock_client_class.return_value
+    client.models.generate_content.side_effect = fake_generate
+    translator = TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE", cache=StageCache(str(tmp_path / "s.db")))
+
+    results = translator.translate_ocr([{"hindi_ocr": "<p>एक</p>"}, {"error": "failed"}])
+    assert results[0]["english_translation"].startswith("<p>TRANSLAT")
+    assert results[1] == {"error": "failed"}
+    assert not any(is_image_request(c) for c in client.models.generate_content.call_args_list)
+
+@patch("google.genai.Client")
+def test_blank_page_skips_both_stages(mock_client_class, tmp_path):
+    import pytest
+    from jain_digitizer.common import imaging
+    if not (imaging.IMAGING_AVAILABLE and imaging.NUMPY_AVAILABLE):
+        pytest.skip("PyMuPDF and numpy are needed")
+    client = mock_client_class.return_value
+    client.models.generate_content.side_effect = fake_generate
+    blank = imaging.pymupdf.Pixmap(imaging.pymupdf.csGRAY, imaging.pymupdf.IRect(0, 0, 300, 400), False)
+    blank.clear_with(240)
+    blank.save(str(tmp_path / "blank.png"))
+    files = make_files(tmp_path, 1) + [str(tmp_path / "blank.png")]
+
+    translator = TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE v1", cache=StageCache(str(tmp_path / "stages.db")))
+    results = translator.translate_files(files)
+
+    assert results[1]["hindi_ocr"] == results[1]["english_translation"] == "<p>[Blank page]</p>"
+    assert results[1]["page_type"] == "blank"
+    for call in client.models.generate_content.call_args_list:
+        assert len([p for p in call.kwargs["contents"] if p.text and p.text.startswith("File ")]) == 1
+
+    # The placeholder isn't cached, so the page is read once the filter is off
+    translator = TwoStageTranslator("key", "OCR PROMPT", "TRANSLATE v1", cache=StageCache(str(tmp_path / "stages.db")),
+                                    page_filter=False)
+    results = translator.translate_files(files)
+    assert results[1]["hindi_ocr"] == "<p>पृष्ठ 0</p>" and "page_type" not in results[1]
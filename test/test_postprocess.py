@@ -0,0 +1,100 @@
+import re
+import time
+from jain_digitizer.common.postprocess import PostProcessor, load_glossary, trie_pattern
+from jain_digitizer.common.translator import Translator
+from unittest.mock import MagicMock, patch
+
+GLOSSARY = {"tirthankara": "tīrthaṅkara", "tirthankaras": "tīrthaṅkaras", "acharya": "ācārya",
+            "tattvartha sutra": "tattvārtha sūtra", "sutra": "sūtra"}
+
+def test_trie_pattern_prefers_longest_whole_word():
+    pattern = re.compile(rf"^(?:{trie_pattern(['sutra', 'sutras', 'sut'])})$")
+    assert all(pattern.match(word) for word in ["sutra", "sutras", "sut"])
+    assert not pattern.match("sutr")
+    # Shared prefixes appear once
+    assert trie_pattern(["sutra", "sutras"]).count("s") == 2
+
+def test_glossary_terms_get_canonical_form_and_case():
+    processor = PostProcessor(GLOSSARY)
+    text = "The Tirthankaras and the acharya; TIRTHANKARA. Tattvartha  Sutra, a sutra."
+    assert processor.english(text) == (
+        "The Tīrthaṅkaras and the ācārya; TĪRTHAṄKARA. Tattvārtha Sūtra, a sūtra."
+    )
+    # Whole words only, and already-canonical terms are left alone
+    assert processor.english("sutrakara ācārya tīrthaṅkara") == "sutrakara ācārya tīrthaṅkara"
+
+def test_iast_and_unicode_rules():
+    processor = PostProcessor()
+    # Decomposed ā, ISO 15919 ṁ and r̥, a zero-width space and a soft hyphen
+    text = "āgama saṁsāra kr̥ta sam​ya­ktva"
+    assert processor.english(text) == "āgama saṃsāra kṛta samyaktva"
+
+def test_dandas_in_devanagari():
+    processor = PostProcessor()
+    assert processor.hindi("णमो अरिहंताणं | णमो सिद्धाणं ||") == "णमो अरिहंताणं । णमो सिद्धाणं ॥"
+    assert processor.hindi("धम्मो मंगलमुक्किट्ठं।।") == "धम्मो मंगलमुक्किट्ठं॥"
+    # ZWJ/ZWNJ shape conjuncts and are kept
+    assert processor.hindi("क्‍ष") == "क्‍ष"
+
+def test_only_text_between_tags_is_changed():
+    processor = PostProcessor(GLOSSARY)
+    result = processor.result({
+        "hindi_ocr": "<h1>[1] File: p|1.jpg</h1><p>अहिंसा  परमो धर्मः |</p><pre>a   b</pre>",
+        "english_translation": '<p><a href="sutra.html" title="acharya">The   acharya</a> taught the <b>sutra</b>.</p>',
+    })
+    assert result["hindi_ocr"] == "<h1>[1] File: p।1.jpg</h1><p>अहिंसा परमो धर्मः ।</p><pre>a   b</pre>"
+    assert result["english_translation"] == ('<p><a href="sutra.html" title="acharya">The ācārya</a> '
+                                             'taught the <b>sūtra</b>.</p>')
+
+def test_rules_are_idempotent_and_skip_errors():
+    processor = PostProcessor(load_glossary())
+    result = {"hindi_ocr": "<p>णमो || लोए |</p>",
+              "english_translation": "<p>Obeisance to the Acharyas, Upadhyayas and Sadhus. saṁsāra</p>"}
+    once = dict(processor.result(dict(result)))
+    assert once["english_translation"] == "<p>Obeisance to the Ācāryas, Upādhyāyas and Sādhus. saṃsāra</p>"
+    assert processor.result(dict(once)) == once
+    assert processor.result({"error": "API error"}) == {"error": "API error"}
+
+def test_bundled_glossary_loads(tmp_path):
+    glossary = load_glossary()
+    assert glossary["tirthankara"] == "tīrthaṅkara"
+    bad = tmp_path / "glossary.tsv"
+    bad.write_text("# comment\nacharya ācārya\n", encoding="utf-8")
+    try:
+        load_glossary(str(bad))
+    except ValueError as e:
+        assert ":2:" in str(e)
+    else:
+        raise AssertionError("expected a ValueError")
+
+def test_whole_book_in_bulk_is_fast():
+    processor = PostProcessor(load_glossary())
+    page = {"hindi_ocr": "<h1>[1] File: p1.jpg</h1>" + "<p>णमो अरिहंताणं णमो सिद्धाणं णमो आयरियाणं |</p>" * 20,
+            "english_translation": "<h1>[1] File: p1.jpg</h1>" + "<p><i>ṇamo arihaṃtāṇaṃ</i> — Obeisance to the "
+                                   "Tirthankaras, the Acharyas and the Sadhus of the agama.</p>" * 20}
+    book = [dict(page) for _ in range(500)]
+    start = time.perf_counter()
+    processor.results(book)
+    # Generous bound; a 500-page book takes well under a second here
+    assert time.perf_counter() - start < 5
+    assert "Tīrthaṅkaras" in book[-1]["english_translation"]
+
+@patch("google.genai.Client")
+def test_translator_results_are_post_processed(mock_client, tmp_path):
+    page = tmp_path / "page1.jpg"
+    page.write_bytes(b"scan")
+    response = MagicMock()
+    response.text = '{"hindi_ocr": "<p>णमो ||</p>", "english_translation": "<p>The Tirthankara</p>"}'
+    mock_client.return_value.models.generate_content.return_value = response
+
+    reported = []
+    translator = Translator("key-0001", "prompt", page_filter=False,
+                            progress_callback=lambda indices, results: reported.extend(results))
+    results = translator.translate_files([str(page)])
+    assert results[0]["hindi_ocr"] == "<p>णमो ॥</p>"
+    assert results[0]["english_translation"] == "<p>The Tīrthaṅkara</p>"
+    assert reported == results
+
+    translator = Translator("key-0001", "prompt", page_filter=False)
+    translator.postprocessor = None
+    assert translator.translate_files([str(page)])[0]["english_translation"] == "<p>The Tirthankara</p>"
@@ -0,0 +1,44 @@
+from jain_digitizer.common.progress import ProgressTracker, format_eta
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_tracker_counts_pages_and_errors():
+    clock = FakeClock()
+    tracker = ProgressTracker(10, clock=clock)
+    assert tracker.snapshot()["eta_seconds"] is None
+
+    clock.now = 6.0
+    snap = tracker.update(2, errors=1)
+    assert snap["pages_done"] == 2
+    assert snap["errors"] == 1
+    assert snap["pages_per_minute"] == 20.0
+    assert snap["eta_seconds"] == 24.0
+
+def test_eta_follows_recent_rate():
+    clock = FakeClock()
+    tracker = ProgressTracker(100, window=2, clock=clock)
+    # Slow start, then much faster chunks
+    for now, pages in [(60.0, 1), (61.0, 10), (62.0, 10)]:
+        clock.now = now
+        snap = tracker.update(pages)
+    # Rate over the last two completions only: 20 pages in 2 seconds
+    assert snap["pages_per_minute"] == 600.0
+    assert snap["eta_seconds"] == 7.9
+
+def test_tracker_finishes_at_zero_eta():
+    clock = FakeClock()
+    tracker = ProgressTracker(2, clock=clock)
+    clock.now = 1.0
+    assert tracker.update(5)["pages_done"] == 2
+    assert tracker.snapshot()["eta_seconds"] == 0.0
+
+def test_format_eta():
+    assert format_eta(None) == "--"
+    assert format_eta(45) == "45s"
+    assert format_eta(200) == "3m 20s"
+    assert format_eta(3900) == "1h 05m"
@@ -0,0 +1,96 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+import pytest
+from jain_digitizer.common import backend, rasterize
+from jain_digitizer.common.rasterize import PdfRasterizer
+from jain_digitizer.common.translator import Translator
+from jain_digitizer.common.token_budget import OutputTokenEstimator
+
+pytestmark = pytest.mark.skipif(not rasterize.PDF_AVAILABLE, reason="PyMuPDF is not installed")
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "data", "jdkpa-548-550.pdf")
+
+def test_renders_one_jpeg_per_page(tmp_path):
+    rasterizer = PdfRasterizer(dpi=50, cache_dir=str(tmp_path), workers=2)
+    try:
+        sources = rasterizer.page_sources(SAMPLE_PDF)
+        pages = [src.load() for src in sources]
+    finally:
+        rasterizer.close()
+
+    assert [src.filename for src in sources] == ["jdkpa-548-550.pdf p1", "jdkpa-548-550.pdf p2", "jdkpa-548-550.pdf p3"]
+    assert [src.page for src in sources] == [1, 2, 3]
+    assert all(src.mime_type == "image/jpeg" for src in sources)
+    assert all(data.startswith(b"\xff\xd8") for data in pages)
+    # Digests differ per page and are known before rendering finishes
+    assert len({src.digest() for src in sources}) == 3
+
+def test_rendered_pages_are_cached(tmp_path):
+    first = PdfRasterizer(dpi=50, cache_dir=str(tmp_path), workers=1)
+    try:
+        pages = [src.load() for src in first.page_sources(SAMPLE_PDF)]
+    finally:
+        first.close()
+
+    second = PdfRasterizer(dpi=50, cache_dir=str(tmp_path), workers=1)
+    with patch.object(PdfRasterizer, "_get_pool", side_effect=AssertionError("re-rendered a cached page")):
+        sources = second.page_sources(SAMPLE_PDF)
+    assert [src.load() for src in sources] == pages
+    assert [src.size for src in sources] == [len(p) for p in pages]
+
+    # A different resolution is a different cache entry
+    third = PdfRasterizer(dpi=60, cache_dir=str(tmp_path), workers=1)
+    try:
+        assert [src.load() for src in third.page_sources(SAMPLE_PDF)] != pages
+    finally:
+        third.close()
+
+def test_uploaded_pdf_is_rasterized(tmp_path):
+    with open(SAMPLE_PDF, "rb") as f:
+        data = f.read()
+    rasterizer = PdfRasterizer(dpi=50, cache_dir=str(tmp_path), workers=1)
+    try:
+        sources = rasterizer.page_sources_from_bytes(data, "upload.pdf")
+        assert [src.filename for src in sources][0] == "upload.pdf p1"
+        assert sources[2].load().startswith(b"\xff\xd8")
+    finally:
+        rasterizer.close()
+
+@patch("google.genai.Client")
+def test_translator_sends_pdf_pages_as_images(mock_client_class, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "PdfRasterizer",
+                        lambda dpi: PdfRasterizer(dpi=dpi, cache_dir=str(tmp_path), workers=1))
+    requests = []
+
+    def generate(model, config, contents):
+        mime_types = [p.inline_data.mime_type for p in contents if p.inline_data is not None]
+        requests.append(mime_types)
+        response = MagicMock()
+        response.text = json.dumps([{"hindi_ocr": "H", "english_translation": "E"} for _ in mime_types])
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    progress = []
+    translator = Translator("key-0001", "Prompt", chunk_size=2, raster_dpi=50, token_estimator=OutputTokenEstimator(),
+                            progress_callback=lambda indices, results: progress.append(
+                                (indices, [r.get("source") for r in results])))
+    results = translator.translate_files([SAMPLE_PDF])
+
+    assert translator.page_total == 3
+    assert requests == [["image/jpeg", "image/jpeg"], ["image/jpeg"]]
+    # Pages are labelled before they're reported, not only once the batch is done
+    assert progress == [([0, 1], ["jdkpa-548-550.pdf p1", "jdkpa-548-550.pdf p2"]), ([2], ["jdkpa-548-550.pdf p3"])]
+    assert [r["source"] for r in results] == ["jdkpa-548-550.pdf p1", "jdkpa-548-550.pdf p2", "jdkpa-548-550.pdf p3"]
+
+@patch("google.genai.Client")
+def test_zero_dpi_sends_pdf_whole(mock_client_class):
+    mock_response = MagicMock()
+    mock_response.text = json.dumps({"hindi_ocr": "H", "english_translation": "E"})
+    mock_client_class.return_value.models.generate_content.return_value = mock_response
+
+    results = Translator("key-0001", "Prompt", raster_dpi=0).translate_files([SAMPLE_PDF])
+
+    contents = mock_client_class.return_value.models.generate_content.call_args.kwargs["contents"]
+    assert contents[0].inline_data.mime_type == "application/pdf"
+    assert len(results) == 1 and "source" not in results[0]
@@ -0,0 +1,63 @@
+from jain_digitizer.common.search_index import SearchIndex, build_query, main
+
+PAGES = [
+    {"hindi_ocr": "<h1>[1] File: p1.jpg</h1><p>णमो अरिहंताणं णमो सिद्धाणं</p>",
+     "english_translation": "<p>Obeisance to the Arihantas and the <b>ācāryas</b></p>"},
+    {"hindi_ocr": "<p>तीर्थंकर महावीर का उपदेश</p>",
+     "english_translation": "<p>The teaching of Tīrthaṅkara Mahāvīra</p>"},
+]
+
+def make_index(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    index.add_results("book", PAGES, ["p1.jpg", "p2.jpg"])
+    return index
+
+def test_build_query_quotes_terms():
+    assert build_query('महावीर "x" acar*') == '"महावीर" """x""" "acar"*'
+
+def test_search_devanagari_whole_word(tmp_path):
+    index = make_index(tmp_path)
+    hits = index.search("महावीर")
+    assert [h["page"] for h in hits] == ["p2.jpg"]
+    # Matras and viramas stay inside the token, so a word fragment doesn't match
+    assert index.search("महा") == []
+    assert [h["page"] for h in index.search("अरिहं*")] == ["p1.jpg"]
+
+def test_search_folds_iast_diacritics(tmp_path):
+    index = make_index(tmp_path)
+    assert [h["page"] for h in index.search("acaryas")] == ["p1.jpg"]
+    assert [h["page"] for h in index.search("tirthankara mahavira")] == ["p2.jpg"]
+
+def test_incremental_updates(tmp_path):
+    index = make_index(tmp_path)
+    # Unchanged pages are skipped, changed pages are re-indexed
+    assert index.add_results("book", PAGES, ["p1.jpg", "p2.jpg"]) == 0
+    changed = dict(PAGES[1], english_translation="<p>The teaching of Pārśvanātha</p>")
+    assert index.add_page("book", "p2.jpg", changed)
+    assert index.search("mahavira") == []
+    assert [h["page"] for h in index.search("parsvanatha")] == ["p2.jpg"]
+    assert index.page_count() == 2
+
+def test_error_results_are_not_indexed(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    assert index.add_results("book", [{"error": "bad"}], ["p1.jpg"]) == 0
+
+def test_cli(tmp_path, capsys):
+    make_index(tmp_path).close()
+    assert main(["mahavira", "--index", str(tmp_path / "index.db")]) == 0
+    out = capsys.readouterr().out
+    assert "book / p2.jpg" in out
+    assert "«Mahāvīra»" in out
+
+def test_default_paths_are_per_user_not_cwd(tmp_path, monkeypatch):
+    import sys
+    from jain_digitizer.common.constants import user_dir
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    assert user_dir("cache") == str(tmp_path / "cache" / "jain-digitizer")
+    assert user_dir("data") == str(tmp_path / "data" / "jain-digitizer")
+    # The per-user directory doesn't exist yet on first run
+    index = SearchIndex(str(tmp_path / "data" / "jain-digitizer" / "search_index.db"))
+    index.add_results("book", PAGES, ["p1.jpg", "p2.jpg"])
+    assert [h["page"] for h in index.search("महावीर")] == ["p2.jpg"]
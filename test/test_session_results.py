@@ -0,0 +1,74 @@
+import glob
+import os
+import time
+from jain_digitizer.common import session_results
+from jain_digitizer.common.session_results import SessionResults, open_session, evict_sessions
+
+def make_results(count):
+    return [{"hindi_ocr": f"<p>पृष्ठ {i}</p>", "english_translation": f"<p>Page {i}</p>"} for i in range(count)]
+
+def test_views_read_only_their_pages(tmp_path):
+    store = SessionResults(str(tmp_path / "s.db"), view_size=10)
+    store.replace(make_results(25))
+
+    assert len(store) == 25
+    assert store.view_count() == 3
+    first, pages = store.view(2)
+    assert first == 20
+    assert [p["english_translation"] for p in pages] == [f"<p>Page {i}</p>" for i in range(20, 25)]
+
+    # A new batch replaces the old one
+    store.replace(make_results(3))
+    assert store.view_count() == 1
+    store.clear()
+    assert len(store) == 0 and store.view_count() == 0
+
+def test_iterates_every_page_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_results, "READ_BATCH", 4)
+    store = SessionResults(str(tmp_path / "s.db"))
+    store.replace(make_results(9))
+    assert list(store) == make_results(9)
+
+def test_edits_are_kept_per_view_until_the_next_batch(tmp_path):
+    store = SessionResults(str(tmp_path / "s.db"), view_size=2)
+    store.replace(make_results(4))
+    assert store.edit("hindi_ocr", 1) is None
+    store.save_edit("hindi_ocr", 1, "<p>सुधार</p>")
+    assert store.edit("hindi_ocr", 1) == "<p>सुधार</p>"
+    assert store.edit("english_translation", 1) is None
+
+    store.replace(make_results(4))
+    assert store.edit("hindi_ocr", 1) is None
+
+def test_results_survive_reopening_the_session(tmp_path):
+    store = open_session("abc", str(tmp_path))
+    store.replace(make_results(3))
+    store.close()
+    assert len(open_session("abc", str(tmp_path))) == 3
+
+def test_least_recently_used_sessions_are_evicted(tmp_path):
+    stores = [open_session(f"s{i}", str(tmp_path), max_sessions=10) for i in range(4)]
+    for age, store in enumerate(stores):
+        stores[age].replace(make_results(1))
+        past = time.time() - 1000 + age
+        os.utime(store.path, (past, past))
+    # Session 0 was used most recently
+    stores[0].touch()
+
+    assert evict_sessions(str(tmp_path), max_sessions=2) == 2
+    remaining = sorted(os.path.basename(p) for p in tmp_path.glob("*.db"))
+    assert remaining == ["s0.db", "s3.db"]
+
+def test_open_session_keeps_its_own_file(tmp_path):
+    for i in range(3):
+        open_session(f"old{i}", str(tmp_path), max_sessions=3)
+    store = open_session(None, str(tmp_path), max_sessions=1)
+    assert [p.name for p in tmp_path.glob("*.db")] == [os.path.basename(store.path)]
+
+def test_eviction_skips_files_removed_concurrently(tmp_path, monkeypatch):
+    for i in range(3):
+        open_session(f"s{i}", str(tmp_path), max_sessions=10)
+    listed = sorted(str(p) for p in tmp_path.glob("*.db")) + [str(tmp_path / "gone.db")]
+    # Another session evicted "gone.db" between the listing and the stat
+    monkeypatch.setattr(glob, "glob", lambda pattern: listed)
+    assert evict_sessions(str(tmp_path), max_sessions=1) == 2
@@ -0,0 +1,40 @@
+from google.genai import types
+from jain_digitizer.common.token_budget import (OutputTokenEstimator, part_sizes, packing_budget,
+                                                MIN_PAGE_TOKENS, IMAGE, TEXT)
+
+def image_parts(*sizes):
+    parts = []
+    for i, size in enumerate(sizes):
+        parts.append(types.Part.from_bytes(data=b"x" * size, mime_type="image/jpeg"))
+        parts.append(types.Part.from_text(text=f"File {i+1}: page{i}.jpg"))
+    return parts
+
+def test_part_sizes_skips_labels():
+    parts = image_parts(100, 200) + [types.Part.from_text(text="File 3: p3\n\nएक")]
+    assert part_sizes(parts) == [(IMAGE, 100), (IMAGE, 200), (TEXT, 6)]
+
+def test_estimate_has_a_floor_per_page():
+    estimator = OutputTokenEstimator()
+    assert estimator.estimate("m", "image/jpeg", 10) == MIN_PAGE_TOKENS[IMAGE]
+    assert estimator.estimate("m", "image/jpeg", 1_000_000) > estimator.estimate("m", "image/jpeg", 500_000)
+
+def test_learns_rate_from_usage():
+    estimator = OutputTokenEstimator()
+    before = estimator.estimate("m", "image/jpeg", 400_000)
+    for _ in range(20):
+        # Observed: 0.02 tokens per byte, i.e. denser pages than the default assumes
+        estimator.observe("m", image_parts(200_000, 200_000), 8000)
+    assert estimator.estimate("m", "image/jpeg", 400_000) > before
+    assert abs(estimator.rate("m", IMAGE) - 0.02) < 0.001
+    # Other labels (e.g. another stage) keep their own rate
+    assert estimator.estimate("m:ocr", "image/jpeg", 400_000) == before
+
+def test_truncation_raises_rate():
+    estimator = OutputTokenEstimator()
+    before = estimator.rate("m", IMAGE)
+    estimator.penalize("m", ["image/jpeg", "image/png"])
+    assert estimator.rate("m", IMAGE) == before * 1.5
+
+def test_packing_budget_leaves_headroom():
+    assert packing_budget(8192) < 8192
+    assert packing_budget(0) is None
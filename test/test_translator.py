@@ -1,6 +1,9 @@
+import json
+import os
 import pytest
 from unittest.mock import MagicMock, patch
 from jain_digitizer.common.translator import Translator
+from jain_digitizer.common.token_budget import OutputTokenEstimator
 
 def test_translator_initialization():
     translator = Translator(api_key="test_key", system_prompt="test_prompt")
@@ -9,7 +12,7 @@ def test_translator_initialization():
     assert translator.model == "gemini-2.0-flash"
 
 @patch("google.genai.Client")
-def test_translate_single_file(mock_client_class):
+def test_translate_single_file(mock_client_class, tmp_path):
     # Setup mock client and response
     mock_client = MagicMock()
     mock_client_class.return_value = mock_client
@@ -21,8 +24,9 @@ def test_translate_single_file(mock_client_class):
     translator = Translator(api_key="test_key", system_prompt="test_prompt")
     
     # We need a dummy file to test
-    with patch("builtins.open", MagicMock(return_value=MagicMock(__enter__=MagicMock(return_value=MagicMock(read=MagicMock(return_value=b"fake data")))))):
-        results = translator.translate_files(["test.jpg"])
+    test_file = tmp_path / "test.jpg"
+    test_file.write_bytes(b"fake data")
+    results = translator.translate_files([str(test_file)])
     
     assert len(results) == 1
     assert results[0]["hindi_ocr"] == "नमस्तस्यै"
@@ -36,7 +40,7 @@ def test_translate_single_file(mock_client_class):
     assert "Return a single JSON object" in kwargs['config'].system_instruction
 
 @patch("google.genai.Client")
-def test_translate_multiple_files(mock_client_class):
+def test_translate_multiple_files(mock_client_class, tmp_path):
     # Setup mock client and response
     mock_client = MagicMock()
     mock_client_class.return_value = mock_client
@@ -47,8 +51,11 @@ def test_translate_multiple_files(mock_client_class):
     
     translator = Translator(api_key="test_key", system_prompt="test_prompt")
     
-    with patch("builtins.open", MagicMock(return_value=MagicMock(__enter__=MagicMock(return_value=MagicMock(read=MagicMock(return_value=b"fake data")))))):
-        results = translator.translate_files(["test1.jpg", "test2.jpg"])
+    test_files = []
+    for name in ["test1.jpg", "test2.jpg"]:
+        (tmp_path / name).write_bytes(b"fake data")
+        test_files.append(str(tmp_path / name))
+    results = translator.translate_files(test_files)
     
     assert len(results) == 2
     assert results[0]["hindi_ocr"] == "file1"
@@ -63,3 +70,294 @@ def test_translator_no_api_key():
     translator = Translator(api_key="", system_prompt="test_prompt")
     with pytest.raises(ValueError, match="Gemini API Key is not set"):
         translator.translate_files(["test.jpg"])
+
+@patch("google.genai.Client")
+def test_failed_chunk_keeps_the_other_chunks(mock_client_class, tmp_path):
+    def generate(model, config, contents):
+        names = [p.text for p in contents if p.text]
+        if any("page3" in name for name in names):
+            raise RuntimeError("500 INTERNAL")
+        response = MagicMock()
+        response.text = json.dumps({"hindi_ocr": names[0], "english_translation": names[0]})
+        return response
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    files = []
+    for i in range(4):
+        path = tmp_path / f"page{i}.jpg"
+        path.write_bytes(b"image %d" % i)
+        files.append(str(path))
+
+    results = Translator("key-0001", "prompt", chunk_size=1, page_filter=False).translate_files(files)
+    assert [r.get("hindi_ocr") for r in results[:3]] == [f"File {i+1}: page{i}.jpg" for i in range(3)]
+    assert results[3] == {"error": "500 INTERNAL"}
+
+@patch("google.genai.Client")
+def test_translate_files_splits_by_memory_budget(mock_client_class, tmp_path):
+    mock_client = MagicMock()
+    mock_client_class.return_value = mock_client
+
+    mock_response = MagicMock()
+    mock_response.text = '{"hindi_ocr": "ocr", "english_translation": "trans"}'
+    mock_client.models.generate_content.return_value = mock_response
+
+    test_files = []
+    for name in ["page1.jpg", "page2.jpg", "page3.jpg"]:
+        (tmp_path / name).write_bytes(b"x" * 100)
+        test_files.append(str(tmp_path / name))
+
+    # Budget fits a single page, so each page goes in its own request
+    translator = Translator(api_key="test_key", system_prompt="test_prompt", memory_budget=150)
+    results = translator.translate_files(test_files)
+
+    assert len(results) == 3
+    assert mock_client.models.generate_content.call_count == 3
+    _, kwargs = mock_client.models.generate_content.call_args
+    assert kwargs['contents'][1].text == "File 3: page3.jpg"
+
+@patch("google.genai.Client")
+def test_context_cache_reused_across_batches(mock_client_class, tmp_path):
+    from jain_digitizer.common.context_cache import ContextCacheRegistry
+
+    mock_client = MagicMock()
+    mock_client_class.return_value = mock_client
+    cache = MagicMock()
+    cache.name = "cachedContents/abc"
+    cache.expire_time = None
+    mock_client.caches.create.return_value = cache
+
+    mock_response = MagicMock()
+    mock_response.text = '{"hindi_ocr": "ocr", "english_translation": "trans"}'
+    mock_client.models.generate_content.return_value = mock_response
+
+    test_file = tmp_path / "page.jpg"
+    test_file.write_bytes(b"fake data")
+
+    registry = ContextCacheRegistry()
+    for _ in range(2):
+        translator = Translator(api_key="test_key", system_prompt="test_prompt",
+                                use_context_cache=True, cache_registry=registry)
+        translator.translate_files([str(test_file)])
+
+    mock_client.caches.create.assert_called_once()
+    _, kwargs = mock_client.models.generate_content.call_args
+    assert kwargs['config'].cached_content == "cachedContents/abc"
+    assert kwargs['config'].system_instruction is None
+
+@patch("google.genai.Client")
+def test_context_cache_falls_back_to_inline_prompt(mock_client_class, tmp_path):
+    from jain_digitizer.common.context_cache import ContextCacheRegistry
+
+    mock_client = MagicMock()
+    mock_client_class.return_value = mock_client
+    mock_client.caches.create.side_effect = Exception("Cached content is too small")
+
+    mock_response = MagicMock()
+    mock_response.text = '{"hindi_ocr": "ocr", "english_translation": "trans"}'
+    mock_client.models.generate_content.return_value = mock_response
+
+    test_file = tmp_path / "page.jpg"
+    test_file.write_bytes(b"fake data")
+
+    translator = Translator(api_key="test_key", system_prompt="test_prompt",
+                            use_context_cache=True, cache_registry=ContextCacheRegistry())
+    results = translator.translate_files([str(test_file)])
+
+    assert results[0]["hindi_ocr"] == "ocr"
+    _, kwargs = mock_client.models.generate_content.call_args
+    assert "test_prompt" in kwargs['config'].system_instruction
+
+@patch("google.genai.Client")
+def test_escalates_failing_pages_to_stronger_model(mock_client_class, tmp_path):
+    from jain_digitizer.common.metrics import RequestMetrics
+
+    mock_client = MagicMock()
+    mock_client_class.return_value = mock_client
+
+    fast_response = MagicMock()
+    fast_response.text = ('[{"hindi_ocr": "<p>णमो अरिहंताणं णमो सिद्धाणं</p>", "english_translation": "<p>Obeisance to the Arihantas and Siddhas</p>"},'
+                          ' {"hindi_ocr": "<p>णमो आय", "english_translation": "<p>Obei"}]')
+    strong_response = MagicMock()
+    strong_response.text = '{"hindi_ocr": "<p>णमो आयरियाणं</p>", "english_translation": "<p>Obeisance to the Ācāryas</p>"}'
+    mock_client.models.generate_content.side_effect = [fast_response, strong_response]
+
+    test_files = []
+    for name in ["page1.jpg", "page2.jpg"]:
+        (tmp_path / name).write_bytes(b"fake data")
+        test_files.append(str(tmp_path / name))
+
+    metrics = RequestMetrics()
+    translator = Translator(api_key="test_key", system_prompt="test_prompt",
+                            escalation_model="gemini-2.5-pro", metrics=metrics)
+    results = translator.translate_files(test_files)
+
+    assert results[1]["hindi_ocr"] == "<p>णमो आयरियाणं</p>"
+    _, kwargs = mock_client.models.generate_content.call_args
+    assert kwargs['model'] == "gemini-2.5-pro"
+    assert kwargs['contents'][1].text == "File 2: page2.jpg"
+
+    stats = metrics.snapshot()
+    assert stats["gemini-2.0-flash"]["escalation_rate"] == 0.5
+    assert stats["gemini-2.5-pro"]["requests"] == 1
+
+@patch("google.genai.Client")
+def test_translate_reports_progress_per_chunk(mock_client_class, tmp_path):
+    mock_client = MagicMock()
+    mock_client_class.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.text = '{"hindi_ocr": "page", "english_translation": "page"}'
+    mock_client.models.generate_content.return_value = mock_response
+
+    events = []
+    translator = Translator(api_key="test_key", system_prompt="test_prompt", chunk_size=1,
+                            progress_callback=lambda indices, results: events.append(indices))
+    test_files = []
+    for name in ["a.jpg", "b.jpg"]:
+        (tmp_path / name).write_bytes(b"fake data")
+        test_files.append(str(tmp_path / name))
+    translator.translate_files(test_files)
+
+    assert events == [[0], [1]]
+
+@patch("google.genai.Client")
+def test_packs_pages_by_estimated_output(mock_client_class, tmp_path):
+    sent = []
+
+    def generate(model, config, contents):
+        labels = [p.text for p in contents if p.text]
+        sent.append(labels)
+        response = MagicMock()
+        response.text = json.dumps([{"hindi_ocr": l, "english_translation": l} for l in labels])
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    files = []
+    for i in range(5):
+        (tmp_path / f"page{i}.jpg").write_bytes(b"x" * 10)
+        files.append(str(tmp_path / f"page{i}.jpg"))
+
+    # Each page is estimated at the 800-token floor; 2000 tokens * 0.8 headroom fits two per request
+    translator = Translator(api_key="key-0001", system_prompt="p", output_token_budget=2000,
+                            token_estimator=OutputTokenEstimator())
+    results = translator.translate_files(files)
+
+    assert [len(labels) for labels in sent] == [2, 2, 1]
+    assert [r["hindi_ocr"] for r in results] == [f"File {i+1}: page{i}.jpg" for i in range(5)]
+
+@patch("google.genai.Client")
+def test_truncated_response_is_retried_in_halves(mock_client_class, tmp_path):
+    sent = []
+
+    def generate(model, config, contents):
+        labels = [p.text for p in contents if p.text]
+        sent.append(len(labels))
+        response = MagicMock()
+        body = json.dumps([{"hindi_ocr": l, "english_translation": l} for l in labels])
+        # Anything over two pages runs past the output limit and is cut off
+        response.text = body if len(labels) <= 2 else body[:50]
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    files = []
+    for i in range(4):
+        (tmp_path / f"page{i}.jpg").write_bytes(b"x" * 10)
+        files.append(str(tmp_path / f"page{i}.jpg"))
+
+    estimator = OutputTokenEstimator()
+    translator = Translator(api_key="key-0001", system_prompt="p", token_estimator=estimator)
+    results = translator.translate_files(files)
+
+    assert sent == [4, 2, 2]
+    assert all("error" not in r for r in results)
+    assert estimator.rate("gemini-2.0-flash", "image") > 0.012
+
+@patch("google.genai.Client")
+def test_preview_pass_resends_only_failing_pages(mock_client_class, tmp_path, monkeypatch):
+    from jain_digitizer.common import imaging, translator as translator_module
+    if not imaging.IMAGING_AVAILABLE:
+        pytest.skip("PyMuPDF is not installed")
+    monkeypatch.setattr(translator_module, "load_preview",
+                        lambda source, scale: imaging.load_preview(source, scale, cache_dir=str(tmp_path / "cache")))
+    sent = []
+
+    def generate(model, config, contents):
+        images = [p.inline_data for p in contents if p.inline_data is not None]
+        labels = [p.text for p in contents if p.text]
+        sent.append([(label.split(": ")[1], len(image.data)) for label, image in zip(labels, images)])
+        results = []
+        for label, image in zip(labels, images):
+            text = "<p>णमो अरिहंताणं</p>"
+            if "page2" in label and image.mime_type == "image/jpeg":
+                # The downscaled page 2 came back cut off
+                text = "<p>णमो"
+            results.append({"hindi_ocr": text, "english_translation": "<p>Obeisance to the Arihantas</p>"})
+        response = MagicMock()
+        response.text = json.dumps(results if len(results) > 1 else results[0], ensure_ascii=False)
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    pix = imaging.pymupdf.Pixmap(imaging.pymupdf.csRGB, imaging.pymupdf.IRect(0, 0, 400, 400), False)
+    pix.clear_with(255)
+    files = []
+    for name in ["page1.png", "page2.png"]:
+        pix.save(str(tmp_path / name))
+        files.append(str(tmp_path / name))
+
+    # The pages are plain white; keep the blank-page filter from answering them locally
+    translator = Translator(api_key="key-0001", system_prompt="p", preview_scale=0.25, page_filter=False,
+                            token_estimator=OutputTokenEstimator())
+    results = translator.translate_files(files)
+
+    full_size = os.path.getsize(files[1])
+    assert [name for name, _ in sent[0]] == ["page1.png", "page2.png"]
+    assert all(size < full_size for _, size in sent[0])
+    assert sent[1] == [("page2.png", full_size)]
+    assert [r["hindi_ocr"] for r in results] == ["<p>णमो अरिहंताणं</p>"] * 2
+
+@patch("google.genai.Client")
+def test_blank_and_picture_pages_are_not_sent(mock_client_class, tmp_path):
+    from jain_digitizer.common import imaging
+    from jain_digitizer.common.metrics import RequestMetrics
+    if not (imaging.IMAGING_AVAILABLE and imaging.NUMPY_AVAILABLE):
+        pytest.skip("PyMuPDF and numpy are needed")
+    sent = []
+
+    def generate(model, config, contents):
+        labels = [p.text for p in contents if p.text]
+        sent.append(labels)
+        response = MagicMock()
+        response.text = json.dumps([{"hindi_ocr": l, "english_translation": l} for l in labels])
+        return response
+
+    mock_client_class.return_value.models.generate_content.side_effect = generate
+    blank = imaging.pymupdf.Pixmap(imaging.pymupdf.csGRAY, imaging.pymupdf.IRect(0, 0, 300, 400), False)
+    blank.clear_with(230)
+    blank.save(str(tmp_path / "verso.png"))
+    files = [os.path.join(os.path.dirname(__file__), "data", "jdkpa-548.jpeg"), str(tmp_path / "verso.png"),
+             os.path.join(os.path.dirname(__file__), "data", "jdkpa-549.jpeg")]
+
+    metrics = RequestMetrics()
+    translator = Translator(api_key="key-0001", system_prompt="p", metrics=metrics,
+                            token_estimator=OutputTokenEstimator())
+    results = translator.translate_files(files)
+
+    assert sent == [["File 1: jdkpa-548.jpeg", "File 3: jdkpa-549.jpeg"]]
+    assert results[1] == {"hindi_ocr": "<p>[Blank page]</p>", "english_translation": "<p>[Blank page]</p>",
+                          "page_type": "blank"}
+    assert results[2]["hindi_ocr"] == "File 3: jdkpa-549.jpeg"
+    assert metrics.skipped() == {"blank": 1}
+
+@patch("google.genai.Client")
+def test_translate_paths_labels_spilled_uploads(mock_client_class, tmp_path):
+    mock_response = MagicMock()
+    mock_response.text = '{"hindi_ocr": "H", "english_translation": "E"}'
+    mock_client_class.return_value.models.generate_content.return_value = mock_response
+    path = tmp_path / "tmpa1b2c3.jpg"
+    path.write_bytes(b"fake data")
+
+    translator = Translator(api_key="key-0001", system_prompt="p", token_estimator=OutputTokenEstimator())
+    results = translator.translate_paths([(str(path), "page 7.jpg", "image/jpeg", "digest-7")])
+
+    contents = mock_client_class.return_value.models.generate_content.call_args.kwargs["contents"]
+    assert contents[0].inline_data.data == b"fake data"
+    assert contents[1].text == "File 1: page 7.jpg"
+    assert results == [{"hindi_ocr": "H", "english_translation": "E"}]
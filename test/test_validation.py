@@ -0,0 +1,38 @@
+from jain_digitizer.common.validation import devanagari_ratio, looks_truncated, validate_result, preview_issues
+
+GOOD_RESULT = {
+    "hindi_ocr": "<h1>[1] File: page.jpg</h1><p>णमो अरिहंताणं णमो सिद्धाणं णमो आयरियाणं</p>",
+    "english_translation": "<h1>[1] File: page.jpg</h1><p>Obeisance to the Arihantas, to the Siddhas and to the Ācāryas.</p>",
+}
+
+def test_devanagari_ratio():
+    assert devanagari_ratio("नमस्ते") == 1.0
+    assert devanagari_ratio("hello") == 0.0
+    assert devanagari_ratio("") == 0.0
+
+def test_looks_truncated():
+    assert not looks_truncated("<p>नमस्ते</p>")
+    assert looks_truncated("<p>नमस्ते")
+    assert looks_truncated("<p>नमस्ते</p><blockquote")
+    assert looks_truncated("")
+
+def test_validate_good_result():
+    assert validate_result(GOOD_RESULT) == []
+
+def test_validate_error_result():
+    assert validate_result({"error": "Invalid JSON"})[0].startswith("error")
+
+def test_validate_missing_field():
+    assert "missing english_translation" in validate_result({"hindi_ocr": "<p>नमस्ते</p>"})
+
+def test_validate_low_quality():
+    # OCR came back in Latin script instead of Devanagari
+    result = {"hindi_ocr": "<p>namaste namaste</p>", "english_translation": "<p>Salutations to you</p>"}
+    assert validate_result(result)[0].startswith("low quality score")
+
+def test_preview_issues():
+    assert preview_issues(GOOD_RESULT, ink=0.02) == []
+    # A preview that only yielded a line from a page full of ink is re-sent
+    assert preview_issues(GOOD_RESULT, ink=0.3)[0].endswith("30% ink")
+    assert "low Devanagari ratio 0.00" in preview_issues({"hindi_ocr": "<p>namaste</p>"}, fields=("hindi_ocr",))
+    assert "truncated hindi_ocr" in preview_issues({"hindi_ocr": "<p>णमो"}, fields=("hindi_ocr",))
@@ -0,0 +1,174 @@
+import os
+import time
+import pytest
+from jain_digitizer.common.backend import group_by_file
+from jain_digitizer.common import watch_folder
+from jain_digitizer.common.watch_folder import FolderWatcher, ResultsStore, WatchDaemon, is_candidate
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeBackend:
+    """Returns one result per file, like a Translator on images."""
+    def __init__(self, calls, fail=()):
+        self.calls = calls
+        self.fail = fail
+
+    def translate_files(self, paths):
+        self.calls.append([os.path.basename(p) for p in paths])
+        return [{"error": "API error"} if os.path.basename(p) in self.fail
+                else {"hindi_ocr": f"<p>{os.path.basename(p)}</p>", "english_translation": "<p>en</p>"}
+                for p in paths]
+
+def test_is_candidate():
+    assert is_candidate("/scans/page1.JPG")
+    assert is_candidate("book.pdf")
+    assert not is_candidate(".page1.jpg")
+    assert not is_candidate("page1.jpg.part")
+    assert not is_candidate("notes.txt")
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_waits_until_file_is_stable(tmp_path, use_inotify):
+    if use_inotify and not watch_folder.INOTIFY_AVAILABLE:
+        pytest.skip("inotify_simple is not installed")
+    clock = FakeClock()
+    watcher = FolderWatcher([str(tmp_path)], stable_seconds=5, poll_interval=0.01, use_inotify=use_inotify, clock=clock)
+    try:
+        page = tmp_path / "page1.jpg"
+        page.write_bytes(b"half")
+        (tmp_path / "notes.txt").write_bytes(b"ignored")
+        assert watcher.poll(0.01) == []
+
+        # Still being written
+        clock.now = 4.0
+        with open(page, "ab") as f:
+            f.write(b" and the rest")
+        os.utime(page, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        assert watcher.poll(0.01) == []
+
+        clock.now = 8.0
+        assert watcher.poll(0.01) == []
+        clock.now = 9.5
+        assert watcher.poll(0.01) == [str(page)]
+        # Reported once per version
+        clock.now = 20.0
+        assert watcher.poll(0.01) == []
+    finally:
+        watcher.close()
+
+def test_inotify_events_map_to_their_folder(tmp_path):
+    if not watch_folder.INOTIFY_AVAILABLE:
+        pytest.skip("inotify_simple is not installed")
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    (first / "page1.jpg").write_bytes(b"scan")
+    (second / "page1.jpg").write_bytes(b"scan")
+    watcher = FolderWatcher([str(first), str(second)], stable_seconds=0, poll_interval=0.01, clock=FakeClock())
+    try:
+        watcher._read_events(0.01)
+        (second / "page1.jpg").write_bytes(b"rescanned")
+        # Only the folder the event came from, though both hold a page1.jpg
+        assert watcher._read_events(0.1) == {str(second / "page1.jpg")}
+    finally:
+        watcher.close()
+
+def test_watcher_skips_empty_files(tmp_path):
+    clock = FakeClock()
+    watcher = FolderWatcher([str(tmp_path)], stable_seconds=1, poll_interval=0.01, use_inotify=False, clock=clock)
+    (tmp_path / "page1.jpg").write_bytes(b"")
+    watcher.poll(0.01)
+    clock.now = 5.0
+    assert watcher.poll(0.01) == []
+
+def test_results_store_tracks_versions(tmp_path):
+    page = tmp_path / "page1.jpg"
+    page.write_bytes(b"scan")
+    store = ResultsStore(str(tmp_path / "results.db"))
+    stat = os.stat(page)
+    assert store.needs_processing(str(page), stat)
+
+    assert store.record(str(page), stat, [("page1.jpg", {"hindi_ocr": "एक"})])
+    assert not store.needs_processing(str(page), stat)
+    assert store.pages(str(page)) == [("page1.jpg", {"hindi_ocr": "एक"})]
+
+    # A rescanned file is processed again
+    page.write_bytes(b"rescanned")
+    assert store.needs_processing(str(page), os.stat(page))
+
+def test_results_store_retries_failures_up_to_limit(tmp_path):
+    page = tmp_path / "page1.jpg"
+    page.write_bytes(b"scan")
+    store = ResultsStore(str(tmp_path / "results.db"))
+    stat = os.stat(page)
+    for _ in range(watch_folder.MAX_ATTEMPTS):
+        assert store.needs_processing(str(page), stat)
+        assert not store.record(str(page), stat, [("page1.jpg", {"error": "boom"})])
+    assert not store.needs_processing(str(page), stat)
+    assert store.counts() == {"error": 1}
+
+def make_daemon(tmp_path, calls, batch_size=3, batch_seconds=10, fail=()):
+    clock = FakeClock()
+    scans = tmp_path / "scans"
+    scans.mkdir(exist_ok=True)
+    watcher = FolderWatcher([str(scans)], stable_seconds=0, poll_interval=0.01, use_inotify=False, clock=clock)
+    store = ResultsStore(str(tmp_path / "results.db"))
+    daemon = WatchDaemon(watcher, store, lambda: FakeBackend(calls, fail), batch_size, batch_seconds,
+                         index_path=str(tmp_path / "index.db"), clock=clock)
+    return daemon, scans, clock
+
+def test_daemon_batches_by_count_and_time(tmp_path):
+    calls = []
+    daemon, scans, clock = make_daemon(tmp_path, calls)
+    for i in range(4):
+        (scans / f"page{i}.jpg").write_bytes(b"scan %d" % i)
+
+    daemon.enqueue(daemon.watcher.poll(0.01))
+    assert daemon.batch_due()
+    daemon.process_batch()
+    assert calls == [["page0.jpg", "page1.jpg", "page2.jpg"]]
+
+    # The leftover page waits for more pages, then goes alone after batch_seconds
+    assert not daemon.batch_due()
+    clock.now = 11.0
+    assert daemon.batch_due()
+    daemon.process_batch()
+    assert calls[-1] == ["page3.jpg"]
+    assert daemon.store.counts() == {"done": 4}
+
+def test_daemon_skips_processed_files_after_restart(tmp_path):
+    calls = []
+    daemon, scans, _ = make_daemon(tmp_path, calls)
+    (scans / "page1.jpg").write_bytes(b"scan")
+    daemon.enqueue(daemon.watcher.poll(0.01))
+    daemon.process_batch()
+    daemon.store.close()
+
+    restarted, _, _ = make_daemon(tmp_path, calls)
+    restarted.enqueue(restarted.watcher.poll(0.01))
+    assert restarted.queue == []
+    assert len(calls) == 1
+
+def test_daemon_requeues_failed_files(tmp_path):
+    calls = []
+    daemon, scans, _ = make_daemon(tmp_path, calls, batch_size=2, fail={"bad.jpg"})
+    (scans / "bad.jpg").write_bytes(b"scan")
+    (scans / "good.jpg").write_bytes(b"scan")
+    daemon.enqueue(daemon.watcher.poll(0.01))
+    daemon.process_batch()
+    assert daemon.queue == [str(scans / "bad.jpg")]
+    while daemon.queue:
+        daemon.process_batch()
+    assert len(calls) == watch_folder.MAX_ATTEMPTS
+    assert daemon.store.counts() == {"done": 1, "error": 1}
+
+def test_group_by_file_splits_rasterized_pdf_pages():
+    batch = ["/s/book.pdf", "/s/page.jpg"]
+    results = [{"source": "book.pdf p1"}, {"source": "book.pdf p2"}, {"hindi_ocr": "x"}]
+    grouped = group_by_file(batch, results)
+    assert [page for page, _ in grouped["/s/book.pdf"]] == ["book.pdf p1", "book.pdf p2"]
+    assert [page for page, _ in grouped["/s/page.jpg"]] == ["page.jpg"]
@@ -0,0 +1,202 @@
+"""
+Benchmark for the Translator pipeline.
+
+Runs the files in test/data (or the given paths) through ``Translator`` and
+prints a JSON report. By default the Gemini client is replaced with an
+offline stub so the numbers only reflect local work (reading, chunking,
+parsing); pass ``--live`` to call the real API with GEMINI_API_KEY.
+
+With ``--cassette`` the run replays recorded Gemini responses instead of
+the stub (``--live --record`` records them first), so timings and outputs
+are repeatable at any scale:
+
+    python utils/benchmark.py --live --record --cassette test/data/cassette.jsonl
+    python utils/benchmark.py --cassette test/data/cassette.jsonl --repeat 50 --replay-latency recorded --keys 4
+    python utils/benchmark.py --memory-budget-mb 1 --latency 0.2
+    python utils/benchmark.py --chunk-size 1 --repeat 10 --latency 0.2 --keys 4
+    python utils/benchmark.py --chunk-size 1 --repeat 40 --latency 0.05 --slow-fraction 0.05 --slow-latency 1 --hedge-budget 0.1
+    python utils/benchmark.py --preview-scale 0.5 --preview-fail-fraction 0.2
+    python utils/benchmark.py --chunk-size 1 --blank-pages 4
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from jain_digitizer.common.translator import Translator
+from jain_digitizer.common.constants import DEFAULT_PROMPT, DEFAULT_OUTPUT_TOKEN_BUDGET, DEFAULT_PAGE_FILTER
+from jain_digitizer.common import imaging
+from jain_digitizer.common.ingestion import peak_rss_bytes
+from jain_digitizer.common.metrics import default_metrics
+from jain_digitizer.common.cassette import client_factory, load_cassette
+from jain_digitizer.common.token_budget import default_estimator
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "data")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModels:
+    """Answers generate_content with one canned result per file in the request."""
+    lock = threading.Lock()
+
+    def __init__(self, stats, latency, slow_fraction=0.0, slow_latency=0.0, preview_fail_fraction=0.0):
+        self.stats = stats
+        self.latency = latency
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.preview_fail_fraction = preview_fail_fraction
+
+    def generate_content(self, model, config, contents):
+        images = [p.inline_data.data for p in contents if getattr(p, "inline_data", None) is not None]
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["uploaded_bytes"] += sum(len(data) for data in images)
+            slow = self.stats["rng"].random() < self.slow_fraction
+            # Downscaled previews (any image that isn't one of the input files) the model can't read
+            unreadable = [len(data) not in self.stats["input_sizes"] and self.stats["rng"].random() < self.preview_fail_fraction
+                          for data in images]
+        latency = self.slow_latency if slow else self.latency
+        if latency:
+            time.sleep(latency)
+        names = [p.text for p in contents if getattr(p, "text", None)]
+        unreadable += [False] * (len(names) - len(unreadable))
+        # About a page of text, so results pass the preview's length-for-ink check
+        page = "<p>णमो अरिहंताणं णमो सिद्धाणं णमो आयरियाणं णमो उवज्झायाणं णमो लोए सव्वसाहूणं</p>" * 5
+        results = [
+            {"hindi_ocr": f"<h1>{name}</h1>" + ("<p>णमो" if bad else page),
+             "english_translation": f"<h1>{name}</h1><p>Obeisance to the Arihantas, to the Siddhas, to the Ācāryas, "
+                                    f"to the Upādhyāyas and to all the Sādhus in the world.</p>" * 5}
+            for name, bad in zip(names, unreadable)
+        ]
+        return StubResponse(json.dumps(results if len(results) > 1 else results[0], ensure_ascii=False))
+
+
+class StubClient:
+    def __init__(self, stats, latency, slow_fraction=0.0, slow_latency=0.0, preview_fail_fraction=0.0):
+        self.models = StubModels(stats, latency, slow_fraction, slow_latency, preview_fail_fraction)
+
+
+def blank_page(directory, number):
+    """Writes a scanned blank verso: tinted paper with faint show-through."""
+    pix = imaging.pymupdf.Pixmap(imaging.pymupdf.csGRAY, imaging.pymupdf.IRect(0, 0, 1240, 1754), False)
+    pix.clear_with(215)
+    for top in range(200, 1600, 45):
+        pix.clear_with(195, imaging.pymupdf.IRect(150, top, 1090, top + 12))
+    path = os.path.join(directory, f"blank-{number}.jpg")
+    pix.save(path, jpg_quality=85)
+    return path
+
+
+def run(files, args):
+    # Seeded so the slow requests (the latency tail) are the same across runs
+    stats = {"requests": 0, "uploaded_bytes": 0, "rng": random.Random(1),
+             "input_sizes": {os.path.getsize(f) for f in files}}
+    api_key = args.api_key if args.live else ",".join(f"offline-{i}" for i in range(args.keys))
+    factory = None
+    if args.cassette:
+        mode = "record" if args.live and args.record else "replay"
+        factory = client_factory(mode, args.cassette, args.replay_latency)
+    translator = Translator(
+        api_key,
+        DEFAULT_PROMPT,
+        chunk_size=args.chunk_size,
+        memory_budget=int(args.memory_budget_mb * 1024 * 1024),
+        escalation_model=args.escalation_model,
+        client_factory=factory,
+        output_token_budget=args.output_budget,
+        hedge_budget=args.hedge_budget,
+        preview_scale=args.preview_scale,
+        page_filter=args.page_filter,
+    )
+
+    start = time.perf_counter()
+    if args.live or args.cassette:
+        results = translator.translate_files(files)
+    else:
+        with patch("jain_digitizer.common.translator.genai.Client", lambda api_key, **kwargs: StubClient(stats, args.latency, args.slow_fraction, args.slow_latency,
+                                                                                             args.preview_fail_fraction)):
+            results = translator.translate_files(files)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "files": len(files),
+        "input_bytes": sum(os.path.getsize(f) for f in files),
+        "results": len(results),
+        "errors": sum(1 for r in results if isinstance(r, dict) and "error" in r),
+        "requests": stats["requests"] if not (args.live or args.cassette) else None,
+        "uploaded_bytes": stats["uploaded_bytes"] if not (args.live or args.cassette) else None,
+        "wall_seconds": round(elapsed, 4),
+        "pages_per_minute": round(len(files) / elapsed * 60, 2) if elapsed else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "tiers": default_metrics.snapshot(),
+        "keys": translator.key_pool.snapshot(),
+        "hedging": translator.hedge_policy.snapshot() if translator.hedge_policy else None,
+        "skipped_pages": default_metrics.skipped(),
+        # One per page that never reached the model; fewer requests when pages share one
+        "calls_avoided": sum(default_metrics.skipped().values()),
+        "output_tokens_per_byte": default_estimator.snapshot(),
+    }
+    if args.cassette:
+        cassette = load_cassette(args.cassette)
+        report["cassette"] = {"path": args.cassette, "hits": cassette.hits, "misses": cassette.misses}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Jain Digitizer translation pipeline")
+    parser.add_argument("files", nargs="*", help="Files to process (default: test/data)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the file list N times to simulate larger books")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Maximum files per request")
+    parser.add_argument("--memory-budget-mb", type=float, default=256, help="Peak file data per in-flight request")
+    parser.add_argument("--output-budget", type=int, default=DEFAULT_OUTPUT_TOKEN_BUDGET,
+                        help="Output token limit per request used to pack pages (0 = pack by count and memory only)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated API latency per request (offline only)")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Fraction of requests that are slow (offline only)")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Latency of a slow request (offline only)")
+    parser.add_argument("--hedge-budget", type=float, default=0.0,
+                        help="Duplicate requests running past their p95, as a fraction of requests (0 = off)")
+    parser.add_argument("--preview-scale", type=float, default=0.0,
+                        help="Send images downscaled by this factor first, re-sending pages that fail checks")
+    parser.add_argument("--preview-fail-fraction", type=float, default=0.0,
+                        help="Fraction of previews the stub can't read (offline only)")
+    parser.add_argument("--blank-pages", type=int, default=0,
+                        help="Interleave this many blank scanned pages with the input")
+    parser.add_argument("--page-filter", action=argparse.BooleanOptionalAction, default=DEFAULT_PAGE_FILTER,
+                        help="Answer blank and picture-only pages locally instead of sending them")
+    parser.add_argument("--keys", type=int, default=1, help="Number of simulated API keys (offline only)")
+    parser.add_argument("--escalation-model", default=None, help="Re-send pages failing validation to this model")
+    parser.add_argument("--live", action="store_true", help="Call the real Gemini API")
+    parser.add_argument("--cassette", default=None, help="Replay recorded responses from this cassette (or record with --live --record)")
+    parser.add_argument("--record", action="store_true", help="With --live and --cassette, record the responses")
+    parser.add_argument("--replay-latency", default="0", help="Seconds per replayed request, or 'recorded'")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY", ""))
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger("jain_digitizer").setLevel(logging.WARNING)
+
+    files = args.files or sorted(glob.glob(os.path.join(DATA_DIR, "*.jp*g")))
+    files = files * args.repeat
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.blank_pages):
+            files.insert((i + 1) * len(files) // (args.blank_pages + 1), blank_page(tmp, i))
+        report = run(files, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Load test for the Streamlit web app.
+
+Starts one ``streamlit run`` server, with the Gemini client replaced by the
+offline stub from ``benchmark.py``, and connects several simulated users to
+it at once. Each user speaks Streamlit's own websocket protocol as a browser
+would: it uploads a book through the upload endpoint, processes it and pages
+through the results. The JSON report has the rerun latency per step, the
+end-to-end job time, and the server's CPU time and memory.
+
+All sessions share the server's process, so its GIL, locks and
+``st.cache_data`` are contended as in production. Each user's files get a
+unique trailer so they don't share a cache entry unless ``--shared-book``
+is given. Widgets drawn by a browser component (the Quill editors) are left
+at their defaults. CPU and memory during the load are read from /proc, so
+they are only reported on Linux.
+
+    python utils/load_test.py --sessions 20
+    python utils/load_test.py --sessions 20 --repeat 5 --latency 0.2 --output load.json
+"""
+import argparse
+import asyncio
+import atexit
+import glob
+import json
+import os
+import platform
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from jain_digitizer.common.ingestion import peak_rss_bytes
+from jain_digitizer.common.metrics import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "src", "jain_digitizer", "web", "app.py")
+DATA_DIR = os.path.join(ROOT, "test", "data")
+MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".pdf": "application/pdf"}
+PAGES_RE = re.compile(r"Pages \d+–\d+ of (\d+)")
+
+
+def serve(port, stats_file, latency, verbose):
+    """Runs the app in this (server) process with the offline Gemini stub."""
+    import logging
+    from google import genai
+    from benchmark import StubClient
+
+    stats = {"requests": 0, "uploaded_bytes": 0, "rng": random.Random(0), "input_sizes": set()}
+    # The translator looks the client up on every request, so this reaches every session
+    genai.Client = lambda api_key=None, **kwargs: StubClient(stats, latency)
+    if not verbose:
+        logging.getLogger("jain_digitizer").setLevel(logging.WARNING)
+
+    def write_stats():
+        with open(stats_file, "w", encoding="utf-8") as f:
+            json.dump({"requests": stats["requests"], "uploaded_bytes": stats["uploaded_bytes"],
+                       "cpu_seconds": time.process_time(), "peak_rss_bytes": peak_rss_bytes()}, f)
+
+    atexit.register(write_stats)
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", APP_PATH, "--server.port", str(port), "--server.headless", "true",
+                "--server.enableXsrfProtection", "false", "--server.enableCORS", "false",
+                "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"]
+    cli.main()
+
+
+def _proc_cpu_seconds(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # Its own time plus that of finished children (e.g. PDF rasterizer workers)
+        return sum(int(field) for field in fields[11:15]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _proc_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class Upload:
+    """A file a session uploads."""
+    def __init__(self, name, mime_type, data):
+        self.name = name
+        self.type = mime_type
+        self.data = data
+
+
+def load_book(files, number, shared):
+    uploads = []
+    for path in files:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not shared:
+            # Ignored after the end of a JPEG or PDF, but changes the digest
+            data += f"\n% load test session {number}\n".encode()
+        uploads.append(Upload(os.path.basename(path), MIME_TYPES.get(os.path.splitext(path)[1].lower(), "image/jpeg"),
+                              data))
+    return uploads
+
+
+class Session:
+    """One simulated browser tab, driving the app over Streamlit's websocket protocol."""
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session_id = None
+        self.buttons = {}
+        self.errors = []
+        self.total_pages = 0
+        self._uploader_id = None
+        self._uploaded = []
+        self._ws = None
+        self._http = None
+
+    async def connect(self):
+        import httpx
+        import websockets
+        self._ws = await websockets.connect(self.base_url.replace("http", "ws", 1) + "/_stcore/stream",
+                                            subprotocols=["streamlit"], max_size=None)
+        self._http = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+
+    async def close(self):
+        if self._ws:
+            await self._ws.close()
+        if self._http:
+            await self._http.aclose()
+
+    async def _send(self, back_msg):
+        await self._ws.send(back_msg.SerializeToString())
+
+    async def _receive(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        msg = ForwardMsg()
+        msg.ParseFromString(await asyncio.wait_for(self._ws.recv(), self.timeout))
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            self.session_id = msg.new_session.initialize.session_id
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            self._element(msg.delta.new_element)
+        return kind, msg
+
+    def _element(self, element):
+        kind = element.WhichOneof("type")
+        if kind == "button":
+            self.buttons[element.button.label] = element.button
+        elif kind == "file_uploader":
+            self._uploader_id = element.file_uploader.id
+        elif kind == "markdown":
+            match = PAGES_RE.search(element.markdown.body)
+            if match:
+                self.total_pages = int(match.group(1))
+        elif kind == "alert" and element.alert.format == 1:  # ERROR
+            self.errors.append(element.alert.body)
+        elif kind == "exception":
+            self.errors.append(f"{element.exception.type}: {element.exception.message}")
+
+    async def rerun(self, click=None):
+        """Reruns the script, clicking the button labelled ``click``, and waits for it to finish."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        widgets = back_msg.rerun_script.widget_states.widgets
+        if self._uploaded:
+            state = widgets.add()
+            state.id = self._uploader_id
+            state.file_uploader_state_value.uploaded_file_info.extend(self._uploaded)
+        if click:
+            state = widgets.add()
+            state.id = self.buttons[click].id
+            state.trigger_value = True
+        self.buttons = {}
+        await self._send(back_msg)
+        while (await self._receive())[0] != "script_finished":
+            pass
+
+    async def upload(self, uploads):
+        """Uploads files as the file uploader does; they're sent with every following rerun."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import UploadedFileInfo
+        back_msg = BackMsg()
+        request_id = uuid.uuid4().hex
+        back_msg.file_urls_request.request_id = request_id
+        back_msg.file_urls_request.session_id = self.session_id
+        back_msg.file_urls_request.file_names.extend(u.name for u in uploads)
+        await self._send(back_msg)
+        while True:
+            kind, msg = await self._receive()
+            if kind == "file_urls_response" and msg.file_urls_response.response_id == request_id:
+                break
+        for upload, urls in zip(uploads, msg.file_urls_response.file_urls):
+            response = await self._http.put(urls.upload_url, files={"file": (upload.name, upload.data, upload.type)})
+            response.raise_for_status()
+            self._uploaded.append(UploadedFileInfo(name=upload.name, size=len(upload.data), file_id=urls.file_id,
+                                                   file_urls=urls))
+
+
+async def run_session(number, base_url, files, config, start):
+    uploads = load_book(files, number, config["shared_book"])
+    session = Session(base_url, config["timeout"])
+    reruns = {}
+
+    async def timed(step, coroutine):
+        started = time.perf_counter()
+        await coroutine
+        elapsed = time.perf_counter() - started
+        reruns.setdefault(step, []).append(elapsed)
+        return elapsed
+
+    await session.connect()
+    try:
+        await start.wait()
+        await timed("load", session.rerun())
+        await timed("upload", session.upload(uploads))
+        await timed("rerun", session.rerun())
+        job_seconds = await timed("process", session.rerun(click="🚀 Process Files"))
+        pages = session.total_pages
+        for _ in range(config["page_views"]):
+            next_button = session.buttons.get("Next ▶")
+            if next_button is None or next_button.disabled:
+                break
+            await timed("next_page", session.rerun(click="Next ▶"))
+        await timed("idle", session.rerun())
+    finally:
+        await session.close()
+    return {"session": number, "job_seconds": job_seconds, "pages": pages, "errors": session.errors,
+            "reruns": reruns}
+
+
+def _summary(samples):
+    if not samples:
+        return None
+    return {"count": len(samples), "p50": percentile(samples, 50), "p95": percentile(samples, 95),
+            "max": round(max(samples), 4)}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(server, base_url, timeout):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Streamlit server exited with code {server.returncode}")
+        try:
+            if httpx.get(base_url + "/_stcore/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Streamlit server did not start within {timeout:g}s")
+
+
+async def _load(base_url, files, args, config):
+    # The first run imports the app's dependencies; a real server pays that once, not per user
+    warmup = Session(base_url, config["timeout"])
+    await warmup.connect()
+    await warmup.rerun()
+    await warmup.close()
+
+    start = asyncio.Event()
+    tasks = [asyncio.create_task(run_session(number, base_url, files, config, start))
+             for number in range(args.sessions)]
+    # Every session is connected before any of them starts
+    await asyncio.sleep(0.5)
+    start.set()
+    return await asyncio.gather(*tasks)
+
+
+def run(files, args, stats_file):
+    config = {
+        "page_views": args.page_views,
+        "shared_book": args.shared_book,
+        "timeout": args.timeout,
+    }
+    port = args.port or _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    output = None if args.verbose else subprocess.DEVNULL
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port),
+                               "--stats-file", stats_file, "--latency", str(args.latency)]
+                              + (["--verbose"] if args.verbose else []),
+                              cwd=ROOT, stdout=output, stderr=output)
+    try:
+        _wait_until_up(server, base_url, args.startup_timeout)
+        pid = server.pid
+        cpu_before, rss_before = _proc_cpu_seconds(pid), _proc_rss_bytes(pid)
+        started = time.perf_counter()
+        sessions = asyncio.run(_load(base_url, files, args, config))
+        wall = max(time.perf_counter() - started, 1e-9)
+        cpu_after, rss_after = _proc_cpu_seconds(pid), _proc_rss_bytes(pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+    server_stats = {}
+    if os.path.exists(stats_file):
+        with open(stats_file, encoding="utf-8") as f:
+            server_stats = json.load(f)
+
+    steps = sorted({step for session in sessions for step in session["reruns"]})
+    pages = sum(session["pages"] for session in sessions)
+    cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    return {
+        "sessions": args.sessions,
+        "files_per_session": len(files),
+        "input_bytes_per_session": sum(os.path.getsize(f) for f in files),
+        "latency": args.latency,
+        "shared_book": args.shared_book,
+        "wall_seconds": round(wall, 4),
+        "pages": pages,
+        "pages_per_minute": round(pages / wall * 60, 2),
+        "requests": server_stats.get("requests"),
+        "errors": sum(len(session["errors"]) for session in sessions),
+        "error_messages": sorted({message for session in sessions for message in session["errors"]})[:10],
+        "job_seconds": _summary([session["job_seconds"] for session in sessions]),
+        "rerun_seconds": {step: _summary([t for session in sessions for t in session["reruns"].get(step, [])])
+                          for step in steps},
+        "server": {
+            # During the load only, PDF rasterizer workers included (Linux)
+            "cpu_seconds": round(cpu, 4) if cpu is not None else None,
+            # Cores kept busy on average over the run
+            "cpu_utilization": round(cpu / wall, 3) if cpu is not None else None,
+            "rss_growth_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            # The server process alone, start-up included
+            "total_cpu_seconds": server_stats.get("cpu_seconds"),
+            "peak_rss_bytes": server_stats.get("peak_rss_bytes"),
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Jain Digitizer web app with simulated sessions")
+    parser.add_argument("files", nargs="*", help="Files each session uploads (default: test/data)")
+    parser.add_argument("--sessions", type=int, default=20, help="Simultaneous simulated users")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the file list N times to simulate larger books")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated API latency per request")
+    parser.add_argument("--page-views", type=int, default=3, help="Results views each session pages through")
+    parser.add_argument("--shared-book", action="store_true",
+                        help="Every session uploads identical files (exercises the server's result cache)")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free one)")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="Seconds allowed for the server to start")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds a single rerun may take")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show server and application logs")
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--stats-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve, args.stats_file, args.latency, args.verbose)
+        return
+
+    files = args.files or sorted(glob.glob(os.path.join(DATA_DIR, "*.jp*g")) + glob.glob(os.path.join(DATA_DIR, "*.pdf")))
+    files = files * args.repeat
+    with tempfile.TemporaryDirectory() as tmp:
+        # The server inherits these; every run starts with cold caches and leaves nothing behind
+        for name in ("SESSION_DIR", "UPLOAD_DIR", "RASTER_CACHE"):
+            os.environ[name] = os.path.join(tmp, name.lower())
+        os.environ["STAGE_CACHE"] = os.path.join(tmp, "stage_cache.db")
+        os.environ["GEMINI_API_KEY"] = "offline-0"
+        # Live sessions must not evict each other's results
+        os.environ["MAX_SESSIONS"] = str(max(args.sessions + 1, int(os.environ.get("MAX_SESSIONS", "20"))))
+        report = run(files, args, os.path.join(tmp, "server_stats.json"))
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()